@@ -0,0 +1,568 @@
+import copy
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.timing import medir
+from app.core.versioning import data_versions, TABELAS_DADOS
+
+# Cliente Redis é opcional: sem o pacote o backend "redis" não fica disponível
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+class CacheMetrics:
+    """Contadores de uso do cache (protegidos por lock)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def incr(self, campo: str, quantidade: int = 1) -> None:
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + quantidade)
+
+    def as_dict(self) -> Dict[str, Any]:
+        consultas = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / consultas if consultas else 0.0,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class CacheBackend:
+    """Interface dos backends de cache de respostas (chave -> bytes)"""
+
+    name = "base"
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.metrics = CacheMetrics()
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "ttl_seconds": self.ttl_seconds, **self.metrics.as_dict()}
+
+
+class MemoryCache(CacheBackend):
+    """
+    Cache em processo com TTL e despejo LRU limitado por memória
+
+    O tamanho de cada entrada é o da chave mais o do corpo serializado.
+    """
+
+    name = "memory"
+
+    def __init__(self, ttl_seconds: float = 60, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(ttl_seconds)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._entradas.get(key)
+            if entrada is None:
+                self.metrics.incr("misses")
+                return None
+            expira_em, value = entrada
+            if expira_em <= time.monotonic():
+                self._remover(key)
+                self.metrics.incr("expirations")
+                self.metrics.incr("misses")
+                return None
+            self._entradas.move_to_end(key)
+        self.metrics.incr("hits")
+        return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        tamanho = len(key) + len(value)
+        if tamanho > self.max_bytes:
+            return
+        expira_em = time.monotonic() + (ttl_seconds or self.ttl_seconds)
+        with self._lock:
+            if key in self._entradas:
+                self._remover(key)
+            self._entradas[key] = (expira_em, value)
+            self._bytes += tamanho
+            while self._bytes > self.max_bytes:
+                antiga = next(iter(self._entradas))
+                self._remover(antiga)
+                self.metrics.incr("evictions")
+        self.metrics.incr("sets")
+
+    def _remover(self, key: str) -> None:
+        _, value = self._entradas.pop(key)
+        self._bytes -= len(key) + len(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entradas, usados = len(self._entradas), self._bytes
+        return {**super().stats(), "entries": entradas, "bytes": usados, "max_bytes": self.max_bytes}
+
+
+class LocalKeyValueStore:
+    """
+    Substituto local de um servidor chave-valor (subconjunto da API do Redis)
+
+    Usado em testes e desenvolvimento no lugar de `redis.Redis`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dados: Dict[str, Tuple[Optional[float], bytes]] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._dados.get(key)
+            if entrada is None:
+                return None
+            expira_em, value = entrada
+            if expira_em is not None and expira_em <= time.monotonic():
+                del self._dados[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ex: Optional[int] = None) -> bool:
+        with self._lock:
+            self._dados[key] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._dados.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match: str = "*") -> Iterator[str]:
+        prefixo = match.rstrip("*")
+        with self._lock:
+            chaves = [key for key in self._dados if key.startswith(prefixo)]
+        return iter(chaves)
+
+
+class KeyValueCache(CacheBackend):
+    """
+    Cache em um servidor chave-valor externo (Redis ou o substituto local)
+
+    O TTL é aplicado pelo próprio servidor; o despejo por memória fica a
+    cargo da política do servidor (ex.: maxmemory-policy allkeys-lru).
+    """
+
+    name = "kv"
+
+    def __init__(self, client, ttl_seconds: float = 60, prefix: str = "cnpq:cache:"):
+        super().__init__(ttl_seconds)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.client.get(self.prefix + key)
+        self.metrics.incr("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        self.client.set(self.prefix + key, value, ex=max(1, int(ttl_seconds or self.ttl_seconds)))
+        self.metrics.incr("sets")
+
+    def clear(self) -> None:
+        chaves = list(self.client.scan_iter(match=self.prefix + "*"))
+        if chaves:
+            self.client.delete(*chaves)
+
+
+def create_cache_backend() -> Optional[CacheBackend]:
+    """Instancia o backend configurado em `settings.cache_backend`"""
+    backend = settings.cache_backend
+    if backend == "memory":
+        return MemoryCache(settings.cache_ttl_seconds, settings.cache_max_bytes)
+    if backend == "local":
+        return KeyValueCache(LocalKeyValueStore(), settings.cache_ttl_seconds)
+    if backend == "redis":
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requer o pacote 'redis' (pip install redis)")
+        return KeyValueCache(redis.Redis.from_url(settings.cache_redis_url), settings.cache_ttl_seconds)
+    return None
+
+
+response_cache = create_cache_backend()
+
+
+class EntityCache:
+    """
+    Cache por ID de registros de entidades (valores das colunas em dicionários)
+
+    Um LRU limitado por tabela. As rotas PUT/DELETE invalidam o registro
+    alterado; além disso, quando a versão da tabela muda (escritas ou
+    importações, inclusive de outros processos) o cache dela é descartado.
+    Os dicionários devolvidos são cópias, podem ser alterados livremente.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.metrics = CacheMetrics()
+        self._lock = threading.Lock()
+        self._tabelas: Dict[str, "OrderedDict[int, Dict[str, Any]]"] = {}
+        self._versoes: Dict[str, str] = {}
+
+    @staticmethod
+    def to_dict(entidade) -> Dict[str, Any]:
+        return {column.name: getattr(entidade, column.name) for column in entidade.__table__.columns}
+
+    def _cache_da_tabela(self, tabela: str, versao: str) -> "OrderedDict[int, Dict[str, Any]]":
+        """Cache da tabela, descartado se a versão dos dados mudou (chamar com o lock)"""
+        if self._versoes.get(tabela) != versao:
+            self._tabelas[tabela] = OrderedDict()
+            self._versoes[tabela] = versao
+        return self._tabelas[tabela]
+
+    def get(self, db: Session, modelo, entidade_id: int) -> Optional[Dict[str, Any]]:
+        """Registro por ID (None se não existir)"""
+        return self.get_many(db, modelo, [entidade_id]).get(entidade_id)
+
+    def get_many(self, db: Session, modelo, ids: Iterable[Optional[int]]) -> Dict[int, Dict[str, Any]]:
+        """
+        Registros por ID; os ausentes do cache são lidos em um único SELECT ... IN
+        """
+        tabela = modelo.__tablename__
+        ids = {entidade_id for entidade_id in ids if entidade_id is not None}
+        encontrados: Dict[int, Dict[str, Any]] = {}
+
+        versao = data_versions.token(tabela)
+        with self._lock:
+            cache = self._cache_da_tabela(tabela, versao)
+            for entidade_id in ids:
+                registro = cache.get(entidade_id)
+                if registro is not None:
+                    cache.move_to_end(entidade_id)
+                    encontrados[entidade_id] = registro
+        self.metrics.incr("hits", len(encontrados))
+
+        faltantes = ids - set(encontrados)
+        if faltantes:
+            self.metrics.incr("misses", len(faltantes))
+            carregados = {
+                entidade.id: self.to_dict(entidade)
+                for entidade in db.query(modelo).filter(modelo.id.in_(faltantes)).all()
+            }
+            encontrados.update(carregados)
+            with self._lock:
+                # Não guarda o que foi lido se a tabela mudou durante a leitura
+                if self._versoes.get(tabela) == versao:
+                    cache = self._tabelas[tabela]
+                    for entidade_id, registro in carregados.items():
+                        cache[entidade_id] = registro
+                        if len(cache) > self.max_entries:
+                            cache.popitem(last=False)
+                            self.metrics.incr("evictions")
+                    self.metrics.incr("sets", len(carregados))
+
+        return {entidade_id: dict(registro) for entidade_id, registro in encontrados.items()}
+
+    def invalidate(self, modelo, entidade_id: int) -> None:
+        with self._lock:
+            self._tabelas.get(modelo.__tablename__, {}).pop(entidade_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tabelas.clear()
+            self._versoes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entradas = {tabela: len(cache) for tabela, cache in self._tabelas.items()}
+        return {"max_entries": self.max_entries, "entries": entradas, **self.metrics.as_dict()}
+
+
+entity_cache = EntityCache(settings.entity_cache_max_entries)
+
+
+class PrincipalCache:
+    """
+    Cache de curta duração dos usuários autenticados, por credencial
+
+    A credencial é o token JWT ou o digest de uma API key. Evita o SELECT em
+    `users` a cada requisição autenticada. Só usuários ativos são guardados;
+    desativação ou troca de papel pela API invalidam todas as entradas do
+    usuário. O TTL limita o atraso para alterações feitas por outros processos.
+    """
+
+    def __init__(self, ttl_seconds: float = 30, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.metrics = CacheMetrics()
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, credencial: str) -> Optional[Dict[str, Any]]:
+        """Colunas do usuário em cache (cópia) ou None"""
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entrada = self._entradas.get(credencial)
+            if entrada is not None and entrada[0] <= time.monotonic():
+                del self._entradas[credencial]
+                self.metrics.incr("expirations")
+                entrada = None
+            if entrada is None:
+                self.metrics.incr("misses")
+                return None
+            self._entradas.move_to_end(credencial)
+        self.metrics.incr("hits")
+        return dict(entrada[1])
+
+    def set(self, credencial: str, dados: Dict[str, Any], ttl_seconds: Optional[float] = None) -> None:
+        """Guarda as colunas do usuário (`dados` precisa conter o username)"""
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entradas[credencial] = (time.monotonic() + ttl, dict(dados))
+            self._entradas.move_to_end(credencial)
+            if len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+                self.metrics.incr("evictions")
+        self.metrics.incr("sets")
+
+    def invalidate(self, username: str) -> None:
+        """Remove todas as entradas (tokens e API keys) do usuário"""
+        with self._lock:
+            for credencial in [
+                credencial for credencial, (_, dados) in self._entradas.items()
+                if dados.get("username") == username
+            ]:
+                del self._entradas[credencial]
+
+    def discard(self, credencial: str) -> None:
+        with self._lock:
+            self._entradas.pop(credencial, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entradas = len(self._entradas)
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "entries": entradas,
+            **self.metrics.as_dict(),
+        }
+
+
+principal_cache = PrincipalCache(settings.principal_cache_ttl_seconds, settings.principal_cache_max_entries)
+
+
+class _Chamada:
+    """Execução em andamento de uma chave (resultado ou exceção compartilhados)"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+def _erro_para_seguidor(erro: BaseException) -> BaseException:
+    """Cópia da exceção do líder para uma chamada coalescida, com o traceback original"""
+    try:
+        copia = copy.copy(erro)
+    except Exception:
+        copia = RuntimeError(f"Falha na execução coalescida: {erro!r}")
+        copia.__cause__ = erro
+    return copia.with_traceback(erro.__traceback__)
+
+
+class SingleFlight:
+    """
+    Coalescência de chamadas idênticas concorrentes (single-flight)
+
+    A primeira chamada de uma chave executa a função; as que chegam enquanto
+    ela está em andamento esperam e recebem o mesmo resultado (ou uma cópia
+    da exceção). A espera é limitada a `espera_maxima` segundos: depois disso
+    a chamada executa a função por conta própria, para não prender a thread
+    atrás de um líder lento. Nada é guardado depois que a execução termina.
+    """
+
+    def __init__(self, espera_maxima: Optional[float] = None):
+        self.espera_maxima = espera_maxima
+        self._lock = threading.Lock()
+        self._chamadas: Dict[str, _Chamada] = {}
+        self.execucoes = 0
+        self.coalescidas = 0
+        self.esperas_esgotadas = 0
+
+    def do(
+        self,
+        key: str,
+        func: Callable[[], Any],
+        ao_aguardar: Optional[Callable[[], None]] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Retorna (resultado, compartilhado); compartilhado indica que outra chamada o calculou
+
+        `ao_aguardar` roda antes de uma chamada coalescida bloquear (ex.: liberar recursos).
+        """
+        with self._lock:
+            chamada = self._chamadas.get(key)
+            lider = chamada is None
+            if lider:
+                chamada = self._chamadas[key] = _Chamada()
+                self.execucoes += 1
+            else:
+                self.coalescidas += 1
+
+        if not lider:
+            if ao_aguardar is not None:
+                ao_aguardar()
+            if not chamada.evento.wait(self.espera_maxima):
+                with self._lock:
+                    self.esperas_esgotadas += 1
+                return func(), False
+            if chamada.erro is not None:
+                raise _erro_para_seguidor(chamada.erro)
+            return chamada.resultado, True
+
+        try:
+            chamada.resultado = func()
+        except BaseException as exc:
+            chamada.erro = exc
+            raise
+        finally:
+            with self._lock:
+                del self._chamadas[key]
+            chamada.evento.set()
+        return chamada.resultado, False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "em_andamento": len(self._chamadas),
+                "execucoes": self.execucoes,
+                "coalescidas": self.coalescidas,
+                "esperas_esgotadas": self.esperas_esgotadas,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.execucoes = 0
+            self.coalescidas = 0
+            self.esperas_esgotadas = 0
+
+
+single_flight = SingleFlight(settings.single_flight_max_wait_seconds or None)
+
+
+def cache_key(request: Request, tabelas: Tuple[str, ...]) -> str:
+    """
+    Chave = rota + parâmetros normalizados + versão dos dados
+
+    Parâmetros vazios são descartados e os demais ordenados. Como a versão das
+    tabelas faz parte da chave, escritas e importações invalidam as entradas
+    antigas (que expiram por TTL/LRU).
+    """
+    parametros = sorted((k, v) for k, v in parse_qsl(request.url.query) if v != "")
+    base = f"{request.method} {request.url.path}?{urlencode(parametros)}"
+    versao = data_versions.token(*tabelas)
+    return hashlib.sha256(f"{base}|{versao}".encode()).hexdigest()
+
+
+def cached_response(*tabelas: str, ttl_seconds: Optional[float] = None):
+    """
+    Decorator de rotas GET que guarda o corpo JSON da resposta no cache
+
+    As dependências da rota (autenticação, GET condicional) continuam rodando
+    a cada requisição; só a execução da rota e a serialização são evitadas.
+    Em um miss, requisições idênticas simultâneas são coalescidas: só a
+    primeira executa a rota e as demais recebem o mesmo corpo.
+    `tabelas` são as tabelas cujo conteúdo a resposta reflete (padrão: todas).
+    """
+    tabelas = tabelas or TABELAS_DADOS
+
+    def decorator(func: Callable) -> Callable:
+        assinatura = inspect.signature(func)
+        parametros = list(assinatura.parameters.values()) + [
+            inspect.Parameter("cache_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            inspect.Parameter("cache_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+        ]
+
+        @functools.wraps(func)
+        def wrapper(*args, cache_request: Request, cache_response: Response, **kwargs):
+            backend = response_cache
+            coalescer = settings.single_flight_enabled
+            if backend is None and not coalescer:
+                return func(*args, **kwargs)
+
+            key = cache_key(cache_request, tabelas)
+            body = backend.get(key) if backend is not None else None
+            estado = "HIT"
+            if body is None:
+                def calcular() -> bytes:
+                    resultado = func(*args, **kwargs)
+                    with medir("serializacao"):
+                        corpo = JSONResponse(content=jsonable_encoder(resultado)).body
+                    if backend is not None:
+                        backend.set(key, corpo, ttl_seconds)
+                    return corpo
+
+                def liberar_sessoes() -> None:
+                    # Quem espera devolve a conexão ao pool em vez de segurá-la parada
+                    for valor in kwargs.values():
+                        if isinstance(valor, Session):
+                            valor.close()
+
+                if coalescer:
+                    # Requisições idênticas simultâneas esperam a mesma execução
+                    body, compartilhado = single_flight.do(key, calcular, liberar_sessoes)
+                    estado = "COALESCED" if compartilhado else "MISS"
+                else:
+                    body, estado = calcular(), "MISS"
+
+            # Headers definidos pelas dependências (ETag etc.) seguem na resposta
+            response = Response(content=body, media_type="application/json")
+            for nome, valor in cache_response.headers.items():
+                if nome != "content-length":
+                    response.headers[nome] = valor
+            if backend is not None:
+                response.headers["X-Cache"] = estado
+            return response
+
+        wrapper.__signature__ = assinatura.replace(parameters=parametros)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,201 @@
+import gzip
+from typing import Callable, Dict, Optional
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Codecs opcionais: sem o pacote instalado o algoritmo simplesmente não é oferecido
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# Ordem de preferência do servidor quando o cliente aceita vários com o mesmo peso
+PREFERENCIA_ENCODINGS = ("zstd", "br", "gzip")
+
+CONTENT_TYPES_COMPRIMIVEIS = ("text/", "application/json", "application/javascript", "application/xml")
+
+
+def encodings_disponiveis() -> tuple:
+    """Retorna os encodings suportados neste ambiente"""
+    disponiveis = []
+    for encoding in PREFERENCIA_ENCODINGS:
+        if encoding == "zstd" and zstandard is None:
+            continue
+        if encoding == "br" and brotli is None:
+            continue
+        disponiveis.append(encoding)
+    return tuple(disponiveis)
+
+
+def negociar_encoding(accept_encoding: str, disponiveis: tuple) -> Optional[str]:
+    """
+    Escolhe o encoding a partir do header Accept-Encoding (com pesos q)
+    """
+    pesos: Dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        nome, _, params = parte.partition(";")
+        peso = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                peso = float(params[2:])
+            except ValueError:
+                peso = 0.0
+        pesos[nome.strip().lower()] = peso
+
+    melhor, melhor_peso = None, 0.0
+    for encoding in disponiveis:
+        peso = pesos.get(encoding, pesos.get("*", 0.0))
+        if peso > melhor_peso:
+            melhor, melhor_peso = encoding, peso
+    return melhor
+
+
+def etag_com_encoding(etag: str, encoding: str) -> str:
+    """ETag da representação codificada: `"abc"` -> `"abc-gzip"` (mantém o W/ de ETags fracas)"""
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _if_none_match_sem_encoding(scope: Scope, encoding: str) -> Scope:
+    """
+    Remove do If-None-Match o sufixo do encoding negociado
+
+    Assim a validação na rota compara com o ETag da representação base. Tags
+    com sufixo de outro encoding ficam como estão e não casam (a representação
+    que o cliente tem não é a que seria enviada agora).
+    """
+    sufixo = f'-{encoding}"'
+    headers = []
+    for nome, valor in scope["headers"]:
+        if nome == b"if-none-match":
+            tags = [tag.strip() for tag in valor.decode("latin-1").split(",")]
+            tags = [tag[:-len(sufixo)] + '"' if tag.endswith(sufixo) else tag for tag in tags]
+            valor = ", ".join(tags).encode("latin-1")
+        headers.append((nome, valor))
+    return {**scope, "headers": headers}
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compressão de respostas (zstd, brotli ou gzip)
+
+    Respostas menores que `minimum_size` ou de tipos não textuais são enviadas
+    sem alteração. Corpos a partir de `threadpool_min_size` são comprimidos
+    fora do event loop. Respostas de tipos comprimíveis e 304 levam
+    `Vary: Accept-Encoding`; com um encoding negociado o ETag recebe o sufixo
+    do encoding, para que cada representação tenha seu próprio validador.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        zstd_level: int = 3,
+        threadpool_min_size: int = 65536
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.threadpool_min_size = threadpool_min_size
+        self.disponiveis = encodings_disponiveis()
+        self.compressores: Dict[str, Callable[[bytes], bytes]] = {
+            "gzip": lambda body: gzip.compress(body, compresslevel=gzip_level),
+        }
+        if brotli is not None:
+            self.compressores["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+        if zstandard is not None:
+            # ZstdCompressor não é thread-safe: um por chamada (corpos grandes vão para o threadpool)
+            self.compressores["zstd"] = lambda body: zstandard.ZstdCompressor(level=zstd_level).compress(body)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negociar_encoding(headers.get("accept-encoding", ""), self.disponiveis)
+        if encoding is not None and "if-none-match" in headers:
+            scope = _if_none_match_sem_encoding(scope, encoding)
+
+        responder = _RespostaComprimida(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _RespostaComprimida:
+    """Intercepta as mensagens de uma resposta para comprimir o corpo"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.destino = send
+        self.inicio: Optional[Message] = None
+        self.repassar = False
+
+    async def send(self, message: Message) -> None:
+        if self.repassar:
+            await self.destino(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self.inicio = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self.destino(message)
+            return
+
+        headers = MutableHeaders(raw=self.inicio["headers"])
+        body = message.get("body", b"")
+        self._negociar_headers(headers)
+
+        # Respostas em streaming seguem sem compressão
+        if self.encoding is None or message.get("more_body", False) or not self._comprimivel(headers, body):
+            self.repassar = True
+            await self.destino(self.inicio)
+            await self.destino(message)
+            return
+
+        compressor = self.middleware.compressores[self.encoding]
+        if len(body) >= self.middleware.threadpool_min_size:
+            comprimido = await anyio.to_thread.run_sync(compressor, body)
+        else:
+            comprimido = compressor(body)
+
+        if len(comprimido) < len(body):
+            body = comprimido
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(body))
+
+        self.repassar = True
+        await self.destino(self.inicio)
+        await self.destino({"type": "http.response.body", "body": body})
+
+    def _negociar_headers(self, headers: MutableHeaders) -> None:
+        """Vary e ETag por encoding nas respostas cuja representação depende do Accept-Encoding"""
+        if "content-encoding" in headers:
+            return
+        if self.inicio["status"] != 304 and not headers.get("content-type", "").startswith(CONTENT_TYPES_COMPRIMIVEIS):
+            return
+        headers.add_vary_header("Accept-Encoding")
+        if self.encoding is not None and "etag" in headers:
+            headers["ETag"] = etag_com_encoding(headers["etag"], self.encoding)
+
+    def _comprimivel(self, headers: MutableHeaders, body: bytes) -> bool:
+        if len(body) < self.middleware.minimum_size:
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(CONTENT_TYPES_COMPRIMIVEIS)
@@ -21,15 +21,60 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
+    principal_cache_ttl_seconds: float = 30.0  # usuários autenticados em cache (0 desativa)
+    principal_cache_max_entries: int = 10000
+    token_cache_max_entries: int = 4096  # tokens JWT já verificados (0 desativa)
+    hash_pool_workers: int = 2  # processos dedicados ao bcrypt (0 = threadpool)
+    hash_pool_max_queue: int = 64  # operações aguardando além das em execução
     
     # Banco de dados
     database_url: str = "sqlite:///./sql_app.db"
+    data_version_refresh_seconds: float = 2.0  # releitura das versões gravadas por outros processos
+    snapshot_enabled: bool = False  # leituras de pagamento servidas por cópia colunar em memória (requer numpy)
+    bulk_max_items: int = 5000  # itens por requisição nas rotas POST /bulk
+    write_behind_enabled: bool = False  # POST /pagamentos/ agrupa as inclusões em transações compartilhadas
+    write_behind_max_batch: int = 500  # itens por transação da fila de escrita
+    write_behind_window_ms: float = 20.0  # espera máxima, a partir do primeiro item, para completar um lote
+    write_behind_max_queue: int = 10000  # itens aguardando gravação; além disso, 503
+    hll_precision: int = 11  # sketches de beneficiários distintos: m = 2^p registradores, erro ~1,04/√m
     
     # CORS
     allowed_origins: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
     
     # Logs
     log_level: str = "INFO"
+    server_timing_enabled: bool = True  # header Server-Timing e log de tempos por etapa de cada requisição
+    server_timing_log_min_ms: float = 0.0  # só registra no log requisições a partir dessa duração
+    slow_query_ms: float = 100.0  # comandos SQL a partir dessa duração vão para o log (0 desativa)
+    slow_query_explain: bool = True  # inclui o EXPLAIN QUERY PLAN no log de consultas lentas
+    slow_query_log_params: bool = False  # valores dos parâmetros no log de consultas lentas (senão só quantidade e tipos)
+    sql_stats_max_shapes: int = 500  # formatos distintos de SQL acompanhados em /metricas/sql
+    
+    # Compressão de respostas
+    compression_enabled: bool = True
+    compression_minimum_size: int = 1024  # bytes
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5
+    compression_zstd_level: int = 3
+    compression_threadpool_min_size: int = 65536  # bytes; acima disso comprime fora do event loop
+    
+    # Cache de respostas: memory (em processo), redis, local (substituto do redis) ou none
+    cache_backend: str = "memory"
+    cache_ttl_seconds: float = 60.0
+    cache_max_bytes: int = 64 * 1024 * 1024  # limite do backend em memória (LRU)
+    cache_redis_url: str = "redis://localhost:6379/0"
+    entity_cache_max_entries: int = 10000  # registros por tabela no cache por ID
+    single_flight_enabled: bool = True  # requisições idênticas simultâneas compartilham uma execução
+    single_flight_max_wait_seconds: float = 5.0  # espera máxima pela execução compartilhada (0 = sem limite)
+    
+    # Aquecimento na inicialização: background (padrão; só a readiness espera), foreground (antes de atender) ou off
+    warmup_mode: str = "background"
+    warmup_queries: List[str] = [  # consultas executadas direto nos serviços para aquecer tabelas e caches
+        "estatisticas",
+        "rankings",
+        "serie_temporal",
+        "entidades",
+    ]
     
     class Config:
         env_file = ".env"
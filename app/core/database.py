@@ -1,20 +1,62 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from app.core.instrumentation import instrumentar_engine
+from app.core.timing import medir
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+# Tempo e quantidade de comandos por requisição, estatísticas por formato e log de consultas lentas
+instrumentar_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class Base(DeclarativeBase):
     pass
 
+def ensure_columns(bind=engine) -> None:
+    """
+    Adiciona às tabelas existentes as colunas novas dos modelos
+
+    `create_all` não altera tabelas já criadas; bancos anteriores a uma
+    coluna recebem um ALTER TABLE ... ADD COLUMN com o `server_default`.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existentes = {coluna["name"] for coluna in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existentes or column.server_default is None:
+                    continue
+                tipo = column.type.compile(dialect=bind.dialect)
+                nulidade = "" if column.nullable else " NOT NULL"
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {tipo}{nulidade} "
+                    f"DEFAULT {column.server_default.arg}"
+                ))
+
+def begin_immediate(db) -> None:
+    """
+    Toma já a trava de escrita do SQLite na transação da sessão (BEGIN IMMEDIATE)
+
+    O pysqlite só inicia a transação no primeiro comando de escrita; leituras
+    anteriores a ele não impedem outro escritor de alterar as mesmas linhas.
+    Para ler e depois alterar com base no que foi lido (deltas de agregados),
+    a trava é tomada antes da leitura. Sem efeito se a transação já escreveu.
+    """
+    conexao = db.connection()
+    if not conexao.connection.driver_connection.in_transaction:
+        conexao.exec_driver_sql("BEGIN IMMEDIATE")
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        # Encerrar a sessão (rollback e devolução da conexão) também é tempo de banco
+        with medir("db"):
+            db.close()
\ No newline at end of file
@@ -1,24 +1,89 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Response, status
+from fastapi.security import APIKeyHeader, HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.core.cache import EntityCache, principal_cache
 from app.core.database import get_db
 from app.core.security import verify_token
+from app.core.timing import medir
+from app.core.versioning import data_versions, format_http_date, not_modified
+from app.services.api_key import authenticate_api_key, credencial_api_key, hash_api_key
 from app.services.user import get_user_by_username
 from app.models.user import User
 
 # Configurar o esquema de segurança Bearer
-security = HTTPBearer()
+security = HTTPBearer(auto_error=False)
+
+# Alternativa para clientes automatizados: API key emitida por um admin
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+def _usuario_por_api_key(db: Session, api_key: str) -> User:
+    """
+    Autentica por API key: digest SHA-256 buscado no cache de principais ou no banco
+    """
+    credencial = credencial_api_key(hash_api_key(api_key))
+    dados = principal_cache.get(credencial)
+    if dados is not None:
+        return User(**dados)
+
+    resultado = authenticate_api_key(db, api_key)
+    if resultado is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="API key inválida, revogada ou expirada",
+        )
+    user, expira_em = resultado
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usuário inativo"
+        )
+
+    # A entrada não sobrevive à expiração da chave
+    ttl = None
+    if expira_em is not None:
+        ttl = (expira_em - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+    principal_cache.set(credencial, EntityCache.to_dict(user), ttl)
+    return user
 
 def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    api_key: Optional[str] = Depends(api_key_header),
     db: Session = Depends(get_db)
 ) -> User:
     """
-    Obtém o usuário atual a partir do token JWT
+    Obtém o usuário atual a partir do token JWT ou do header X-API-Key
+
+    O usuário é lido do cache de principais (por token ou digest da API key)
+    quando possível; o objeto retornado nesse caso não está ligado à sessão.
+    O tempo gasto entra na etapa "auth" do Server-Timing.
     """
+    with medir("auth"):
+        return _autenticar(db, credentials, api_key)
+
+def _autenticar(
+    db: Session,
+    credentials: Optional[HTTPAuthorizationCredentials],
+    api_key: Optional[str]
+) -> User:
+    if api_key:
+        return _usuario_por_api_key(db, api_key)
+
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
     token = credentials.credentials
     token_data = verify_token(token)
     
+    dados = principal_cache.get(token)
+    if dados is not None:
+        return User(**dados)
+    
     user = get_user_by_username(db, username=token_data["username"])
     if user is None:
         raise HTTPException(
@@ -33,6 +98,7 @@ def get_current_user(
             detail="Usuário inativo"
         )
     
+    principal_cache.set(token, EntityCache.to_dict(user))
     return user
 
 def get_admin_user(
@@ -54,4 +120,29 @@ def get_current_active_user(
     """
     Obtém usuário ativo (admin ou leitor)
     """
-    return current_user
\ No newline at end of file
+    return current_user
+
+def conditional_get(*tabelas: str):
+    """
+    Dependência de GET condicional baseada na versão dos dados
+
+    Responde 304 (sem executar a rota) quando o cliente já possui a versão
+    atual; caso contrário adiciona ETag/Last-Modified à resposta.
+    """
+    def verificar_versao(
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
+        if_modified_since: Optional[str] = Header(None),
+        current_user: User = Depends(get_current_active_user)
+    ) -> None:
+        etag, last_modified = data_versions.validators(*tabelas)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_http_date(last_modified),
+            "Cache-Control": "private, no-cache"
+        }
+        if not_modified(if_none_match, if_modified_since, etag, last_modified):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return verificar_versao
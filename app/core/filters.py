@@ -1,7 +1,17 @@
-from typing import Type, Dict, Any, Optional
+from typing import Type, Dict, Any, List, Optional
 from sqlalchemy.orm import Query
 from sqlalchemy import and_, or_
 
+# Operadores por sufixo da chave (ex.: ano_referencia_gte)
+OPERADORES = {
+    'eq': lambda column, value: column == value,
+    'like': lambda column, value: column.ilike(f'%{value}%'),
+    'gt': lambda column, value: column > value,
+    'gte': lambda column, value: column >= value,
+    'lt': lambda column, value: column < value,
+    'lte': lambda column, value: column <= value,
+}
+
 class FilterBuilder:
     """
     Constrói filtros dinâmicos para queries SQLAlchemy
@@ -14,22 +24,63 @@ class FilterBuilder:
         """
         Aplica filtros dinâmicos na query
         """
+        conditions = self.build_conditions(filters)
+        
+        # Aplicar todas as condições com AND
+        if conditions:
+            query = query.filter(and_(*conditions))
+            
+        return query
+    
+    def build_conditions(self, filters: Dict[str, Any], strict: bool = False) -> List[Any]:
+        """
+        Condições dos filtros (para usar em SELECT, UPDATE ou DELETE)
+
+        No modo estrito (operações em massa) nenhum filtro é descartado em
+        silêncio: chaves desconhecidas geram ValueError e valores vazios
+        também, em vez de ampliar o conjunto de linhas afetadas. As chaves
+        só valem contra as colunas da tabela (com sufixo de operador
+        conhecido) e a busca geral `search` não é aceita.
+        """
         conditions = []
         
         for key, value in filters.items():
-            if not value or value == '':  # Ignorar filtros vazios
+            if value is None or value == '':  # Ignorar filtros vazios
+                if strict:
+                    raise ValueError(f"Filtro '{key}' sem valor")
+                continue
+            if not value and not strict:
                 continue
                 
-            condition = self._build_condition(key, value)
+            if strict:
+                condition = self._build_strict_condition(key, value)
+            else:
+                condition = self._build_condition(key, value)
             if condition is not None:
                 conditions.append(condition)
+            elif strict:
+                raise ValueError(f"Filtro desconhecido: '{key}'")
         
-        # Aplicar todas as condições com AND
-        if conditions:
-            query = query.filter(and_(*conditions))
-            
-        return query
+        return conditions
     
+    def _build_strict_condition(self, key: str, value: Any):
+        """Condição do modo estrito: coluna da tabela + operador conhecido, valor escalar"""
+        if key == 'search':
+            raise ValueError("A busca geral 'search' não é aceita em operações em massa")
+        if not isinstance(value, (str, int, float)):
+            raise ValueError(f"Filtro '{key}' deve ter um valor simples (texto ou número)")
+
+        columns = self.model_class.__table__.columns
+        if key in columns:
+            field_name, operator = key, 'eq'
+        elif '_' in key:
+            field_name, operator = key.rsplit('_', 1)
+        else:
+            return None
+        if field_name not in columns or operator not in OPERADORES:
+            return None
+        return OPERADORES[operator](getattr(self.model_class, field_name), value)
+
     def _build_condition(self, key: str, value: Any):
         """Constrói uma condição individual"""
         
@@ -37,6 +88,10 @@ class FilterBuilder:
         if key == 'search':
             return self._build_search_condition(value)
         
+        # Campo com "_" no nome (ex.: ano_referencia, fk_programa) é filtro exato
+        if hasattr(self.model_class, key):
+            return getattr(self.model_class, key) == value
+        
         # Filtros com operadores
         if '_' in key:
             field_name, operator = key.rsplit('_', 1)
@@ -49,21 +104,8 @@ class FilterBuilder:
             
         column = getattr(self.model_class, field_name)
         
-        # Aplicar operador
-        if operator == 'eq':
-            return column == value
-        elif operator == 'like':
-            return column.ilike(f'%{value}%')
-        elif operator == 'gt':
-            return column > value
-        elif operator == 'gte':
-            return column >= value
-        elif operator == 'lt':
-            return column < value
-        elif operator == 'lte':
-            return column <= value
-            
-        return column == value
+        # Aplicar operador (sufixo desconhecido vira igualdade)
+        return OPERADORES.get(operator, OPERADORES['eq'])(column, value)
     
     def _build_search_condition(self, search_term: str):
         """
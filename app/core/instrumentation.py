@@ -0,0 +1,190 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.timing import medicoes_atuais, registrar
+
+logger = logging.getLogger(__name__)
+
+# Listas de parâmetros de tamanho variável (IN expandido, VALUES em lote) viram um único formato
+_LISTA_PARAMETROS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACOS = re.compile(r"\s+")
+COMANDOS_COM_PLANO = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+MAX_PARAMETROS_LOG = 20
+# Comandos nessas tabelas nunca têm os valores no log nem passam pelo EXPLAIN (senhas e hashes de chaves)
+TABELAS_SENSIVEIS = re.compile(r"\b(users|api_keys)\b", re.IGNORECASE)
+
+
+def formato_sql(statement: str) -> str:
+    """Forma normalizada do comando: espaços colapsados e listas de `?` resumidas"""
+    return _LISTA_PARAMETROS.sub("(?, ...)", _ESPACOS.sub(" ", statement).strip())
+
+
+def sensivel(statement: str) -> bool:
+    return TABELAS_SENSIVEIS.search(statement) is not None
+
+
+def _resumir_parametros(parameters: Any, executemany: bool, valores: bool = False) -> Any:
+    """
+    Parâmetros para o log de consultas lentas
+
+    Sem `valores`, só a quantidade e os tipos (o padrão: os valores podem ser
+    dados pessoais ou credenciais).
+    """
+    if executemany:
+        parametros = list(parameters)
+        primeira = _resumir_parametros(parametros[0], False, valores) if parametros else None
+        return {"linhas": len(parametros), "primeira": primeira}
+    if not valores:
+        if isinstance(parameters, dict):
+            return {"quantidade": len(parameters), "tipos": {nome: type(valor).__name__ for nome, valor in parameters.items()}}
+        parametros = list(parameters or ())
+        return {"quantidade": len(parametros), "tipos": [type(valor).__name__ for valor in parametros[:MAX_PARAMETROS_LOG]]}
+    if isinstance(parameters, (list, tuple)) and len(parameters) > MAX_PARAMETROS_LOG:
+        return [*parameters[:MAX_PARAMETROS_LOG], f"... +{len(parameters) - MAX_PARAMETROS_LOG}"]
+    return parameters
+
+
+def explicar(cursor, statement: str, parameters: Any, executemany: bool) -> Optional[List[str]]:
+    """
+    EXPLAIN QUERY PLAN do comando, na mesma conexão DBAPI
+
+    Usa um cursor novo do driver, sem passar pelos eventos do SQLAlchemy.
+    Retorna None para comandos sem plano (BEGIN, PRAGMA...) ou se falhar.
+    """
+    if not statement.lstrip().upper().startswith(COMANDOS_COM_PLANO):
+        return None
+    if executemany:
+        parameters = next(iter(parameters), ())
+    try:
+        linhas = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    except Exception:
+        return None
+    return [linha[-1] for linha in linhas]
+
+
+class SqlStats:
+    """
+    Estatísticas dos comandos SQL por formato (para achar as consultas caras)
+
+    Cada formato acumula execuções, tempo total e máximo e quantas passaram
+    do limiar de lentidão, com o último plano capturado. Até `max_formatos`
+    formatos distintos; os novos além disso só entram nos totais.
+    """
+
+    def __init__(self, max_formatos: int = 500):
+        self.max_formatos = max_formatos
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._formatos: Dict[str, Dict[str, Any]] = {}
+            self.comandos = 0
+            self.lentos = 0
+            self.tempo_total_ms = 0.0
+            self.formatos_descartados = 0
+
+    def registrar(self, statement: str, duracao_ms: float, lento: bool, plano: Optional[List[str]] = None) -> None:
+        formato = formato_sql(statement)
+        with self._lock:
+            self.comandos += 1
+            self.tempo_total_ms += duracao_ms
+            self.lentos += lento
+            dados = self._formatos.get(formato)
+            if dados is None:
+                if len(self._formatos) >= self.max_formatos:
+                    self.formatos_descartados += 1
+                    return
+                dados = self._formatos[formato] = {
+                    "execucoes": 0, "tempo_total_ms": 0.0, "tempo_max_ms": 0.0, "lentas": 0, "plano": None
+                }
+            dados["execucoes"] += 1
+            dados["tempo_total_ms"] += duracao_ms
+            dados["tempo_max_ms"] = max(dados["tempo_max_ms"], duracao_ms)
+            if lento:
+                dados["lentas"] += 1
+                if plano is not None:
+                    dados["plano"] = plano
+
+    def top(self, limite: int = 20, apenas_lentas: bool = False) -> List[Dict[str, Any]]:
+        """Formatos com maior tempo acumulado"""
+        with self._lock:
+            itens = [
+                {"sql": formato, **dados, "plano": list(dados["plano"]) if dados["plano"] else None}
+                for formato, dados in self._formatos.items()
+                if dados["lentas"] or not apenas_lentas
+            ]
+        itens.sort(key=lambda item: item["tempo_total_ms"], reverse=True)
+        for item in itens:
+            item["tempo_medio_ms"] = item["tempo_total_ms"] / item["execucoes"]
+        return itens[:limite]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limiar_lenta_ms": settings.slow_query_ms,
+                "comandos": self.comandos,
+                "lentos": self.lentos,
+                "tempo_total_ms": self.tempo_total_ms,
+                "formatos": len(self._formatos),
+                "formatos_descartados": self.formatos_descartados,
+            }
+
+
+sql_stats = SqlStats(settings.sql_stats_max_shapes)
+
+
+def instrumentar_engine(engine) -> None:
+    """
+    Listeners de execução de comandos no engine
+
+    Cada comando soma tempo e quantidade à etapa "db" da requisição
+    (Server-Timing) e entra nas estatísticas por formato. Comandos acima de
+    SLOW_QUERY_MS vão para o log com a rota, os parâmetros (só quantidade e
+    tipos, salvo SLOW_QUERY_LOG_PARAMS) e o EXPLAIN QUERY PLAN (se
+    SLOW_QUERY_EXPLAIN). Comandos em users e api_keys não têm valores no log
+    nem EXPLAIN.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_comandos", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        duracao_ms = (time.perf_counter() - conn.info["inicio_comandos"].pop()) * 1000
+        registrar("db", duracao_ms, quantidade=1)
+
+        lento = 0 < settings.slow_query_ms <= duracao_ms
+        plano = None
+        if lento:
+            restrito = sensivel(statement)
+            if settings.slow_query_explain and not restrito:
+                plano = explicar(cursor, statement, parameters, executemany)
+            medicoes = medicoes_atuais()
+            parametros = _resumir_parametros(
+                parameters, executemany, settings.slow_query_log_params and not restrito
+            )
+            logger.warning(
+                "Consulta lenta (%.1f ms) em %s: %s | parâmetros: %s | plano: %s",
+                duracao_ms, medicoes.rota if medicoes else "-", formato_sql(statement), parametros,
+                "; ".join(plano) if plano else "-",
+                extra={
+                    "duracao_ms": round(duracao_ms, 2),
+                    "rota": medicoes.rota if medicoes else None,
+                    "sql": statement,
+                    "parametros": parametros,
+                    "plano": plano,
+                },
+            )
+        sql_stats.registrar(statement, duracao_ms, lento, plano)
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto):
+        conn = contexto.connection
+        if conn is not None and conn.info.get("inicio_comandos"):
+            conn.info["inicio_comandos"].pop()
@@ -1,6 +1,7 @@
-from typing import Type, Optional, Any
+from typing import Type, Optional, Any, Tuple
 from sqlalchemy.orm import Query
 from sqlalchemy import desc, asc
+from app.core.timing import medir
 
 def paginate_query(
     query: Query,
@@ -14,10 +15,7 @@ def paginate_query(
     Aplica paginação e ordenação em uma query
     """
     # Validações
-    if page < 1:
-        page = 1
-    if size < 1 or size > 100:  # Limite máximo
-        size = 10
+    page, size = normalize_page(page, size)
     
     # Aplicar ordenação se especificada
     if sort_by and model_class:
@@ -32,22 +30,35 @@ def paginate_query(
     offset = (page - 1) * size
     
     # Total de itens
-    total = query.count()
+    with medir("count"):
+        total = query.count()
     
-    # Aplicar paginação
-    items = query.offset(offset).limit(size).all()
+    # Aplicar paginação (consulta e montagem dos objetos ORM)
+    with medir("consulta"):
+        items = query.offset(offset).limit(size).all()
     
-    # Calcular metadados
+    return {
+        "items": items,
+        "pagination": pagination_metadata(total, page, size)
+    }
+
+def normalize_page(page: int, size: int) -> Tuple[int, int]:
+    """Aplica os limites de página/tamanho usados em toda a API"""
+    if page < 1:
+        page = 1
+    if size < 1 or size > 100:  # Limite máximo
+        size = 10
+    return page, size
+
+def pagination_metadata(total: int, page: int, size: int) -> dict:
+    """Metadados de paginação da resposta"""
     total_pages = (total + size - 1) // size  # Divisão com teto
     
     return {
-        "items": items,
-        "pagination": {
-            "total": total,
-            "page": page,
-            "size": size,
-            "total_pages": total_pages,
-            "has_next": page < total_pages,
-            "has_prev": page > 1
-        }
+        "total": total,
+        "page": page,
+        "size": size,
+        "total_pages": total_pages,
+        "has_next": page < total_pages,
+        "has_prev": page > 1
     }
\ No newline at end of file
@@ -1,9 +1,18 @@
+import asyncio
+import hashlib
+import multiprocessing
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+import anyio
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from app.core.cache import CacheMetrics
 from app.core.config import settings
 
 # Configurações JWT para produção
@@ -19,6 +28,66 @@ if len(SECRET_KEY) < 32:
 # Configuração para hash de senhas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+class VerifiedTokenCache:
+    """
+    LRU de tokens já verificados: digest do token -> claims decodificadas
+
+    Clientes reutilizam o mesmo token em muitas requisições; a verificação
+    HMAC e o parsing das claims só acontecem na primeira. Cada entrada vale
+    até o `exp` do próprio token, depois disso o token volta a ser
+    verificado (e rejeitado como expirado).
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.metrics = CacheMetrics()
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        if self.max_entries <= 0:
+            return None
+        chave = self._digest(token)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] <= time.time():
+                del self._entradas[chave]
+                self.metrics.incr("expirations")
+                entrada = None
+            if entrada is None:
+                self.metrics.incr("misses")
+                return None
+            self._entradas.move_to_end(chave)
+        self.metrics.incr("hits")
+        return entrada[1]
+
+    def set(self, token: str, payload: Dict[str, Any]) -> None:
+        exp = payload.get("exp")
+        if self.max_entries <= 0 or exp is None:
+            return
+        with self._lock:
+            self._entradas[self._digest(token)] = (float(exp), payload)
+            if len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+                self.metrics.incr("evictions")
+        self.metrics.incr("sets")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entradas = len(self._entradas)
+        return {"max_entries": self.max_entries, "entries": entradas, **self.metrics.as_dict()}
+
+
+token_cache = VerifiedTokenCache(settings.token_cache_max_entries)
+
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
     """
     Cria um token JWT de acesso
@@ -52,10 +121,13 @@ def create_refresh_token(data: dict):
 
 def verify_token(token: str, token_type: str = "access"):
     """
-    Verifica e decodifica um token JWT
+    Verifica e decodifica um token JWT (claims de tokens já verificados vêm do cache)
     """
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.get(token)
+        if payload is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            token_cache.set(token, payload)
         username: str = payload.get("sub")
         user_role: str = payload.get("role")
         token_type_payload: str = payload.get("type")
@@ -97,4 +169,103 @@ def get_password_hash(password: str) -> str:
     if len(password.encode('utf-8')) > 72:
         password = password.encode('utf-8')[:72].decode('utf-8', errors='ignore')
     
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+class HashPoolSaturado(Exception):
+    """A fila do pool de hashing de senhas está cheia"""
+
+
+class PasswordHashPool:
+    """
+    Pool de processos dedicado ao bcrypt (hash e verificação de senhas)
+
+    Cada operação custa centenas de ms de CPU; rodando nos handlers ela
+    ocupava as threads compartilhadas com as rotas de dados. Aqui ela vai a
+    `workers` processos próprios, e a requisição só aguarda (sem ocupar
+    thread). No máximo `workers + max_fila` operações ficam pendentes; além
+    disso a chamada é recusada com HashPoolSaturado. Com `workers=0` o
+    bcrypt roda no threadpool, como antes.
+    """
+
+    def __init__(self, workers: int = 2, max_fila: int = 64):
+        self.workers = workers
+        self.max_fila = max_fila
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.pendentes = 0
+        self.concluidas = 0
+        self.recusadas = 0
+        self.falhas = 0
+        self.tempo_total = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Criado no primeiro uso; "spawn" evita fork de um processo com threads ativas
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        with self._lock:
+            if self.pendentes >= self.workers + self.max_fila:
+                self.recusadas += 1
+                raise HashPoolSaturado()
+            self.pendentes += 1
+            executor = self._get_executor() if self.workers > 0 else None
+
+        inicio = time.perf_counter()
+        sucesso = False
+        try:
+            if executor is None:
+                resultado = await anyio.to_thread.run_sync(func, *args)
+            else:
+                resultado = await asyncio.wrap_future(executor.submit(func, *args))
+            sucesso = True
+            return resultado
+        finally:
+            with self._lock:
+                self.pendentes -= 1
+                if sucesso:
+                    self.concluidas += 1
+                    self.tempo_total += time.perf_counter() - inicio
+                else:
+                    self.falhas += 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_fila": self.max_fila,
+                "pendentes": self.pendentes,
+                "na_fila": max(0, self.pendentes - self.workers),
+                "concluidas": self.concluidas,
+                "recusadas": self.recusadas,
+                "falhas": self.falhas,
+                "tempo_medio_ms": self.tempo_total / self.concluidas * 1000 if self.concluidas else 0.0,
+            }
+
+
+password_pool = PasswordHashPool(settings.hash_pool_workers, settings.hash_pool_max_queue)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    verify_password executado no pool de hashing
+    """
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    get_password_hash executado no pool de hashing
+    """
+    return await password_pool.run(get_password_hash, password)
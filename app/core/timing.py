@@ -0,0 +1,112 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class Medicoes:
+    """Tempos (ms) e quantidades por etapa de uma requisição"""
+
+    def __init__(self, rota: str = ""):
+        self.rota = rota
+        self.tempos: Dict[str, float] = {}
+        self.quantidades: Dict[str, int] = {}
+
+
+# Medições da requisição corrente; None fora de uma requisição medida. O objeto
+# é compartilhado com as threads do threadpool (o contexto é copiado, o objeto
+# é o mesmo), então dependências e rotas síncronas também registram nele.
+_medicoes: ContextVar[Optional[Medicoes]] = ContextVar("medicoes", default=None)
+
+
+def medicoes_atuais() -> Optional[Medicoes]:
+    return _medicoes.get()
+
+
+def registrar(etapa: str, duracao_ms: float, quantidade: int = 0) -> None:
+    """Soma `duracao_ms` (e `quantidade` ocorrências) à etapa na requisição corrente"""
+    medicoes = _medicoes.get()
+    if medicoes is not None:
+        medicoes.tempos[etapa] = medicoes.tempos.get(etapa, 0.0) + duracao_ms
+        if quantidade:
+            medicoes.quantidades[etapa] = medicoes.quantidades.get(etapa, 0) + quantidade
+
+
+@contextmanager
+def medir(etapa: str) -> Iterator[None]:
+    """Mede o bloco e soma o tempo à etapa (ex.: `with medir("count"): ...`)"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(etapa, (time.perf_counter() - inicio) * 1000)
+
+
+def formatar_server_timing(tempos: Dict[str, float], quantidades: Dict[str, int]) -> str:
+    """Header Server-Timing: `etapa;dur=1.2, ...` (ms); quantidades vão em `desc` (ex.: `db;dur=3.1;desc="7x"`)"""
+    partes = []
+    for etapa, duracao in tempos.items():
+        parte = f"{etapa};dur={duracao:.1f}"
+        if etapa in quantidades:
+            parte += f';desc="{quantidades[etapa]}x"'
+        partes.append(parte)
+    return ", ".join(partes)
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que mede as etapas de cada requisição
+
+    As etapas (auth, db, count, consulta, hidratacao, serializacao, ...) são
+    registradas pelo código da aplicação via `medir`/`registrar`. O total até
+    o início da resposta e as etapas vão no header `Server-Timing` (visível no
+    DevTools do navegador) e em uma linha de log com campos estruturados;
+    `log_min_ms` limita o log às requisições mais lentas que isso.
+    """
+
+    def __init__(self, app: ASGIApp, log_min_ms: float = 0.0):
+        self.app = app
+        self.log_min_ms = log_min_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicoes = Medicoes(f"{scope['method']} {scope['path']}")
+        token = _medicoes.set(medicoes)
+        inicio = time.perf_counter()
+
+        async def enviar(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                tempos = dict(medicoes.tempos)
+                tempos["total"] = (time.perf_counter() - inicio) * 1000
+                quantidades = dict(medicoes.quantidades)
+                MutableHeaders(scope=message).append("Server-Timing", formatar_server_timing(tempos, quantidades))
+                self._log(scope, message["status"], tempos, quantidades)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicoes.reset(token)
+
+    def _log(self, scope: Scope, status: int, tempos: Dict[str, float], quantidades: Dict[str, int]) -> None:
+        if tempos["total"] < self.log_min_ms:
+            return
+        campos = {f"tempo_{etapa}_ms": round(duracao, 2) for etapa, duracao in tempos.items()}
+        campos.update({f"quantidade_{etapa}": quantidade for etapa, quantidade in quantidades.items()})
+        logger.info(
+            "%s %s %d %.1fms %s",
+            scope["method"], scope["path"], status, tempos["total"],
+            " ".join(
+                f"{etapa}={duracao:.1f}" + (f"({quantidades[etapa]}x)" if etapa in quantidades else "")
+                for etapa, duracao in tempos.items() if etapa != "total"
+            ),
+            extra={"metodo": scope["method"], "rota": scope["path"], "status": status, **campos},
+        )
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.config import settings
+from app.core.database import engine
+from app.models.versao import VersaoDados
+
+# Tabelas de dados versionadas (alteradas pelo importador e pelas rotas de escrita)
+TABELAS_DADOS = ("beneficiario", "instituicao", "programa", "pagamento")
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class DataVersionRegistry:
+    """
+    Cache em memória das versões de cada tabela
+
+    As versões vivem na tabela `versao_dados`; o cache é relido no máximo a cada
+    `refresh_seconds` (para enxergar importações feitas por outro processo) ou
+    logo após um commit que incrementou alguma versão neste processo.
+
+    A releitura usa uma conexão própria, fora do pool das requisições: ela
+    acontece com o lock tomado, e as requisições que esperam esse lock já
+    seguram conexões do pool (com rajadas maiores que o pool, não sobraria
+    nenhuma para a releitura).
+    """
+
+    def __init__(self, refresh_seconds: float = 2.0):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._sessoes = sessionmaker(bind=create_engine(
+            engine.url, connect_args={"check_same_thread": False}, poolclass=StaticPool
+        ))
+        self._versoes: Dict[str, Tuple[int, datetime]] = {}
+        self._carregado_em: Optional[float] = None
+
+    def invalidate(self) -> None:
+        """Força a releitura das versões no próximo acesso"""
+        with self._lock:
+            self._carregado_em = None
+
+    def _snapshot(self) -> Dict[str, Tuple[int, datetime]]:
+        with self._lock:
+            agora = time.monotonic()
+            if self._carregado_em is None or agora - self._carregado_em >= self.refresh_seconds:
+                db = self._sessoes()
+                try:
+                    self._versoes = {
+                        row.tabela: (row.versao, row.atualizado_em.replace(tzinfo=timezone.utc))
+                        for row in db.query(VersaoDados).all()
+                    }
+                finally:
+                    db.close()
+                self._carregado_em = agora
+            return self._versoes
+
+    def get(self, tabela: str) -> Tuple[int, datetime]:
+        """Retorna (versão, última alteração) de uma tabela"""
+        return self._snapshot().get(tabela, (0, _EPOCA))
+
+    def token(self, *tabelas: str) -> str:
+        """Identificador estável do estado atual das tabelas informadas"""
+        partes = []
+        for tabela in sorted(tabelas or TABELAS_DADOS):
+            versao, atualizado_em = self.get(tabela)
+            partes.append(f"{tabela}:{versao}:{atualizado_em.timestamp():.6f}")
+        return "|".join(partes)
+
+    def validators(self, *tabelas: str) -> Tuple[str, datetime]:
+        """Retorna (ETag, Last-Modified) para as tabelas informadas"""
+        tabelas = tabelas or TABELAS_DADOS
+        digest = hashlib.sha1(self.token(*tabelas).encode()).hexdigest()[:20]
+        last_modified = max(self.get(tabela)[1] for tabela in tabelas)
+        return f'"{digest}"', last_modified.replace(microsecond=0)
+
+
+data_versions = DataVersionRegistry(refresh_seconds=settings.data_version_refresh_seconds)
+
+
+# Chamados após o commit de uma transação que alterou versões, com
+# (sessão, {tabela: (versão antes da transação, versão após)})
+_ouvintes_versao: List[Callable[[Session, Dict[str, Tuple[int, int]]], None]] = []
+
+
+def on_version_commit(ouvinte: Callable[[Session, Dict[str, Tuple[int, int]]], None]) -> None:
+    """Registra um ouvinte das versões alteradas por commits deste processo"""
+    _ouvintes_versao.append(ouvinte)
+
+
+def bump_data_version(db: Session, *tabelas: str) -> None:
+    """
+    Incrementa a versão das tabelas na transação corrente
+
+    O cache em memória é invalidado somente após o commit da sessão.
+    """
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    alteradas = db.info.setdefault("versoes_alteradas", {})
+    for tabela in tabelas:
+        stmt = insert(VersaoDados).values(tabela=tabela, versao=1, atualizado_em=agora)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VersaoDados.tabela],
+            set_={"versao": VersaoDados.versao + 1, "atualizado_em": agora}
+        ).returning(VersaoDados.versao)
+        versao = db.execute(stmt).scalar()
+        anterior = alteradas[tabela][0] if tabela in alteradas else versao - 1
+        alteradas[tabela] = (anterior, versao)
+
+    if not event.contains(db, "after_commit", _invalidar_versoes):
+        event.listen(db, "after_commit", _invalidar_versoes)
+        event.listen(db, "after_rollback", _descartar_versoes)
+
+
+def _invalidar_versoes(session: Session) -> None:
+    alteradas = session.info.pop("versoes_alteradas", None)
+    if alteradas:
+        for ouvinte in _ouvintes_versao:
+            ouvinte(session, alteradas)
+    data_versions.invalidate()
+
+
+def _descartar_versoes(session: Session) -> None:
+    session.info.pop("versoes_alteradas", None)
+
+
+def format_http_date(value: datetime) -> str:
+    return format_datetime(value, usegmt=True)
+
+
+def not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: str,
+    last_modified: datetime
+) -> bool:
+    """
+    Avalia as pré-condições de um GET condicional (RFC 9110)
+    """
+    if if_none_match:
+        candidatos = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidatos or any(tag.removeprefix("W/") == etag for tag in candidatos)
+
+    if if_modified_since:
+        try:
+            desde = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if desde.tzinfo is None:
+            desde = desde.replace(tzinfo=timezone.utc)
+        return last_modified <= desde
+
+    return False
@@ -1,25 +1,87 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
-from app.core.database import Base, engine
-from app.routers import beneficiario, instituicao, programa, pagamento, auth
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.timing import ServerTimingMiddleware
+from app.core.database import Base, engine, SessionLocal, ensure_columns
+from app.core.security import password_pool
+from app.services.aquecimento import MODOS_AQUECIMENTO, estado_aquecimento, executar_aquecimento
+from app.services.fila_escrita import fila_pagamentos
+from app.services.resumo import ensure_resumo_pagamentos
+from app.services.sketch import ensure_sketches_beneficiarios
+from app.routers import beneficiario, instituicao, programa, pagamento, auth, metricas
 
 # Importar modelo User para criar tabela
 from app.models.user import User
 
 # Criar todas as tabelas (incluindo users)
 Base.metadata.create_all(bind=engine)
+ensure_columns(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicialização e encerramento da aplicação"""
+    # Bancos criados antes do resumo materializado precisam calculá-lo uma vez
+    db = SessionLocal()
+    try:
+        ensure_resumo_pagamentos(db)
+        ensure_sketches_beneficiarios(db)
+    finally:
+        db.close()
+    
+    # Aquecimento: índice de distribuição, snapshot e rotas mais pesadas
+    modo = settings.warmup_mode
+    if modo not in MODOS_AQUECIMENTO:
+        raise ValueError(f"WARMUP_MODE inválido: {modo}. Use: {', '.join(MODOS_AQUECIMENTO)}")
+    tarefa = None
+    if modo == "foreground":
+        await executar_aquecimento(modo)
+    elif modo == "background":
+        tarefa = asyncio.create_task(executar_aquecimento(modo))
+    else:
+        estado_aquecimento.estado = "desativado"
+    yield
+    
+    if tarefa is not None and not tarefa.done():
+        tarefa.cancel()
+        with suppress(asyncio.CancelledError):
+            await tarefa
+    # Inclusões ainda na fila de escrita são gravadas antes de encerrar
+    await asyncio.to_thread(fila_pagamentos.encerrar)
+    password_pool.shutdown()
 
 app = FastAPI(
     title="API CNPq - Dados Abertos",
     description="API REST para consulta de dados de pagamentos do CNPq com autenticação JWT",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Compressão negociada (zstd/br/gzip) das respostas
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality,
+        zstd_level=settings.compression_zstd_level,
+        threadpool_min_size=settings.compression_threadpool_min_size
+    )
+
+# Tempos por etapa (Server-Timing); adicionado por último para envolver a compressão
+if settings.server_timing_enabled:
+    app.add_middleware(ServerTimingMiddleware, log_min_ms=settings.server_timing_log_min_ms)
+
 # Incluir TODOS os routers
 app.include_router(auth.router)           # ← ESTAVA FALTANDO
 app.include_router(beneficiario.router)
 app.include_router(instituicao.router) 
 app.include_router(programa.router)
 app.include_router(pagamento.router)
+app.include_router(metricas.router)
 
 @app.get("/")
 def read_root():
@@ -28,4 +90,35 @@ def read_root():
         "version": "1.0.0",
         "docs": "/docs",
         "auth": "JWT Bearer Token required for protected endpoints"
-    }
\ No newline at end of file
+    }
+
+@app.get("/health")
+def health():
+    """
+    Liveness: o processo está respondendo
+    """
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    """
+    Readiness: banco acessível e aquecimento concluído (ou desativado)
+    """
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        banco = True
+    except Exception:
+        banco = False
+    finally:
+        db.close()
+
+    pronto = banco and estado_aquecimento.pronto
+    return JSONResponse(
+        status_code=200 if pronto else 503,
+        content={
+            "status": "ready" if pronto else "not_ready",
+            "banco": banco,
+            "aquecimento": estado_aquecimento.as_dict(),
+        }
+    )
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from app.core.database import Base
+
+class ApiKey(Base):
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    nome = Column(String, nullable=False)
+    prefixo = Column(String, nullable=False)  # início da chave, para identificá-la nas listagens
+    key_hash = Column(String, unique=True, index=True, nullable=False)  # SHA-256 (hex) da chave
+    fk_user = Column(Integer, ForeignKey("users.id"), nullable=False)
+    is_active = Column(Boolean, default=True)
+    criado_em = Column(DateTime, nullable=False)
+    expira_em = Column(DateTime)
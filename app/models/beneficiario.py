@@ -9,4 +9,7 @@ class Beneficiario(Base):
     nome = Column(String)
     cpf_anonimizado = Column(String)
     categoria_nivel = Column(String)
-    pagamentos = relationship("Pagamento", back_populates="beneficiario")
\ No newline at end of file
+    versao = Column(Integer, nullable=False, default=1, server_default="1")  # controle otimista de concorrência
+    pagamentos = relationship("Pagamento", back_populates="beneficiario")
+
+    __mapper_args__ = {"version_id_col": versao}
@@ -11,4 +11,7 @@ class Instituicao(Base):
     cidade = Column(String)
     uf = Column(String)
     pais = Column(String)
-    pagamentos = relationship("Pagamento", back_populates="instituicao")
\ No newline at end of file
+    versao = Column(Integer, nullable=False, default=1, server_default="1")  # controle otimista de concorrência
+    pagamentos = relationship("Pagamento", back_populates="instituicao")
+
+    __mapper_args__ = {"version_id_col": versao}
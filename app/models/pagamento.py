@@ -23,4 +23,9 @@ class Pagamento(Base):
     # Relationships
     beneficiario = relationship("Beneficiario", back_populates="pagamentos")
     instituicao = relationship("Instituicao", back_populates="pagamentos")
-    programa = relationship("Programa", back_populates="pagamentos")
\ No newline at end of file
+    programa = relationship("Programa", back_populates="pagamentos")
+    
+    # Versão da linha (controle otimista de concorrência; incrementada a cada UPDATE)
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    __mapper_args__ = {"version_id_col": versao}
@@ -11,4 +11,7 @@ class Programa(Base):
     grande_area = Column(String)
     area = Column(String)
     subarea = Column(String)
-    pagamentos = relationship("Pagamento", back_populates="programa")
\ No newline at end of file
+    versao = Column(Integer, nullable=False, default=1, server_default="1")  # controle otimista de concorrência
+    pagamentos = relationship("Pagamento", back_populates="programa")
+
+    __mapper_args__ = {"version_id_col": versao}
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, Float
+from app.core.database import Base
+
+class ResumoPagamento(Base):
+    """
+    Agregados pré-calculados de pagamento por dimensão (tabela materializada)
+    """
+    __tablename__ = "resumo_pagamento"
+
+    dimensao = Column(String, primary_key=True)  # total, modalidade, ano_referencia, ...
+    chave = Column(String, primary_key=True)  # valor do grupo ("" quando não informado)
+    total_pagamentos = Column(Integer, nullable=False, default=0)
+    total_valores = Column(Integer, nullable=False, default=0)  # pagamentos com valor_pago (base da média)
+    valor_total = Column(Float, nullable=False, default=0.0)
+
+
+class ResumoEntidade(Base):
+    """
+    Totais de pagamento por entidade (beneficiário, instituição ou programa)
+
+    A granularidade (ano, modalidade, instituição) permite filtrar rankings por
+    ano, modalidade e UF somando apenas as células correspondentes. Valores
+    ausentes são gravados como 0 / "" para que a chave composta seja única.
+    """
+    __tablename__ = "resumo_entidade"
+
+    dimensao = Column(String, primary_key=True)  # beneficiario, instituicao ou programa
+    entidade = Column(Integer, primary_key=True)  # id da entidade (0 = sem vínculo)
+    ano_referencia = Column(Integer, primary_key=True)
+    modalidade = Column(String, primary_key=True)
+    fk_instituicao = Column(Integer, primary_key=True)
+    total_pagamentos = Column(Integer, nullable=False, default=0)
+    total_valores = Column(Integer, nullable=False, default=0)
+    valor_total = Column(Float, nullable=False, default=0.0)
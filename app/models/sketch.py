@@ -0,0 +1,31 @@
+from sqlalchemy import Boolean, Column, Integer, LargeBinary, String
+from app.core.database import Base
+
+class SketchBeneficiarios(Base):
+    """
+    Sketches HyperLogLog dos beneficiários distintos por dimensão e ano
+    """
+    __tablename__ = "sketch_beneficiarios"
+
+    dimensao = Column(String, primary_key=True)  # total, programa, instituicao ou modalidade
+    chave = Column(String, primary_key=True)  # valor do grupo ("" quando não informado)
+    ano_referencia = Column(Integer, primary_key=True)  # 0 quando não informado
+    registradores = Column(LargeBinary, nullable=False)  # HyperLogLog serializado
+    # Algum beneficiário saiu da célula: recalcular a partir de `sketch_contagem` na próxima leitura
+    pendente = Column(Boolean, nullable=False, default=False, server_default="0")
+
+
+class SketchContagem(Base):
+    """
+    Pagamentos de cada beneficiário por célula dos sketches (contagem exata)
+
+    Permite saber, numa remoção, se o beneficiário deixou a célula (contagem
+    zerada), sem reler os pagamentos do ano.
+    """
+    __tablename__ = "sketch_contagem"
+
+    dimensao = Column(String, primary_key=True)
+    chave = Column(String, primary_key=True)
+    ano_referencia = Column(Integer, primary_key=True)
+    fk_beneficiario = Column(Integer, primary_key=True)
+    pagamentos = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from app.core.database import Base
+
+class VersaoDados(Base):
+    __tablename__ = "versao_dados"
+
+    tabela = Column(String, primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, nullable=False)
@@ -1,13 +1,16 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.database import get_db
-from app.core.security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from app.schemas.user import UserCreate, UserResponse, Token, UserLogin
-from app.services.user import create_user, authenticate_user, get_users, get_user_by_username, get_user_by_email
+from app.core.security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, HashPoolSaturado
+from app.schemas.user import UserCreate, UserResponse, UserUpdate, Token, UserLogin
+from app.schemas.api_key import ApiKey, ApiKeyCreate, ApiKeyCreated
+from app.services.api_key import create_api_key, get_api_keys, revoke_api_key
+from app.services.user import create_user, authenticate_user, get_users, get_user_by_username, get_user_by_email, update_user
 from app.core.deps import get_admin_user, get_current_active_user
 from app.models.user import User
 
@@ -16,34 +19,47 @@ router = APIRouter(
     tags=["Autenticação"],
 )
 
+def _servidor_ocupado() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Muitas autenticações simultâneas. Tente novamente em instantes.",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """
     Registra um novo usuário
     """
     # Verificar se username já existe
-    if get_user_by_username(db, user.username):
+    if await run_in_threadpool(get_user_by_username, db, user.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username já está em uso"
         )
     
     # Verificar se email já existe
-    if get_user_by_email(db, user.email):
+    if await run_in_threadpool(get_user_by_email, db, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email já está em uso"
         )
     
     # Criar usuário
-    return create_user(db=db, user=user)
+    try:
+        return await create_user(db=db, user=user)
+    except HashPoolSaturado:
+        raise _servidor_ocupado()
 
 @router.post("/login", response_model=Token)
-def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
     """
     Login do usuário
     """
-    user = authenticate_user(db, user_data.username, user_data.password)
+    try:
+        user = await authenticate_user(db, user_data.username, user_data.password)
+    except HashPoolSaturado:
+        raise _servidor_ocupado()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,14 +80,17 @@ def login_user(user_data: UserLogin, db: Session = Depends(get_db)):
     }
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     """
     Endpoint para compatibilidade com OAuth2PasswordRequestForm
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except HashPoolSaturado:
+        raise _servidor_ocupado()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -109,4 +128,65 @@ def list_users(
     Lista todos os usuários (apenas admin)
     """
     users = get_users(db, skip=skip, limit=limit)
-    return users
\ No newline at end of file
+    return users
+
+@router.patch("/users/{user_id}", response_model=UserResponse)
+def update_user_route(
+    user_id: int,
+    user_update: UserUpdate,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user)
+):
+    """
+    Ativa/desativa um usuário ou altera seu papel (apenas admin)
+    """
+    db_user = update_user(db, user_id=user_id, user_update=user_update)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    return db_user
+
+@router.post("/api-keys", response_model=ApiKeyCreated, status_code=status.HTTP_201_CREATED)
+def create_api_key_route(
+    api_key: ApiKeyCreate,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user)
+):
+    """
+    Emite uma API key para clientes automatizados (apenas admin)
+
+    A chave é exibida apenas nesta resposta; o banco guarda só o seu SHA-256.
+    Use-a no header `X-API-Key` no lugar do token JWT.
+    """
+    username = api_key.username or admin_user.username
+    dono = get_user_by_username(db, username)
+    if dono is None:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    db_api_key, chave = create_api_key(db, dono, api_key.nome, api_key.expira_em_dias)
+    return {**ApiKey.model_validate(db_api_key).model_dump(), "api_key": chave}
+
+@router.get("/api-keys", response_model=List[ApiKey])
+def list_api_keys(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user)
+):
+    """
+    Lista as API keys emitidas, sem o segredo (apenas admin)
+    """
+    return get_api_keys(db, skip=skip, limit=limit)
+
+@router.delete("/api-keys/{api_key_id}")
+def revoke_api_key_route(
+    api_key_id: int,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_admin_user)
+):
+    """
+    Revoga uma API key (apenas admin)
+    """
+    db_api_key = revoke_api_key(db, api_key_id)
+    if db_api_key is None:
+        raise HTTPException(status_code=404, detail="API key não encontrada")
+    return {"message": "API key revogada com sucesso"}
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from app.schemas.beneficiario import Beneficiario, BeneficiarioCreate
-from app.services.beneficiario import get_beneficiario, create_beneficiario
+from app.schemas.beneficiario import Beneficiario, BeneficiarioCreate, BeneficiarioUpdate
+from app.services.beneficiario import get_beneficiario, create_beneficiario, create_beneficiarios_bulk, update_beneficiario, patch_beneficiario, delete_beneficiario
 from app.models.beneficiario import Beneficiario as BeneficiarioModel
+from app.services.lote import LoteError
+from app.services.atualizacao import ConflitoDeVersao
+from app.services.ranking import ranking_entidades, MEDIDAS_RANKING
+from app.services.estatisticas import calcular_estatisticas
 from app.core.database import get_db
-from app.core.deps import get_current_active_user, get_admin_user
+from app.core.cache import cached_response, entity_cache
+from app.core.deps import get_current_active_user, get_admin_user, conditional_get
 from app.core.pagination import paginate_query
 from app.core.filters import FilterBuilder
 from app.models.user import User
@@ -16,6 +21,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=Dict[str, Any])
+@cached_response("beneficiario")
 def read_beneficiarios_enhanced(
     # Parâmetros de paginação
     page: int = Query(1, ge=1, description="Número da página"),
@@ -90,28 +96,53 @@ def read_beneficiarios_enhanced(
         "filters_applied": filters
     }
 
-@router.get("/stats", response_model=Dict[str, Any])
+@router.get("/stats", response_model=Dict[str, Any], dependencies=[Depends(conditional_get("beneficiario"))])
+@cached_response("beneficiario")
 def get_beneficiarios_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Estatísticas dos beneficiários"""
-    from sqlalchemy import func
-    
-    total_beneficiarios = db.query(BeneficiarioModel).count()
-    por_categoria = db.query(
-        BeneficiarioModel.categoria_nivel, 
-        func.count(BeneficiarioModel.id).label('total')
-    ).group_by(BeneficiarioModel.categoria_nivel).all()
+    """Estatísticas dos beneficiários (uma única consulta agrupada)"""
+    estatisticas = calcular_estatisticas(db, BeneficiarioModel, ["categoria_nivel"])
     
     return {
-        "total_beneficiarios": total_beneficiarios,
+        "total_beneficiarios": estatisticas.total,
         "por_categoria": [
-            {"categoria_nivel": categoria or "Não informado", "total": total} 
-            for categoria, total in por_categoria
+            {"categoria_nivel": grupo["chave"] or "Não informado", "total": grupo["total"]}
+            for grupo in estatisticas.por("categoria_nivel")
         ]
     }
 
+@router.get("/ranking", response_model=Dict[str, Any], dependencies=[Depends(conditional_get())])
+@cached_response()
+def get_beneficiarios_ranking(
+    by: str = Query("sum", description=f"Medida: {', '.join(MEDIDAS_RANKING)} de valor_pago"),
+    limit: int = Query(20, ge=1, le=1000, description="Quantidade de beneficiários no ranking"),
+    ano_referencia: Optional[int] = Query(None, description="Filtro por ano"),
+    modalidade: Optional[str] = Query(None, description="Filtro por modalidade"),
+    uf: Optional[str] = Query(None, description="UF da instituição do pagamento"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Top-N beneficiários por valor pago (sum) ou quantidade de pagamentos (count)
+    
+    Exemplo: /beneficiarios/ranking?by=sum&limit=20&ano_referencia=2024
+    """
+    if by not in MEDIDAS_RANKING:
+        raise HTTPException(status_code=400, detail=f"by inválido. Opções: {', '.join(MEDIDAS_RANKING)}")
+    
+    filters = {"ano_referencia": ano_referencia, "modalidade": modalidade, "uf": uf}
+    filters = {k: v for k, v in filters.items() if v is not None and v != ''}
+    resultado = ranking_entidades(db, "beneficiario", medida=by, limite=limit, **filters)
+    
+    return {
+        "by": by,
+        "limit": limit,
+        "filters_applied": filters,
+        **resultado
+    }
+
 @router.get("/{beneficiario_id}", response_model=Beneficiario)
 def read_beneficiario_route(
     beneficiario_id: int,
@@ -119,7 +150,7 @@ def read_beneficiario_route(
     current_user: User = Depends(get_current_active_user)
 ):
     """Busca beneficiário por ID"""
-    db_beneficiario = get_beneficiario(db, beneficiario_id=beneficiario_id)
+    db_beneficiario = entity_cache.get(db, BeneficiarioModel, beneficiario_id)
     if db_beneficiario is None:
         raise HTTPException(status_code=404, detail="Beneficiário não encontrado")
     return db_beneficiario
@@ -133,6 +164,27 @@ def create_beneficiario_route(
     """Cria um novo beneficiário (apenas admin)"""
     return create_beneficiario(db=db, beneficiario=beneficiario)
 
+@router.post("/bulk", response_model=Dict[str, Any])
+def create_beneficiarios_bulk_route(
+    itens: List[Any] = Body(..., description="Lista de beneficiários a criar"),
+    atomico: bool = Query(False, description="Rejeita o lote inteiro se algum item for inválido"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Cria beneficiários em lote, em uma única transação (apenas admin)
+
+    Retorna o resultado de cada item (criado com id, ou erros de validação) e
+    a vazão do lote. Sem `atomico`, os itens válidos são criados mesmo que
+    outros tenham erros.
+    """
+    try:
+        return create_beneficiarios_bulk(db, itens, atomico=atomico)
+    except LoteError as e:
+        if e.resultado is None:
+            raise HTTPException(status_code=413, detail=str(e))
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), **e.resultado})
+
 @router.put("/{beneficiario_id}", response_model=Beneficiario)
 def update_beneficiario_route(
     beneficiario_id: int,
@@ -145,11 +197,28 @@ def update_beneficiario_route(
     if db_beneficiario is None:
         raise HTTPException(status_code=404, detail="Beneficiário não encontrado")
     
-    for key, value in beneficiario.dict(exclude_unset=True).items():
-        setattr(db_beneficiario, key, value)
-    
-    db.commit()
-    db.refresh(db_beneficiario)
+    return update_beneficiario(db, db_beneficiario, beneficiario)
+
+@router.patch("/{beneficiario_id}", response_model=Beneficiario)
+def patch_beneficiario_route(
+    beneficiario_id: int,
+    beneficiario: BeneficiarioUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Atualiza parcialmente um beneficiário (apenas admin)
+
+    Só os campos enviados são alterados, em um único UPDATE ... RETURNING.
+    Com `versao` (a lida no GET) a alteração é rejeitada com 409 se o
+    registro tiver mudado desde então.
+    """
+    try:
+        db_beneficiario = patch_beneficiario(db, beneficiario_id, beneficiario)
+    except ConflitoDeVersao as e:
+        raise HTTPException(status_code=409, detail={"mensagem": str(e), "versao_atual": e.versao_atual})
+    if db_beneficiario is None:
+        raise HTTPException(status_code=404, detail="Beneficiário não encontrado")
     return db_beneficiario
 
 @router.delete("/{beneficiario_id}")
@@ -163,6 +232,5 @@ def delete_beneficiario_route(
     if db_beneficiario is None:
         raise HTTPException(status_code=404, detail="Beneficiário não encontrado")
     
-    db.delete(db_beneficiario)
-    db.commit()
+    delete_beneficiario(db, db_beneficiario)
     return {"message": "Beneficiário deletado com sucesso"}
\ No newline at end of file
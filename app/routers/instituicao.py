@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from app.schemas.instituicao import Instituicao, InstituicaoCreate
+from app.schemas.instituicao import Instituicao, InstituicaoCreate, InstituicaoUpdate
 from app.models.instituicao import Instituicao as InstituicaoModel
-from app.services.instituicao import get_instituicao, create_instituicao
+from app.services.instituicao import get_instituicao, create_instituicao, create_instituicoes_bulk, update_instituicao, patch_instituicao, delete_instituicao
+from app.services.lote import LoteError
+from app.services.atualizacao import ConflitoDeVersao
+from app.services.ranking import ranking_entidades, MEDIDAS_RANKING
+from app.services.estatisticas import calcular_estatisticas
 from app.core.database import get_db
-from app.core.deps import get_current_active_user, get_admin_user
+from app.core.cache import cached_response, entity_cache
+from app.core.deps import get_current_active_user, get_admin_user, conditional_get
 from app.core.pagination import paginate_query
 from app.core.filters import FilterBuilder
 from app.models.user import User
@@ -16,6 +21,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=Dict[str, Any])
+@cached_response("instituicao")
 def read_instituicoes_enhanced(
     # Parâmetros de paginação
     page: int = Query(1, ge=1, description="Número da página"),
@@ -90,29 +96,55 @@ def read_instituicoes_enhanced(
         "filters_applied": filters
     }
 
-@router.get("/stats", response_model=Dict[str, Any])
+@router.get("/stats", response_model=Dict[str, Any], dependencies=[Depends(conditional_get("instituicao"))])
+@cached_response("instituicao")
 def get_instituicoes_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Estatísticas das instituições"""
-    from sqlalchemy import func
+    """Estatísticas das instituições (uma única consulta agrupada por UF e país)"""
+    estatisticas = calcular_estatisticas(db, InstituicaoModel, ["uf", "pais"])
     
-    total_instituicoes = db.query(InstituicaoModel).count()
-    por_uf = db.query(
-        InstituicaoModel.uf, 
-        func.count(InstituicaoModel.id).label('total')
-    ).group_by(InstituicaoModel.uf).all()
+    return {
+        "total_instituicoes": estatisticas.total,
+        "por_uf": [
+            {"uf": grupo["chave"] or "Não informado", "total": grupo["total"]}
+            for grupo in estatisticas.por("uf")
+        ],
+        "por_pais": [
+            {"pais": grupo["chave"] or "Não informado", "total": grupo["total"]}
+            for grupo in estatisticas.por("pais")
+        ]
+    }
+
+@router.get("/ranking", response_model=Dict[str, Any], dependencies=[Depends(conditional_get())])
+@cached_response()
+def get_instituicoes_ranking(
+    by: str = Query("sum", description=f"Medida: {', '.join(MEDIDAS_RANKING)} de valor_pago"),
+    limit: int = Query(20, ge=1, le=1000, description="Quantidade de instituições no ranking"),
+    ano_referencia: Optional[int] = Query(None, description="Filtro por ano"),
+    modalidade: Optional[str] = Query(None, description="Filtro por modalidade"),
+    uf: Optional[str] = Query(None, description="UF da instituição do pagamento"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Top-N instituições por valor pago (sum) ou quantidade de pagamentos (count)
     
-    por_pais = db.query(
-        InstituicaoModel.pais,
-        func.count(InstituicaoModel.id).label('total')
-    ).group_by(InstituicaoModel.pais).all()
+    Exemplo: /instituicoes/ranking?by=sum&limit=20&ano_referencia=2024
+    """
+    if by not in MEDIDAS_RANKING:
+        raise HTTPException(status_code=400, detail=f"by inválido. Opções: {', '.join(MEDIDAS_RANKING)}")
+    
+    filters = {"ano_referencia": ano_referencia, "modalidade": modalidade, "uf": uf}
+    filters = {k: v for k, v in filters.items() if v is not None and v != ''}
+    resultado = ranking_entidades(db, "instituicao", medida=by, limite=limit, **filters)
     
     return {
-        "total_instituicoes": total_instituicoes,
-        "por_uf": [{"uf": uf or "Não informado", "total": total} for uf, total in por_uf],
-        "por_pais": [{"pais": pais or "Não informado", "total": total} for pais, total in por_pais]
+        "by": by,
+        "limit": limit,
+        "filters_applied": filters,
+        **resultado
     }
 
 @router.get("/{instituicao_id}", response_model=Instituicao)
@@ -122,7 +154,7 @@ def read_instituicao_route(
     current_user: User = Depends(get_current_active_user)
 ):
     """Busca instituição por ID"""
-    db_instituicao = get_instituicao(db, instituicao_id=instituicao_id)
+    db_instituicao = entity_cache.get(db, InstituicaoModel, instituicao_id)
     if db_instituicao is None:
         raise HTTPException(status_code=404, detail="Instituição não encontrada")
     return db_instituicao
@@ -136,6 +168,27 @@ def create_instituicao_route(
     """Cria uma nova instituição (apenas admin)"""
     return create_instituicao(db=db, instituicao=instituicao)
 
+@router.post("/bulk", response_model=Dict[str, Any])
+def create_instituicoes_bulk_route(
+    itens: List[Any] = Body(..., description="Lista de instituições a criar"),
+    atomico: bool = Query(False, description="Rejeita o lote inteiro se algum item for inválido"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Cria instituições em lote, em uma única transação (apenas admin)
+
+    Retorna o resultado de cada item (criado com id, ou erros de validação) e
+    a vazão do lote. Sem `atomico`, os itens válidos são criados mesmo que
+    outros tenham erros.
+    """
+    try:
+        return create_instituicoes_bulk(db, itens, atomico=atomico)
+    except LoteError as e:
+        if e.resultado is None:
+            raise HTTPException(status_code=413, detail=str(e))
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), **e.resultado})
+
 @router.put("/{instituicao_id}", response_model=Instituicao)
 def update_instituicao_route(
     instituicao_id: int,
@@ -148,11 +201,28 @@ def update_instituicao_route(
     if db_instituicao is None:
         raise HTTPException(status_code=404, detail="Instituição não encontrada")
     
-    for key, value in instituicao.dict(exclude_unset=True).items():
-        setattr(db_instituicao, key, value)
-    
-    db.commit()
-    db.refresh(db_instituicao)
+    return update_instituicao(db, db_instituicao, instituicao)
+
+@router.patch("/{instituicao_id}", response_model=Instituicao)
+def patch_instituicao_route(
+    instituicao_id: int,
+    instituicao: InstituicaoUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Atualiza parcialmente uma instituição (apenas admin)
+
+    Só os campos enviados são alterados, em um único UPDATE ... RETURNING.
+    Com `versao` (a lida no GET) a alteração é rejeitada com 409 se o
+    registro tiver mudado desde então.
+    """
+    try:
+        db_instituicao = patch_instituicao(db, instituicao_id, instituicao)
+    except ConflitoDeVersao as e:
+        raise HTTPException(status_code=409, detail={"mensagem": str(e), "versao_atual": e.versao_atual})
+    if db_instituicao is None:
+        raise HTTPException(status_code=404, detail="Instituição não encontrada")
     return db_instituicao
 
 @router.delete("/{instituicao_id}")
@@ -166,6 +236,5 @@ def delete_instituicao_route(
     if db_instituicao is None:
         raise HTTPException(status_code=404, detail="Instituição não encontrada")
     
-    db.delete(db_instituicao)
-    db.commit()
+    delete_instituicao(db, db_instituicao)
     return {"message": "Instituição deletada com sucesso"}
\ No newline at end of file
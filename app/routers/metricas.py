@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Dict, Any
+from app.core.cache import response_cache, entity_cache, principal_cache, single_flight
+from app.core.deps import get_admin_user
+from app.core.instrumentation import sql_stats
+from app.core.security import password_pool, token_cache
+from app.services.fila_escrita import fila_pagamentos
+from app.models.user import User
+
+router = APIRouter(
+    prefix="/metricas",
+    tags=["Métricas"],
+)
+
+@router.get("/cache", response_model=Dict[str, Any])
+def get_cache_metrics(admin_user: User = Depends(get_admin_user)):
+    """
+    Métricas do cache de respostas: hits, misses, taxa de acerto, despejos e
+    requisições coalescidas (apenas admin)
+    """
+    metricas = response_cache.stats() if response_cache is not None else {"backend": "none"}
+    metricas["single_flight"] = single_flight.stats()
+    return metricas
+
+@router.delete("/cache")
+def clear_cache(admin_user: User = Depends(get_admin_user)):
+    """
+    Esvazia o cache de respostas e zera as métricas (apenas admin)
+    """
+    if response_cache is not None:
+        response_cache.clear()
+        response_cache.metrics.reset()
+    single_flight.reset()
+    return {"message": "Cache esvaziado com sucesso"}
+
+@router.get("/entidades", response_model=Dict[str, Any])
+def get_entity_cache_metrics(admin_user: User = Depends(get_admin_user)):
+    """
+    Métricas do cache de entidades por ID (apenas admin)
+    """
+    return entity_cache.stats()
+
+@router.get("/autenticacao", response_model=Dict[str, Any])
+def get_auth_cache_metrics(admin_user: User = Depends(get_admin_user)):
+    """
+    Métricas de autenticação: caches de tokens e usuários e pool de hashing (apenas admin)
+    """
+    return {
+        "tokens": token_cache.stats(),
+        "principais": principal_cache.stats(),
+        "hash_pool": password_pool.stats(),
+    }
+
+@router.get("/escrita", response_model=Dict[str, Any])
+def get_write_behind_metrics(admin_user: User = Depends(get_admin_user)):
+    """
+    Métricas da fila de escrita de pagamentos: profundidade, lotes gravados,
+    tamanho médio dos lotes e espera até o commit (apenas admin)
+    """
+    return fila_pagamentos.stats()
+
+@router.get("/sql", response_model=Dict[str, Any])
+def get_sql_metrics(
+    limite: int = Query(20, ge=1, le=200, description="Quantidade de formatos de SQL retornados"),
+    apenas_lentas: bool = Query(False, description="Somente formatos com execuções acima de SLOW_QUERY_MS"),
+    admin_user: User = Depends(get_admin_user)
+):
+    """
+    Formatos de SQL com maior tempo acumulado: execuções, tempo total, médio
+    e máximo, execuções lentas e o último plano capturado (apenas admin)
+    """
+    return {**sql_stats.stats(), "top": sql_stats.top(limite, apenas_lentas)}
+
+@router.delete("/sql")
+def reset_sql_metrics(admin_user: User = Depends(get_admin_user)):
+    """
+    Zera as estatísticas de SQL (apenas admin)
+    """
+    sql_stats.reset()
+    return {"message": "Estatísticas de SQL zeradas com sucesso"}
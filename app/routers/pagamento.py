@@ -1,14 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import date
-from app.schemas.pagamento import Pagamento, PagamentoCreate
+from app.schemas.pagamento import (
+    Pagamento, PagamentoCreate, PagamentoExpandido, PagamentoFiltro, PagamentoAtualizacaoEmMassa, PagamentoUpdate
+)
 from app.models.pagamento import Pagamento as PagamentoModel
-from app.services.pagamento import get_pagamento, create_pagamento
+from app.services.pagamento import (
+    get_pagamento, get_pagamento_cached, create_pagamento, create_pagamentos_bulk, update_pagamento, patch_pagamento, delete_pagamento,
+    embutir_relacoes, listar_pagamentos_snapshot, update_pagamentos_por_filtro, delete_pagamentos_por_filtro,
+    OperacaoEmMassaError, ReferenciaInvalidaError, RELACOES_EXPANSIVEIS
+)
+from app.services.lote import LoteError
+from app.services.atualizacao import ConflitoDeVersao
+from app.services.fila_escrita import fila_pagamentos, FilaEscritaCheia, ItemRejeitado
+from app.services.snapshot import snapshot_manager
+from app.services.resumo import get_resumo_pagamentos
+from app.services.analytics import aggregate_pagamentos, parse_lista, AggregationError, DIMENSOES, MEDIDAS
+from app.services.sketch import beneficiarios_distintos, DIMENSOES_SKETCH
+from app.services.serie_temporal import serie_temporal_pagamentos, GRANULARIDADES
+from app.services.distribuicao import (
+    get_distribuicao_pagamentos, AGRUPAMENTOS_DISTRIBUICAO, QUANTIS_PADRAO, ESCALAS_HISTOGRAMA
+)
+from app.core.config import settings
 from app.core.database import get_db
-from app.core.deps import get_current_active_user, get_admin_user
+from app.core.cache import cached_response, EntityCache
+from app.core.deps import get_current_active_user, get_admin_user, conditional_get
 from app.core.pagination import paginate_query
 from app.core.filters import FilterBuilder
+from app.core.timing import medir
 from app.models.user import User
 
 router = APIRouter(
@@ -16,7 +38,74 @@ router = APIRouter(
     tags=["Pagamentos"],
 )
 
+EXPAND_DESCRIPTION = "Entidades relacionadas a embutir, separadas por vírgula: beneficiario, instituicao, programa"
+
+def _parse_expand(expand: Optional[str]) -> List[str]:
+    """Valida o parâmetro `expand` e retorna os relacionamentos solicitados"""
+    if not expand:
+        return []
+    relacoes = []
+    for relacao in expand.split(","):
+        relacao = relacao.strip()
+        if not relacao or relacao in relacoes:
+            continue
+        if relacao not in RELACOES_EXPANSIVEIS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"expand inválido: '{relacao}'. Opções: {', '.join(RELACOES_EXPANSIVEIS)}"
+            )
+        relacoes.append(relacao)
+    return relacoes
+
+def filtros_analiticos(
+    ano_referencia: Optional[int] = Query(None, description="Filtro por ano"),
+    modalidade: Optional[str] = Query(None, description="Filtro por modalidade"),
+    linha_fomento: Optional[str] = Query(None, description="Filtro por linha de fomento"),
+    valor_min: Optional[float] = Query(None, description="Valor mínimo"),
+    valor_max: Optional[float] = Query(None, description="Valor máximo"),
+    data_inicio_desde: Optional[date] = Query(None, description="Data início desde (YYYY-MM-DD)"),
+    data_inicio_ate: Optional[date] = Query(None, description="Data início até (YYYY-MM-DD)"),
+    beneficiario_id: Optional[int] = Query(None, description="ID do beneficiário"),
+    instituicao_id: Optional[int] = Query(None, description="ID da instituição"),
+    programa_id: Optional[int] = Query(None, description="ID do programa"),
+    uf: Optional[str] = Query(None, description="UF da instituição"),
+    grande_area: Optional[str] = Query(None, description="Grande área do programa")
+) -> Dict[str, Any]:
+    """Filtros compartilhados pelas rotas analíticas de pagamentos"""
+    filtros = {
+        "ano_referencia": ano_referencia,
+        "modalidade": modalidade,
+        "linha_fomento": linha_fomento,
+        "valor_min": valor_min,
+        "valor_max": valor_max,
+        "data_inicio_desde": data_inicio_desde,
+        "data_inicio_ate": data_inicio_ate,
+        "fk_beneficiario": beneficiario_id,
+        "fk_instituicao": instituicao_id,
+        "fk_programa": programa_id,
+        "uf": uf,
+        "grande_area": grande_area
+    }
+    # Remover filtros vazios
+    return {k: v for k, v in filtros.items() if v is not None and v != ''}
+
+def _serializar_pagamento(item) -> Dict[str, Any]:
+    """Converte um pagamento (objeto SQLAlchemy ou dicionário do cache) em dicionário serializável"""
+    data = item if isinstance(item, dict) else EntityCache.to_dict(item)
+    for campo in ("data_inicio", "data_fim"):
+        if data[campo] is not None:
+            data[campo] = data[campo].isoformat()
+    return data
+
+def _serializar_pagina(db: Session, itens, relacoes: List[str]) -> List[Dict[str, Any]]:
+    """Serializa uma página de pagamentos e embute os relacionamentos pedidos"""
+    with medir("hidratacao"):
+        pagamentos_data = [_serializar_pagamento(item) for item in itens]
+        embutir_relacoes(db, pagamentos_data, relacoes)
+    return pagamentos_data
+
 @router.get("/", response_model=Dict[str, Any])
+@cached_response()
 def read_pagamentos_enhanced(
     # Parâmetros de paginação
     page: int = Query(1, ge=1, description="Número da página"),
@@ -47,11 +136,15 @@ def read_pagamentos_enhanced(
     titulo_projeto_like: Optional[str] = Query(None, description="Busca no título do projeto"),
     processo: Optional[str] = Query(None, description="Número do processo"),
     
+    # Relacionamentos embutidos
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    
     # Dependências
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Lista pagamentos com paginação, ordenação e filtros avançados"""
+    relacoes = _parse_expand(expand)
     
     # Construir query base
     query = db.query(PagamentoModel)
@@ -98,34 +191,30 @@ def read_pagamentos_enhanced(
     if data_inicio_ate:
         query = query.filter(PagamentoModel.data_inicio <= data_inicio_ate)
     
-    # Aplicar paginação e ordenação
-    result = paginate_query(
-        query=query,
-        page=page,
-        size=size,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        model_class=PagamentoModel
+    # Aplicar paginação e ordenação (pelo snapshot em memória, se ativo)
+    result = listar_pagamentos_snapshot(
+        db,
+        {
+            **filters,
+            "valor_min": valor_min,
+            "valor_max": valor_max,
+            "data_inicio_desde": data_inicio_desde,
+            "data_inicio_ate": data_inicio_ate
+        },
+        page, size, sort_by, sort_order
     )
+    if result is None:
+        result = paginate_query(
+            query=query,
+            page=page,
+            size=size,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            model_class=PagamentoModel
+        )
     
     # Converter objetos SQLAlchemy para dicionários
-    pagamentos_data = [
-        {
-            "id": item.id,
-            "ano_referencia": item.ano_referencia,
-            "processo": item.processo,
-            "modalidade": item.modalidade,
-            "linha_fomento": item.linha_fomento,
-            "valor_pago": item.valor_pago,
-            "data_inicio": item.data_inicio.isoformat() if item.data_inicio else None,
-            "data_fim": item.data_fim.isoformat() if item.data_fim else None,
-            "titulo_projeto": item.titulo_projeto,
-            "fk_beneficiario": item.fk_beneficiario,
-            "fk_instituicao": item.fk_instituicao,
-            "fk_programa": item.fk_programa
-        }
-        for item in result["items"]
-    ]
+    pagamentos_data = _serializar_pagina(db, result["items"], relacoes)
     
     return {
         "data": pagamentos_data,
@@ -139,98 +228,250 @@ def read_pagamentos_enhanced(
         }
     }
 
-@router.get("/stats", response_model=Dict[str, Any])
+@router.get("/stats", response_model=Dict[str, Any], dependencies=[Depends(conditional_get("pagamento"))])
+@cached_response("pagamento")
 def get_pagamentos_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Estatísticas dos pagamentos"""
-    from sqlalchemy import func
-    
-    # Estatísticas básicas
-    total_pagamentos = db.query(PagamentoModel).count()
-    valor_total = db.query(func.sum(PagamentoModel.valor_pago)).scalar() or 0
-    valor_medio = db.query(func.avg(PagamentoModel.valor_pago)).scalar() or 0
-    
-    # Por modalidade
-    por_modalidade = db.query(
-        PagamentoModel.modalidade,
-        func.count(PagamentoModel.id).label('total'),
-        func.sum(PagamentoModel.valor_pago).label('valor_total')
-    ).group_by(PagamentoModel.modalidade).all()
-    
-    # Por ano
-    por_ano = db.query(
-        PagamentoModel.ano_referencia,
-        func.count(PagamentoModel.id).label('total'),
-        func.sum(PagamentoModel.valor_pago).label('valor_total')
-    ).group_by(PagamentoModel.ano_referencia).all()
+    """Estatísticas dos pagamentos (lidas do resumo materializado)"""
+    resumo = get_resumo_pagamentos(db, ["total", "modalidade", "ano_referencia", "linha_fomento"])
+    total = resumo["total"][0] if resumo["total"] else {"total_pagamentos": 0, "valor_total": 0.0, "valor_medio": 0.0}
     
     return {
         "resumo": {
-            "total_pagamentos": total_pagamentos,
-            "valor_total": float(valor_total),
-            "valor_medio": float(valor_medio)
+            "total_pagamentos": total["total_pagamentos"],
+            "valor_total": float(total["valor_total"]),
+            "valor_medio": float(total["valor_medio"])
         },
         "por_modalidade": [
             {
-                "modalidade": modalidade or "Não informado",
-                "total_pagamentos": total,
-                "valor_total": float(valor or 0)
+                "modalidade": grupo["chave"] or "Não informado",
+                "total_pagamentos": grupo["total_pagamentos"],
+                "valor_total": float(grupo["valor_total"])
             }
-            for modalidade, total, valor in por_modalidade
+            for grupo in resumo["modalidade"]
         ],
         "por_ano": [
             {
-                "ano": ano,
-                "total_pagamentos": total,
-                "valor_total": float(valor or 0)
+                "ano": grupo["chave"],
+                "total_pagamentos": grupo["total_pagamentos"],
+                "valor_total": float(grupo["valor_total"])
             }
-            for ano, total, valor in por_ano
+            for grupo in resumo["ano_referencia"]
+        ],
+        "por_linha_fomento": [
+            {
+                "linha_fomento": grupo["chave"] or "Não informado",
+                "total_pagamentos": grupo["total_pagamentos"],
+                "valor_total": float(grupo["valor_total"])
+            }
+            for grupo in resumo["linha_fomento"]
         ]
     }
 
+@router.get(
+    "/stats/beneficiarios-distintos",
+    response_model=Dict[str, Any],
+    dependencies=[Depends(conditional_get("pagamento"))]
+)
+@cached_response("pagamento")
+def get_beneficiarios_distintos_stats(
+    group_by: Optional[str] = Query(None, description=f"Agrupamento opcional: {', '.join(DIMENSOES_SKETCH)}"),
+    anos: Optional[str] = Query(None, description="Anos de referência separados por vírgula (padrão: todos)"),
+    limit: int = Query(100, ge=1, le=10000, description="Máximo de grupos retornados"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Número aproximado de beneficiários distintos (HyperLogLog)
+    
+    Cada estimativa tem erro padrão relativo de 1,04/√m (campo
+    `erro_padrao_relativo`; ~2,3% com a precisão padrão): em ~95% dos casos o
+    valor real está a até 2 erros padrão da estimativa. Anos diferentes são
+    combinados sem contar duas vezes o mesmo beneficiário.
+    
+    Exemplos:
+    - /pagamentos/stats/beneficiarios-distintos?group_by=programa&anos=2023,2024
+    - /pagamentos/stats/beneficiarios-distintos?group_by=modalidade
+    """
+    if group_by is not None and group_by not in DIMENSOES_SKETCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"group_by inválido. Opções: {', '.join(DIMENSOES_SKETCH)}"
+        )
+    try:
+        anos_filtro = [int(ano) for ano in parse_lista(anos)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="anos deve ser uma lista de inteiros")
+    
+    return {
+        "group_by": group_by,
+        "anos": anos_filtro,
+        **beneficiarios_distintos(db, group_by=group_by, anos=anos_filtro, limite=limit)
+    }
+
+@router.get("/aggregate", response_model=Dict[str, Any])
+@cached_response()
+def aggregate_pagamentos_route(
+    group_by: Optional[str] = Query(None, description=f"Dimensões separadas por vírgula: {', '.join(DIMENSOES)}"),
+    measures: str = Query("count,sum", description=f"Medidas sobre valor_pago: {', '.join(MEDIDAS)}"),
+    order_by: Optional[str] = Query(None, description="Medida ou dimensão para ordenação"),
+    sort_order: str = Query("desc", regex="^(asc|desc)$", description="Ordem: asc ou desc"),
+    limit: int = Query(1000, ge=1, le=10000, description="Máximo de grupos retornados"),
+    filtros: Dict[str, Any] = Depends(filtros_analiticos),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Agregação ad hoc de valor_pago por dimensões arbitrárias
+    
+    Exemplos:
+    - /pagamentos/aggregate?group_by=instituicao_uf,programa_grande_area&measures=sum,count
+    - /pagamentos/aggregate?group_by=modalidade&measures=avg,max&ano_referencia=2024&uf=SP
+    """
+    dimensoes = parse_lista(group_by)
+    medidas = parse_lista(measures)
+    snapshot = snapshot_manager.current()
+    try:
+        if snapshot is not None:
+            resultado = snapshot.aggregate(dimensoes, medidas, filtros, order_by, sort_order, limit)
+        else:
+            resultado = aggregate_pagamentos(
+                db,
+                group_by=dimensoes,
+                medidas=medidas,
+                filtros=filtros,
+                order_by=order_by,
+                sort_order=sort_order,
+                limit=limit
+            )
+    except AggregationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "group_by": dimensoes,
+        "measures": medidas,
+        "filters_applied": filtros,
+        **resultado
+    }
+
+@router.get("/distribution", response_model=Dict[str, Any], dependencies=[Depends(conditional_get("pagamento"))])
+@cached_response("pagamento")
+def get_pagamentos_distribution(
+    group_by: Optional[str] = Query(None, description=f"Agrupamento opcional: {', '.join(AGRUPAMENTOS_DISTRIBUICAO)}"),
+    quantiles: str = Query(
+        ",".join(f"{q:g}" for q in QUANTIS_PADRAO),
+        description="Quantis entre 0 e 1, separados por vírgula"
+    ),
+    bins: int = Query(20, ge=1, le=200, description="Número de faixas do histograma"),
+    scale: str = Query("linear", description=f"Escala do histograma: {', '.join(ESCALAS_HISTOGRAMA)}"),
+    iqr_factor: float = Query(1.5, gt=0, description="Fator k do critério de outliers Q1 - k*IQR / Q3 + k*IQR"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Distribuição de valor_pago: quantis, histograma e outliers
+    
+    Calculada sobre os valores pré-ordenados em memória (as escritas da API
+    são intercaladas por delta; importações remontam o índice).
+    
+    Exemplos:
+    - /pagamentos/distribution?quantiles=0.5,0.9,0.99
+    - /pagamentos/distribution?group_by=modalidade&bins=30&scale=log
+    """
+    if group_by is not None and group_by not in AGRUPAMENTOS_DISTRIBUICAO:
+        raise HTTPException(
+            status_code=400,
+            detail=f"group_by inválido. Opções: {', '.join(AGRUPAMENTOS_DISTRIBUICAO)}"
+        )
+    if scale not in ESCALAS_HISTOGRAMA:
+        raise HTTPException(status_code=400, detail=f"scale inválido. Opções: {', '.join(ESCALAS_HISTOGRAMA)}")
+    try:
+        quantis = [float(q) for q in parse_lista(quantiles)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="quantiles deve conter números entre 0 e 1")
+    if not quantis or any(not 0 <= q <= 1 for q in quantis):
+        raise HTTPException(status_code=400, detail="quantiles deve conter números entre 0 e 1")
+    
+    return {
+        "campo": "valor_pago",
+        "group_by": group_by,
+        **get_distribuicao_pagamentos(
+            db,
+            group_by=group_by,
+            quantis=quantis,
+            bins=bins,
+            escala=scale,
+            fator_iqr=iqr_factor
+        )
+    }
+
+@router.get("/timeseries", response_model=Dict[str, Any], dependencies=[Depends(conditional_get())])
+@cached_response()
+def get_pagamentos_timeseries(
+    granularity: str = Query("month", description=f"Período: {', '.join(GRANULARIDADES)}"),
+    filtros: Dict[str, Any] = Depends(filtros_analiticos),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Série temporal de pagamentos por mês ou trimestre de data_inicio
+    
+    Cada período traz os pagamentos iniciados (quantidade e valor) e as
+    concessões ativas (intervalo data_inicio..data_fim cobrindo o período).
+    
+    Exemplos:
+    - /pagamentos/timeseries?granularity=quarter
+    - /pagamentos/timeseries?modalidade=PQ&uf=SP
+    """
+    if granularity not in GRANULARIDADES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"granularity inválido. Opções: {', '.join(GRANULARIDADES)}"
+        )
+    
+    return {
+        "granularity": granularity,
+        "filters_applied": filtros,
+        "series": serie_temporal_pagamentos(db, filtros, granularity)
+    }
+
 @router.get("/beneficiario/{beneficiario_id}", response_model=Dict[str, Any])
+@cached_response()
 def read_pagamentos_by_beneficiario(
     beneficiario_id: int,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     sort_by: Optional[str] = Query("data_inicio", description="Campo para ordenação"),
     sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Lista pagamentos de um beneficiário específico com paginação"""
+    relacoes = _parse_expand(expand)
     
-    query = db.query(PagamentoModel).filter(PagamentoModel.fk_beneficiario == beneficiario_id)
+    query = (
+        db.query(PagamentoModel)
+        .filter(PagamentoModel.fk_beneficiario == beneficiario_id)
+    )
     
-    result = paginate_query(
-        query=query,
-        page=page,
-        size=size,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        model_class=PagamentoModel
+    result = listar_pagamentos_snapshot(
+        db, {"fk_beneficiario": beneficiario_id}, page, size, sort_by, sort_order
     )
+    if result is None:
+        result = paginate_query(
+            query=query,
+            page=page,
+            size=size,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            model_class=PagamentoModel
+        )
     
     # Converter objetos SQLAlchemy para dicionários
-    pagamentos_data = [
-        {
-            "id": item.id,
-            "ano_referencia": item.ano_referencia,
-            "processo": item.processo,
-            "modalidade": item.modalidade,
-            "linha_fomento": item.linha_fomento,
-            "valor_pago": item.valor_pago,
-            "data_inicio": item.data_inicio.isoformat() if item.data_inicio else None,
-            "data_fim": item.data_fim.isoformat() if item.data_fim else None,
-            "titulo_projeto": item.titulo_projeto,
-            "fk_beneficiario": item.fk_beneficiario,
-            "fk_instituicao": item.fk_instituicao,
-            "fk_programa": item.fk_programa
-        }
-        for item in result["items"]
-    ]
+    pagamentos_data = _serializar_pagina(db, result["items"], relacoes)
     
     return {
         "beneficiario_id": beneficiario_id,
@@ -239,46 +480,40 @@ def read_pagamentos_by_beneficiario(
     }
 
 @router.get("/instituicao/{instituicao_id}", response_model=Dict[str, Any])
+@cached_response()
 def read_pagamentos_by_instituicao(
     instituicao_id: int,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     sort_by: Optional[str] = Query("data_inicio", description="Campo para ordenação"),
     sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Lista pagamentos de uma instituição específica com paginação"""
+    relacoes = _parse_expand(expand)
     
-    query = db.query(PagamentoModel).filter(PagamentoModel.fk_instituicao == instituicao_id)
+    query = (
+        db.query(PagamentoModel)
+        .filter(PagamentoModel.fk_instituicao == instituicao_id)
+    )
     
-    result = paginate_query(
-        query=query,
-        page=page,
-        size=size,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        model_class=PagamentoModel
+    result = listar_pagamentos_snapshot(
+        db, {"fk_instituicao": instituicao_id}, page, size, sort_by, sort_order
     )
+    if result is None:
+        result = paginate_query(
+            query=query,
+            page=page,
+            size=size,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            model_class=PagamentoModel
+        )
     
-    # Converter para dicionários
-    pagamentos_data = [
-        {
-            "id": item.id,
-            "ano_referencia": item.ano_referencia,
-            "processo": item.processo,
-            "modalidade": item.modalidade,
-            "linha_fomento": item.linha_fomento,
-            "valor_pago": item.valor_pago,
-            "data_inicio": item.data_inicio.isoformat() if item.data_inicio else None,
-            "data_fim": item.data_fim.isoformat() if item.data_fim else None,
-            "titulo_projeto": item.titulo_projeto,
-            "fk_beneficiario": item.fk_beneficiario,
-            "fk_instituicao": item.fk_instituicao,
-            "fk_programa": item.fk_programa
-        }
-        for item in result["items"]
-    ]
+    # Converter objetos SQLAlchemy para dicionários
+    pagamentos_data = _serializar_pagina(db, result["items"], relacoes)
     
     return {
         "instituicao_id": instituicao_id,
@@ -287,46 +522,40 @@ def read_pagamentos_by_instituicao(
     }
 
 @router.get("/programa/{programa_id}", response_model=Dict[str, Any])
+@cached_response()
 def read_pagamentos_by_programa(
     programa_id: int,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=100),
     sort_by: Optional[str] = Query("data_inicio", description="Campo para ordenação"),
     sort_order: str = Query("desc", regex="^(asc|desc)$"),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Lista pagamentos de um programa específico com paginação"""
+    relacoes = _parse_expand(expand)
     
-    query = db.query(PagamentoModel).filter(PagamentoModel.fk_programa == programa_id)
+    query = (
+        db.query(PagamentoModel)
+        .filter(PagamentoModel.fk_programa == programa_id)
+    )
     
-    result = paginate_query(
-        query=query,
-        page=page,
-        size=size,
-        sort_by=sort_by,
-        sort_order=sort_order,
-        model_class=PagamentoModel
+    result = listar_pagamentos_snapshot(
+        db, {"fk_programa": programa_id}, page, size, sort_by, sort_order
     )
+    if result is None:
+        result = paginate_query(
+            query=query,
+            page=page,
+            size=size,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            model_class=PagamentoModel
+        )
     
-    # Converter para dicionários
-    pagamentos_data = [
-        {
-            "id": item.id,
-            "ano_referencia": item.ano_referencia,
-            "processo": item.processo,
-            "modalidade": item.modalidade,
-            "linha_fomento": item.linha_fomento,
-            "valor_pago": item.valor_pago,
-            "data_inicio": item.data_inicio.isoformat() if item.data_inicio else None,
-            "data_fim": item.data_fim.isoformat() if item.data_fim else None,
-            "titulo_projeto": item.titulo_projeto,
-            "fk_beneficiario": item.fk_beneficiario,
-            "fk_instituicao": item.fk_instituicao,
-            "fk_programa": item.fk_programa
-        }
-        for item in result["items"]
-    ]
+    # Converter objetos SQLAlchemy para dicionários
+    pagamentos_data = _serializar_pagina(db, result["items"], relacoes)
     
     return {
         "programa_id": programa_id,
@@ -334,26 +563,100 @@ def read_pagamentos_by_programa(
         "pagination": result["pagination"]
     }
 
-@router.get("/{pagamento_id}", response_model=Pagamento)
+@router.get("/{pagamento_id}", response_model=PagamentoExpandido, response_model_exclude_unset=True)
 def read_pagamento_route(
     pagamento_id: int,
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Busca pagamento por ID"""
-    db_pagamento = get_pagamento(db, pagamento_id=pagamento_id)
-    if db_pagamento is None:
+    relacoes = _parse_expand(expand)
+    pagamento = get_pagamento_cached(db, pagamento_id)
+    if pagamento is None:
         raise HTTPException(status_code=404, detail="Pagamento não encontrado")
-    return db_pagamento
+    return _serializar_pagina(db, [pagamento], relacoes)[0]
 
 @router.post("/", response_model=Pagamento)
-def create_pagamento_route(
+async def create_pagamento_route(
     pagamento: PagamentoCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_admin_user)
 ):
-    """Cria um novo pagamento (apenas admin)"""
-    return create_pagamento(db=db, pagamento=pagamento)
+    """
+    Cria um novo pagamento (apenas admin)
+
+    Com WRITE_BEHIND_ENABLED a inclusão entra na fila de escrita e é gravada
+    junto com outras em uma transação; a resposta só sai após o commit do lote.
+    """
+    if not settings.write_behind_enabled:
+        return await run_in_threadpool(create_pagamento, db, pagamento)
+
+    dados = pagamento.model_dump()
+    try:
+        novo_id = await asyncio.wrap_future(fila_pagamentos.enviar(dados))
+    except FilaEscritaCheia as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ItemRejeitado as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {**dados, "id": novo_id, "versao": 1}
+
+@router.post("/bulk", response_model=Dict[str, Any])
+def create_pagamentos_bulk_route(
+    itens: List[Any] = Body(..., description="Lista de pagamentos a criar"),
+    atomico: bool = Query(False, description="Rejeita o lote inteiro se algum item for inválido"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Cria pagamentos em lote, em uma única transação (apenas admin)
+
+    Retorna o resultado de cada item (criado com id, ou erros de validação) e
+    a vazão do lote. Sem `atomico`, os itens válidos são criados mesmo que
+    outros tenham erros.
+    """
+    try:
+        return create_pagamentos_bulk(db, itens, atomico=atomico)
+    except LoteError as e:
+        if e.resultado is None:
+            raise HTTPException(status_code=413, detail=str(e))
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), **e.resultado})
+
+@router.post("/bulk-update", response_model=Dict[str, Any])
+def update_pagamentos_por_filtro_route(
+    operacao: PagamentoAtualizacaoEmMassa,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Atualiza todos os pagamentos que atendem aos filtros (apenas admin)
+
+    Os filtros seguem o FilterBuilder (`campo`, `campo_op` com op em
+    eq/like/gt/gte/lt/lte, `search`) e são aplicados em um único UPDATE.
+    Com `dry_run` apenas conta as linhas. Resumo, sketches e caches são
+    atualizados na mesma operação.
+    """
+    try:
+        return update_pagamentos_por_filtro(db, operacao.filtros, operacao.valores, dry_run=operacao.dry_run)
+    except OperacaoEmMassaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/bulk-delete", response_model=Dict[str, Any])
+def delete_pagamentos_por_filtro_route(
+    operacao: PagamentoFiltro,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Remove todos os pagamentos que atendem aos filtros (apenas admin)
+
+    Um único DELETE com os filtros do FilterBuilder; com `dry_run` apenas
+    conta as linhas. Retorna os IDs removidos.
+    """
+    try:
+        return delete_pagamentos_por_filtro(db, operacao.filtros, dry_run=operacao.dry_run)
+    except OperacaoEmMassaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/{pagamento_id}", response_model=Pagamento)
 def update_pagamento_route(
@@ -367,11 +670,31 @@ def update_pagamento_route(
     if db_pagamento is None:
         raise HTTPException(status_code=404, detail="Pagamento não encontrado")
     
-    for key, value in pagamento.dict(exclude_unset=True).items():
-        setattr(db_pagamento, key, value)
-    
-    db.commit()
-    db.refresh(db_pagamento)
+    return update_pagamento(db, db_pagamento, pagamento)
+
+@router.patch("/{pagamento_id}", response_model=Pagamento)
+def patch_pagamento_route(
+    pagamento_id: int,
+    pagamento: PagamentoUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Atualiza parcialmente um pagamento (apenas admin)
+
+    Só os campos enviados são alterados, em um único UPDATE ... RETURNING.
+    Com `versao` (a lida no GET) a alteração é rejeitada com 409 se o
+    registro tiver mudado desde então. Resumo e sketches são
+    mantidos quando campos agregados mudam.
+    """
+    try:
+        db_pagamento = patch_pagamento(db, pagamento_id, pagamento)
+    except ConflitoDeVersao as e:
+        raise HTTPException(status_code=409, detail={"mensagem": str(e), "versao_atual": e.versao_atual})
+    except ReferenciaInvalidaError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if db_pagamento is None:
+        raise HTTPException(status_code=404, detail="Pagamento não encontrado")
     return db_pagamento
 
 @router.delete("/{pagamento_id}")
@@ -385,6 +708,5 @@ def delete_pagamento_route(
     if db_pagamento is None:
         raise HTTPException(status_code=404, detail="Pagamento não encontrado")
     
-    db.delete(db_pagamento)
-    db.commit()
+    delete_pagamento(db, db_pagamento)
     return {"message": "Pagamento deletado com sucesso"}
\ No newline at end of file
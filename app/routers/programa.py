@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from app.schemas.programa import Programa, ProgramaCreate
+from app.schemas.programa import Programa, ProgramaCreate, ProgramaUpdate
 from app.models.programa import Programa as ProgramaModel
-from app.services.programa import get_programa, create_programa
+from app.services.programa import get_programa, create_programa, create_programas_bulk, update_programa, patch_programa, delete_programa
+from app.services.lote import LoteError
+from app.services.atualizacao import ConflitoDeVersao
+from app.services.ranking import ranking_entidades, MEDIDAS_RANKING
+from app.services.estatisticas import calcular_estatisticas
 from app.core.database import get_db
-from app.core.deps import get_current_active_user, get_admin_user
+from app.core.cache import cached_response, entity_cache
+from app.core.deps import get_current_active_user, get_admin_user, conditional_get
 from app.core.pagination import paginate_query
 from app.core.filters import FilterBuilder
 from app.models.user import User
@@ -16,6 +21,7 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=Dict[str, Any])
+@cached_response("programa")
 def read_programas_enhanced(
     # Parâmetros de paginação
     page: int = Query(1, ge=1, description="Número da página"),
@@ -90,34 +96,56 @@ def read_programas_enhanced(
         "filters_applied": filters
     }
 
-@router.get("/areas", response_model=Dict[str, Any])
+@router.get("/areas", response_model=Dict[str, Any], dependencies=[Depends(conditional_get("programa"))])
+@cached_response("programa")
 def get_areas_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Estatísticas por áreas de conhecimento"""
-    from sqlalchemy import func, distinct
-    
-    # Contar por grande área
-    grande_areas = db.query(
-        ProgramaModel.grande_area,
-        func.count(ProgramaModel.id).label('total_programas')
-    ).group_by(ProgramaModel.grande_area).all()
-    
-    # Contar áreas únicas
-    total_areas = db.query(func.count(distinct(ProgramaModel.area))).scalar()
-    total_subareas = db.query(func.count(distinct(ProgramaModel.subarea))).scalar()
+    """Estatísticas por áreas de conhecimento (uma única consulta agrupada)"""
+    # Granularidade mais fina: totais, distintos e grandes áreas saem do mesmo resultado
+    estatisticas = calcular_estatisticas(db, ProgramaModel, ["grande_area", "area", "subarea"])
     
     return {
-        "total_programas": db.query(ProgramaModel).count(),
-        "total_areas": total_areas,
-        "total_subareas": total_subareas,
+        "total_programas": estatisticas.total,
+        "total_areas": estatisticas.distintos("area"),
+        "total_subareas": estatisticas.distintos("subarea"),
         "por_grande_area": [
-            {"grande_area": area or "Não informado", "total_programas": total} 
-            for area, total in grande_areas
+            {"grande_area": grupo["chave"] or "Não informado", "total_programas": grupo["total"]}
+            for grupo in estatisticas.por("grande_area")
         ]
     }
 
+@router.get("/ranking", response_model=Dict[str, Any], dependencies=[Depends(conditional_get())])
+@cached_response()
+def get_programas_ranking(
+    by: str = Query("sum", description=f"Medida: {', '.join(MEDIDAS_RANKING)} de valor_pago"),
+    limit: int = Query(20, ge=1, le=1000, description="Quantidade de programas no ranking"),
+    ano_referencia: Optional[int] = Query(None, description="Filtro por ano"),
+    modalidade: Optional[str] = Query(None, description="Filtro por modalidade"),
+    uf: Optional[str] = Query(None, description="UF da instituição do pagamento"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Top-N programas por valor pago (sum) ou quantidade de pagamentos (count)
+    
+    Exemplo: /programas/ranking?by=sum&limit=20&ano_referencia=2024
+    """
+    if by not in MEDIDAS_RANKING:
+        raise HTTPException(status_code=400, detail=f"by inválido. Opções: {', '.join(MEDIDAS_RANKING)}")
+    
+    filters = {"ano_referencia": ano_referencia, "modalidade": modalidade, "uf": uf}
+    filters = {k: v for k, v in filters.items() if v is not None and v != ''}
+    resultado = ranking_entidades(db, "programa", medida=by, limite=limit, **filters)
+    
+    return {
+        "by": by,
+        "limit": limit,
+        "filters_applied": filters,
+        **resultado
+    }
+
 @router.get("/{programa_id}", response_model=Programa)
 def read_programa_route(
     programa_id: int,
@@ -125,7 +153,7 @@ def read_programa_route(
     current_user: User = Depends(get_current_active_user)
 ):
     """Busca programa por ID"""
-    db_programa = get_programa(db, programa_id=programa_id)
+    db_programa = entity_cache.get(db, ProgramaModel, programa_id)
     if db_programa is None:
         raise HTTPException(status_code=404, detail="Programa não encontrado")
     return db_programa
@@ -139,6 +167,27 @@ def create_programa_route(
     """Cria um novo programa (apenas admin)"""
     return create_programa(db=db, programa=programa)
 
+@router.post("/bulk", response_model=Dict[str, Any])
+def create_programas_bulk_route(
+    itens: List[Any] = Body(..., description="Lista de programas a criar"),
+    atomico: bool = Query(False, description="Rejeita o lote inteiro se algum item for inválido"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Cria programas em lote, em uma única transação (apenas admin)
+
+    Retorna o resultado de cada item (criado com id, ou erros de validação) e
+    a vazão do lote. Sem `atomico`, os itens válidos são criados mesmo que
+    outros tenham erros.
+    """
+    try:
+        return create_programas_bulk(db, itens, atomico=atomico)
+    except LoteError as e:
+        if e.resultado is None:
+            raise HTTPException(status_code=413, detail=str(e))
+        raise HTTPException(status_code=422, detail={"mensagem": str(e), **e.resultado})
+
 @router.put("/{programa_id}", response_model=Programa)
 def update_programa_route(
     programa_id: int,
@@ -151,11 +200,28 @@ def update_programa_route(
     if db_programa is None:
         raise HTTPException(status_code=404, detail="Programa não encontrado")
     
-    for key, value in programa.dict(exclude_unset=True).items():
-        setattr(db_programa, key, value)
-    
-    db.commit()
-    db.refresh(db_programa)
+    return update_programa(db, db_programa, programa)
+
+@router.patch("/{programa_id}", response_model=Programa)
+def patch_programa_route(
+    programa_id: int,
+    programa: ProgramaUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Atualiza parcialmente um programa (apenas admin)
+
+    Só os campos enviados são alterados, em um único UPDATE ... RETURNING.
+    Com `versao` (a lida no GET) a alteração é rejeitada com 409 se o
+    registro tiver mudado desde então.
+    """
+    try:
+        db_programa = patch_programa(db, programa_id, programa)
+    except ConflitoDeVersao as e:
+        raise HTTPException(status_code=409, detail={"mensagem": str(e), "versao_atual": e.versao_atual})
+    if db_programa is None:
+        raise HTTPException(status_code=404, detail="Programa não encontrado")
     return db_programa
 
 @router.delete("/{programa_id}")
@@ -169,6 +235,5 @@ def delete_programa_route(
     if db_programa is None:
         raise HTTPException(status_code=404, detail="Programa não encontrado")
     
-    db.delete(db_programa)
-    db.commit()
+    delete_programa(db, db_programa)
     return {"message": "Programa deletado com sucesso"}
\ No newline at end of file
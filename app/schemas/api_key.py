@@ -0,0 +1,22 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+class ApiKeyCreate(BaseModel):
+    nome: str
+    username: str | None = None  # dono da chave (padrão: o admin que a emite)
+    expira_em_dias: int | None = Field(None, ge=1)
+
+class ApiKey(BaseModel):
+    id: int
+    nome: str
+    prefixo: str
+    fk_user: int
+    is_active: bool
+    criado_em: datetime
+    expira_em: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+class ApiKeyCreated(ApiKey):
+    api_key: str  # exibida apenas na criação
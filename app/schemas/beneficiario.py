@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 
 class BeneficiarioBase(BaseModel):
     nome: str
@@ -8,8 +8,24 @@ class BeneficiarioBase(BaseModel):
 class BeneficiarioCreate(BeneficiarioBase):
     pass
 
+class BeneficiarioUpdate(BaseModel):
+    """Atualização parcial (PATCH): apenas os campos informados são alterados"""
+    nome: str | None = None
+    cpf_anonimizado: str | None = None
+    categoria_nivel: str | None = None
+    versao: int | None = Field(None, description="Versão lida pelo cliente; se não for mais a atual, a atualização é rejeitada (409)")
+
+    @field_validator("nome", "cpf_anonimizado", "categoria_nivel")
+    @classmethod
+    def nao_nulo(cls, valor):
+        # Obrigatórios em BeneficiarioBase: podem ser omitidos, mas não anulados
+        if valor is None:
+            raise ValueError("não pode ser nulo")
+        return valor
+
 class Beneficiario(BeneficiarioBase):
     id: int
+    versao: int
 
     class Config:
         from_attributes = True
\ No newline at end of file
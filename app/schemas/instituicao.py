@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 
 class InstituicaoBase(BaseModel):
     nome: str
@@ -10,8 +10,26 @@ class InstituicaoBase(BaseModel):
 class InstituicaoCreate(InstituicaoBase):
     pass
 
+class InstituicaoUpdate(BaseModel):
+    """Atualização parcial (PATCH): apenas os campos informados são alterados"""
+    nome: str | None = None
+    sigla: str | None = None
+    cidade: str | None = None
+    uf: str | None = None
+    pais: str | None = None
+    versao: int | None = Field(None, description="Versão lida pelo cliente; se não for mais a atual, a atualização é rejeitada (409)")
+
+    @field_validator("nome")
+    @classmethod
+    def nao_nulo(cls, valor):
+        # Obrigatórios em InstituicaoBase: podem ser omitidos, mas não anulados
+        if valor is None:
+            raise ValueError("não pode ser nulo")
+        return valor
+
 class Instituicao(InstituicaoBase):
     id: int
+    versao: int
 
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -1,5 +1,9 @@
 import datetime
-from pydantic import BaseModel
+from typing import Any, Dict
+from pydantic import BaseModel, Field, field_validator
+from app.schemas.beneficiario import Beneficiario
+from app.schemas.instituicao import Instituicao
+from app.schemas.programa import Programa
 
 class PagamentoBase(BaseModel):
     ano_referencia: int
@@ -17,8 +21,49 @@ class PagamentoBase(BaseModel):
 class PagamentoCreate(PagamentoBase):
     pass
 
+class PagamentoParcial(BaseModel):
+    """Campos de pagamento a alterar (apenas os informados são aplicados)"""
+    ano_referencia: int | None = None
+    processo: str | None = None
+    modalidade: str | None = None
+    linha_fomento: str | None = None
+    valor_pago: float | None = None
+    data_inicio: datetime.date | None = None
+    data_fim: datetime.date | None = None
+    titulo_projeto: str | None = None
+    fk_beneficiario: int | None = None
+    fk_instituicao: int | None = None
+    fk_programa: int | None = None
+
+    @field_validator("ano_referencia", "fk_beneficiario", "fk_instituicao", "fk_programa")
+    @classmethod
+    def nao_nulo(cls, valor):
+        # Obrigatórios em PagamentoBase: podem ser omitidos, mas não anulados
+        if valor is None:
+            raise ValueError("não pode ser nulo")
+        return valor
+
+class PagamentoFiltro(BaseModel):
+    """Seleção de pagamentos para manutenção em massa (filtros no formato do FilterBuilder)"""
+    filtros: Dict[str, Any] = Field(..., description="Ex.: {\"modalidade\": \"BP\", \"ano_referencia_gte\": 2020}")
+    dry_run: bool = Field(False, description="Apenas conta as linhas afetadas, sem alterar")
+
+class PagamentoAtualizacaoEmMassa(PagamentoFiltro):
+    valores: PagamentoParcial
+
+class PagamentoUpdate(PagamentoParcial):
+    """Atualização parcial (PATCH): apenas os campos informados são alterados"""
+    versao: int | None = Field(None, description="Versão lida pelo cliente; se não for mais a atual, a atualização é rejeitada (409)")
+
 class Pagamento(PagamentoBase):
     id: int
+    versao: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class PagamentoExpandido(Pagamento):
+    """Pagamento com as entidades relacionadas solicitadas via `expand=`"""
+    beneficiario: Beneficiario | None = None
+    instituicao: Instituicao | None = None
+    programa: Programa | None = None
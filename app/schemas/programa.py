@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class ProgramaBase(BaseModel):
     nome_chamada: str | None = None
@@ -10,8 +10,18 @@ class ProgramaBase(BaseModel):
 class ProgramaCreate(ProgramaBase):
     pass
 
+class ProgramaUpdate(BaseModel):
+    """Atualização parcial (PATCH): apenas os campos informados são alterados"""
+    nome_chamada: str | None = None
+    programa_cnpq: str | None = None
+    grande_area: str | None = None
+    area: str | None = None
+    subarea: str | None = None
+    versao: int | None = Field(None, description="Versão lida pelo cliente; se não for mais a atual, a atualização é rejeitada (409)")
+
 class Programa(ProgramaBase):
     id: int
+    versao: int
 
     class Config:
         from_attributes = True
\ No newline at end of file
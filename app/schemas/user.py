@@ -9,6 +9,10 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
+class UserUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    role: Optional[Literal["admin", "leitor"]] = None
+
 class UserResponse(UserBase):
     id: int
     is_active: bool
@@ -0,0 +1,167 @@
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy import asc, desc, func, select
+from sqlalchemy.orm import Session
+from app.models.beneficiario import Beneficiario
+from app.models.instituicao import Instituicao
+from app.models.pagamento import Pagamento
+from app.models.programa import Programa
+
+# Dimensões de agrupamento: nome público -> (coluna, tabela que precisa de join)
+DIMENSOES = {
+    "ano_referencia": (Pagamento.ano_referencia, None),
+    "modalidade": (Pagamento.modalidade, None),
+    "linha_fomento": (Pagamento.linha_fomento, None),
+    "beneficiario": (Pagamento.fk_beneficiario, None),
+    "instituicao": (Pagamento.fk_instituicao, None),
+    "programa": (Pagamento.fk_programa, None),
+    "beneficiario_categoria_nivel": (Beneficiario.categoria_nivel, Beneficiario),
+    "instituicao_sigla": (Instituicao.sigla, Instituicao),
+    "instituicao_cidade": (Instituicao.cidade, Instituicao),
+    "instituicao_uf": (Instituicao.uf, Instituicao),
+    "instituicao_pais": (Instituicao.pais, Instituicao),
+    "programa_cnpq": (Programa.programa_cnpq, Programa),
+    "programa_grande_area": (Programa.grande_area, Programa),
+    "programa_area": (Programa.area, Programa),
+    "programa_subarea": (Programa.subarea, Programa),
+}
+
+# Medidas sobre valor_pago
+MEDIDAS = {
+    "count": lambda: func.count(Pagamento.id),
+    "sum": lambda: func.coalesce(func.sum(Pagamento.valor_pago), 0.0),
+    "avg": lambda: func.avg(Pagamento.valor_pago),
+    "min": lambda: func.min(Pagamento.valor_pago),
+    "max": lambda: func.max(Pagamento.valor_pago),
+}
+
+# Filtros aceitos: igualdade em dimensões + faixas de valor e data
+FILTROS_IGUALDADE = {
+    "ano_referencia": "ano_referencia",
+    "modalidade": "modalidade",
+    "linha_fomento": "linha_fomento",
+    "fk_beneficiario": "beneficiario",
+    "fk_instituicao": "instituicao",
+    "fk_programa": "programa",
+    "uf": "instituicao_uf",
+    "grande_area": "programa_grande_area",
+}
+
+_JOINS = {
+    Beneficiario: Pagamento.fk_beneficiario == Beneficiario.id,
+    Instituicao: Pagamento.fk_instituicao == Instituicao.id,
+    Programa: Pagamento.fk_programa == Programa.id,
+}
+
+MAX_DIMENSOES = 4
+
+
+class AggregationError(ValueError):
+    """Parâmetros de agregação inválidos"""
+
+
+def parse_lista(valor: Optional[str]) -> List[str]:
+    """Converte 'a, b,a' em ['a', 'b'] preservando a ordem"""
+    itens = []
+    for item in (valor or "").split(","):
+        item = item.strip()
+        if item and item not in itens:
+            itens.append(item)
+    return itens
+
+
+def validar_agregacao(group_by: Sequence[str], medidas: Sequence[str]) -> None:
+    invalidas = [d for d in group_by if d not in DIMENSOES]
+    if invalidas:
+        raise AggregationError(
+            f"Dimensões inválidas: {', '.join(invalidas)}. Opções: {', '.join(DIMENSOES)}"
+        )
+    if len(group_by) > MAX_DIMENSOES:
+        raise AggregationError(f"Máximo de {MAX_DIMENSOES} dimensões por consulta")
+    invalidas = [m for m in medidas if m not in MEDIDAS]
+    if invalidas or not medidas:
+        raise AggregationError(f"Medidas inválidas. Opções: {', '.join(MEDIDAS)}")
+
+
+def filtros_sql(filtros: Dict[str, Any]):
+    """
+    Converte os filtros analíticos em (condições, tabelas de dimensão necessárias)
+    """
+    condicoes, tabelas = [], set()
+    for chave, dimensao in FILTROS_IGUALDADE.items():
+        valor = filtros.get(chave)
+        if valor is None or valor == "":
+            continue
+        coluna, tabela = DIMENSOES[dimensao]
+        condicoes.append(coluna == valor)
+        if tabela is not None:
+            tabelas.add(tabela)
+
+    if filtros.get("valor_min") is not None:
+        condicoes.append(Pagamento.valor_pago >= filtros["valor_min"])
+    if filtros.get("valor_max") is not None:
+        condicoes.append(Pagamento.valor_pago <= filtros["valor_max"])
+    if filtros.get("data_inicio_desde") is not None:
+        condicoes.append(Pagamento.data_inicio >= filtros["data_inicio_desde"])
+    if filtros.get("data_inicio_ate") is not None:
+        condicoes.append(Pagamento.data_inicio <= filtros["data_inicio_ate"])
+    return condicoes, tabelas
+
+
+def aplicar_joins(stmt, tabelas):
+    """Outer join só com as tabelas de dimensão usadas (mantém pagamentos órfãos)"""
+    for tabela in (Beneficiario, Instituicao, Programa):
+        if tabela in tabelas:
+            stmt = stmt.outerjoin(tabela, _JOINS[tabela])
+    return stmt
+
+
+def aggregate_pagamentos(
+    db: Session,
+    group_by: Sequence[str],
+    medidas: Sequence[str],
+    filtros: Dict[str, Any],
+    order_by: Optional[str] = None,
+    sort_order: str = "desc",
+    limit: int = 1000
+) -> Dict[str, Any]:
+    """
+    Agregação ad hoc de pagamentos por dimensões arbitrárias
+
+    Executa um único GROUP BY sobre pagamento com join apenas nas tabelas de
+    dimensão envolvidas.
+    """
+    validar_agregacao(group_by, medidas)
+    if order_by is not None and order_by not in medidas and order_by not in group_by:
+        raise AggregationError("order_by deve ser uma das medidas ou dimensões pedidas")
+
+    condicoes, tabelas = filtros_sql(filtros)
+    colunas_grupo = []
+    for dimensao in group_by:
+        coluna, tabela = DIMENSOES[dimensao]
+        colunas_grupo.append(coluna.label(dimensao))
+        if tabela is not None:
+            tabelas.add(tabela)
+    colunas_medida = [MEDIDAS[medida]().label(medida) for medida in medidas]
+
+    stmt = select(*colunas_grupo, *colunas_medida).select_from(Pagamento)
+    stmt = aplicar_joins(stmt, tabelas)
+    if condicoes:
+        stmt = stmt.where(*condicoes)
+    if colunas_grupo:
+        stmt = stmt.group_by(*colunas_grupo)
+
+    ordem = desc if sort_order == "desc" else asc
+    if order_by is not None:
+        stmt = stmt.order_by(ordem(order_by))
+    elif colunas_grupo:
+        stmt = stmt.order_by(*colunas_grupo)
+
+    # count(*) OVER () devolve o total de grupos na mesma passada do LIMIT
+    stmt = stmt.add_columns(func.count().over().label("_total_grupos")).limit(limit)
+    rows = db.execute(stmt).mappings().all()
+
+    grupos = [{k: v for k, v in row.items() if k != "_total_grupos"} for row in rows]
+    return {
+        "grupos": grupos,
+        "total_grupos": rows[0]["_total_grupos"] if rows else 0,
+    }
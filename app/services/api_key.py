@@ -0,0 +1,82 @@
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.cache import principal_cache
+from app.models.api_key import ApiKey
+from app.models.user import User
+
+PREFIXO_API_KEY = "cnpq_"
+
+def hash_api_key(api_key: str) -> str:
+    """
+    Digest SHA-256 (hex) da chave; só ele é gravado
+    """
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+def credencial_api_key(key_hash: str) -> str:
+    """
+    Chave da API key no cache de principais
+    """
+    return f"apikey:{key_hash}"
+
+def create_api_key(db: Session, user: User, nome: str, expira_em_dias: Optional[int] = None) -> Tuple[ApiKey, str]:
+    """
+    Emite uma API key para o usuário; retorna o registro e a chave em texto (exibida uma única vez)
+    """
+    api_key = PREFIXO_API_KEY + secrets.token_urlsafe(32)
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    db_api_key = ApiKey(
+        nome=nome,
+        prefixo=api_key[:len(PREFIXO_API_KEY) + 6],
+        key_hash=hash_api_key(api_key),
+        fk_user=user.id,
+        is_active=True,
+        criado_em=agora,
+        expira_em=agora + timedelta(days=expira_em_dias) if expira_em_dias else None
+    )
+    db.add(db_api_key)
+    db.commit()
+    db.refresh(db_api_key)
+    return db_api_key, api_key
+
+def get_api_keys(db: Session, skip: int = 0, limit: int = 100):
+    """
+    Lista API keys (sem o segredo)
+    """
+    return db.query(ApiKey).offset(skip).limit(limit).all()
+
+def revoke_api_key(db: Session, api_key_id: int):
+    """
+    Revoga uma API key (efeito imediato neste processo)
+    """
+    db_api_key = db.query(ApiKey).filter(ApiKey.id == api_key_id).first()
+    if db_api_key:
+        db_api_key.is_active = False
+        db.commit()
+        db.refresh(db_api_key)
+        principal_cache.discard(credencial_api_key(db_api_key.key_hash))
+    return db_api_key
+
+def authenticate_api_key(db: Session, api_key: str) -> Optional[Tuple[User, Optional[datetime]]]:
+    """
+    Usuário dono de uma API key ativa e não expirada, e a expiração da chave
+
+    A busca é pelo digest (índice único); o digest lido é comparado em tempo
+    constante antes de aceitar a chave.
+    """
+    key_hash = hash_api_key(api_key)
+    db_api_key = db.query(ApiKey).filter(ApiKey.key_hash == key_hash).first()
+    if db_api_key is None or not hmac.compare_digest(db_api_key.key_hash, key_hash):
+        return None
+    if not db_api_key.is_active:
+        return None
+    agora = datetime.now(timezone.utc).replace(tzinfo=None)
+    if db_api_key.expira_em is not None and db_api_key.expira_em <= agora:
+        return None
+    user = db.query(User).filter(User.id == db_api_key.fk_user).first()
+    if user is None:
+        return None
+    return user, db_api_key.expira_em
@@ -0,0 +1,192 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import anyio
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.cache import entity_cache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.beneficiario import Beneficiario
+from app.models.instituicao import Instituicao
+from app.models.pagamento import Pagamento
+from app.models.programa import Programa
+from app.services.distribuicao import distribuicao_manager
+from app.services.estatisticas import calcular_estatisticas
+from app.services.ranking import ENTIDADES_RANKING, ranking_entidades
+from app.services.resumo import get_resumo_pagamentos
+from app.services.serie_temporal import serie_temporal_pagamentos
+from app.services.sketch import beneficiarios_distintos
+from app.services.snapshot import snapshot_manager
+
+logger = logging.getLogger(__name__)
+
+MODOS_AQUECIMENTO = ("foreground", "background", "off")
+LIMITE_ENTIDADES_AQUECIMENTO = 100  # registros por tabela levados ao cache de entidades
+
+
+class EstadoAquecimento:
+    """Situação do aquecimento da inicialização (exposta em /ready)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.modo = settings.warmup_mode
+        self.estado = "pendente"
+        self.iniciado_em: Optional[datetime] = None
+        self.duracao_segundos: Optional[float] = None
+        self.etapas: List[Dict[str, Any]] = []
+        self.erro: Optional[str] = None
+
+    def iniciar(self, modo: str) -> None:
+        with self._lock:
+            self.modo = modo
+            self.estado = "executando"
+            self.iniciado_em = datetime.now(timezone.utc)
+            self.duracao_segundos = None
+            self.etapas = []
+            self.erro = None
+
+    def registrar_etapa(self, etapa: str, duracao: float, **detalhes: Any) -> None:
+        with self._lock:
+            self.etapas.append({"etapa": etapa, "duracao_segundos": round(duracao, 4), **detalhes})
+
+    def finalizar(self, duracao: float, erro: Optional[str] = None) -> None:
+        with self._lock:
+            self.estado = "falhou" if erro else "concluido"
+            self.duracao_segundos = round(duracao, 4)
+            self.erro = erro
+
+    @property
+    def pronto(self) -> bool:
+        """A aplicação pode receber tráfego: o aquecimento terminou (ou está desativado)"""
+        return self.estado not in ("pendente", "executando")
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "modo": self.modo,
+                "estado": self.estado,
+                "iniciado_em": self.iniciado_em.isoformat() if self.iniciado_em else None,
+                "duracao_segundos": self.duracao_segundos,
+                "etapas": list(self.etapas),
+                "erro": self.erro,
+            }
+
+
+estado_aquecimento = EstadoAquecimento()
+
+
+def _aquecer_paginas() -> Dict[str, int]:
+    """
+    Lê as tabelas de dados para trazer suas páginas ao cache do SQLite/SO
+
+    Contar a última coluna (sem índice) obriga a varredura da tabela em vez
+    de apenas do índice da chave primária.
+    """
+    db = SessionLocal()
+    try:
+        linhas = {}
+        for modelo in (Beneficiario, Instituicao, Programa, Pagamento):
+            coluna = list(modelo.__table__.columns)[-1]
+            linhas[modelo.__tablename__] = db.execute(select(func.count(coluna))).scalar() or 0
+        return linhas
+    finally:
+        db.close()
+
+
+def _aquecer_distribuicao() -> None:
+    db = SessionLocal()
+    try:
+        distribuicao_manager.get(db)
+    finally:
+        db.close()
+
+
+def _aquecer_estatisticas(db) -> None:
+    calcular_estatisticas(db, Beneficiario, ["categoria_nivel"])
+    calcular_estatisticas(db, Instituicao, ["uf", "pais"])
+    calcular_estatisticas(db, Programa, ["grande_area", "area", "subarea"])
+    get_resumo_pagamentos(db, ["total", "modalidade", "ano_referencia", "linha_fomento"])
+    beneficiarios_distintos(db)
+
+
+def _aquecer_rankings(db) -> None:
+    for dimensao in ENTIDADES_RANKING:
+        ranking_entidades(db, dimensao)
+
+
+def _aquecer_serie_temporal(db) -> None:
+    serie_temporal_pagamentos(db, {})
+
+
+def _aquecer_entidades(db) -> None:
+    """Primeiras páginas de cada tabela no cache de entidades por ID"""
+    for modelo in (Beneficiario, Instituicao, Programa, Pagamento):
+        ids = db.scalars(select(modelo.id).order_by(modelo.id).limit(LIMITE_ENTIDADES_AQUECIMENTO)).all()
+        entity_cache.get_many(db, modelo, ids)
+
+
+# Consultas de WARMUP_QUERIES: nome -> função que recebe a sessão
+CONSULTAS_AQUECIMENTO: Dict[str, Callable[[Session], None]] = {
+    "estatisticas": _aquecer_estatisticas,
+    "rankings": _aquecer_rankings,
+    "serie_temporal": _aquecer_serie_temporal,
+    "entidades": _aquecer_entidades,
+}
+
+def _aquecer_consultas(nomes: List[str]) -> Dict[str, Any]:
+    """Executa as consultas pedidas direto nos serviços, com uma sessão própria"""
+    desconhecidas = [nome for nome in nomes if nome not in CONSULTAS_AQUECIMENTO]
+    if desconhecidas:
+        raise ValueError(
+            f"WARMUP_QUERIES inválido: {', '.join(desconhecidas)}. Use: {', '.join(CONSULTAS_AQUECIMENTO)}"
+        )
+    db = SessionLocal()
+    try:
+        for nome in nomes:
+            CONSULTAS_AQUECIMENTO[nome](db)
+    finally:
+        db.close()
+    return {"consultas": list(nomes)}
+
+
+async def executar_aquecimento(modo: str) -> None:
+    """
+    Pré-computa estruturas e aquece caches antes (ou logo após) atender tráfego
+
+    Etapas: páginas das tabelas no cache do SQLite, índice de distribuição de
+    valor_pago, snapshot colunar (se ativo) e as consultas de WARMUP_QUERIES
+    (estatísticas, rankings, série temporal e primeiras páginas no cache de
+    entidades), chamadas direto nos serviços, sem passar por autenticação.
+    Falhas são registradas sem derrubar a aplicação.
+    """
+    estado_aquecimento.iniciar(modo)
+    inicio = time.perf_counter()
+    erro = None
+    try:
+        etapa = time.perf_counter()
+        linhas = await anyio.to_thread.run_sync(_aquecer_paginas)
+        estado_aquecimento.registrar_etapa("paginas", time.perf_counter() - etapa, linhas=linhas)
+
+        etapa = time.perf_counter()
+        await anyio.to_thread.run_sync(_aquecer_distribuicao)
+        estado_aquecimento.registrar_etapa("distribuicao", time.perf_counter() - etapa)
+
+        if snapshot_manager.enabled:
+            etapa = time.perf_counter()
+            await anyio.to_thread.run_sync(snapshot_manager.load)
+            estado_aquecimento.registrar_etapa("snapshot", time.perf_counter() - etapa)
+
+        if settings.warmup_queries:
+            etapa = time.perf_counter()
+            detalhes = await anyio.to_thread.run_sync(_aquecer_consultas, settings.warmup_queries)
+            estado_aquecimento.registrar_etapa("consultas", time.perf_counter() - etapa, **detalhes)
+    except Exception as exc:
+        logger.exception("Falha no aquecimento da inicialização")
+        erro = str(exc)
+
+    duracao = time.perf_counter() - inicio
+    estado_aquecimento.finalizar(duracao, erro)
+    logger.info("Aquecimento (%s) concluído em %.2fs", modo, duracao)
@@ -0,0 +1,76 @@
+from typing import Any, Callable, Dict, Optional, Sequence
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.core.cache import entity_cache
+from app.core.database import begin_immediate
+from app.core.versioning import bump_data_version
+
+
+class ConflitoDeVersao(Exception):
+    """A linha foi alterada por outra escrita depois de lida pelo cliente"""
+
+    def __init__(self, versao_atual: int):
+        super().__init__(f"Registro alterado por outra requisição (versão atual: {versao_atual})")
+        self.versao_atual = versao_atual
+
+
+def atualizar_parcial(
+    db: Session,
+    modelo,
+    entidade_id: int,
+    campos: Dict[str, Any],
+    versao: Optional[int] = None,
+    anteriores: Sequence[str] = (),
+    apos_atualizar: Optional[Callable[[Session, Dict[str, Any], Dict[str, Any]], None]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Atualiza só os `campos` informados com um único UPDATE ... RETURNING
+
+    A coluna `versao` é incrementada no mesmo comando; com `versao` (a lida
+    pelo cliente) o UPDATE só casa se ela ainda for a atual, senão levanta
+    ConflitoDeVersao. Se algum campo de `anteriores` for alterado, esses
+    valores são lidos antes (o RETURNING do SQLite só traz os novos), já
+    com a trava de escrita tomada (nenhuma outra escrita entre a leitura e
+    o UPDATE), e `apos_atualizar` recebe (anterior, novo) na mesma transação.
+    Retorna a linha atualizada como dicionário, ou None se não existir.
+    """
+    condicoes = [modelo.id == entidade_id]
+    if versao is not None:
+        condicoes.append(modelo.versao == versao)
+
+    if not campos:
+        linha = db.execute(select(modelo).where(modelo.id == entidade_id)).scalar_one_or_none()
+        if linha is not None and versao is not None and linha.versao != versao:
+            raise ConflitoDeVersao(linha.versao)
+        return entity_cache.to_dict(linha) if linha is not None else None
+
+    anterior: Optional[Dict[str, Any]] = None
+    if any(campo in campos for campo in anteriores):
+        begin_immediate(db)
+        colunas = [getattr(modelo, campo) for campo in anteriores]
+        row = db.execute(select(*colunas).where(*condicoes)).first()
+        if row is not None:
+            anterior = dict(row._mapping)
+
+    stmt = (
+        update(modelo)
+        .where(*condicoes)
+        .values(**campos, versao=modelo.versao + 1)
+        .returning(*modelo.__table__.columns)
+    )
+    row = db.execute(stmt, execution_options={"synchronize_session": False}).first()
+    if row is None:
+        # Nenhuma linha casou: registro inexistente ou versão desatualizada
+        atual = db.execute(select(modelo.versao).where(modelo.id == entidade_id)).scalar()
+        db.rollback()
+        if atual is None:
+            return None
+        raise ConflitoDeVersao(atual)
+
+    novo = dict(row._mapping)
+    if apos_atualizar is not None and anterior is not None:
+        apos_atualizar(db, anterior, novo)
+    bump_data_version(db, modelo.__tablename__)
+    db.commit()
+    entity_cache.invalidate(modelo, entidade_id)
+    return novo
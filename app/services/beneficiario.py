@@ -1,6 +1,10 @@
 from sqlalchemy.orm import Session
 from app.models.beneficiario import Beneficiario
-from app.schemas.beneficiario import BeneficiarioCreate
+from app.schemas.beneficiario import BeneficiarioCreate, BeneficiarioUpdate
+from app.core.versioning import bump_data_version
+from app.core.cache import entity_cache
+from app.services.atualizacao import atualizar_parcial
+from app.services.lote import criar_em_lote
 
 def get_beneficiario(db: Session, beneficiario_id: int):
     return db.query(Beneficiario).filter(Beneficiario.id == beneficiario_id).first()
@@ -11,6 +15,33 @@ def get_beneficiarios(db: Session, skip: int = 0, limit: int = 100):  # ← Adic
 def create_beneficiario(db: Session, beneficiario: BeneficiarioCreate):
     db_beneficiario = Beneficiario(**beneficiario.dict())
     db.add(db_beneficiario)
+    bump_data_version(db, "beneficiario")
     db.commit()
     db.refresh(db_beneficiario)
-    return db_beneficiario
\ No newline at end of file
+    return db_beneficiario
+
+def create_beneficiarios_bulk(db: Session, itens: list, atomico: bool = False):
+    """Valida e cria um lote de beneficiários em uma única transação"""
+    return criar_em_lote(db, Beneficiario, BeneficiarioCreate, itens, atomico=atomico)
+
+def update_beneficiario(db: Session, db_beneficiario: Beneficiario, beneficiario: BeneficiarioCreate):
+    for key, value in beneficiario.model_dump(exclude_unset=True).items():
+        setattr(db_beneficiario, key, value)
+    bump_data_version(db, "beneficiario")
+    db.commit()
+    db.refresh(db_beneficiario)
+    entity_cache.invalidate(Beneficiario, db_beneficiario.id)
+    return db_beneficiario
+
+def patch_beneficiario(db: Session, beneficiario_id: int, beneficiario: BeneficiarioUpdate):
+    """Atualização parcial em um único UPDATE ... RETURNING (None se não existir)"""
+    campos = beneficiario.model_dump(exclude_unset=True)
+    versao = campos.pop("versao", None)
+    return atualizar_parcial(db, Beneficiario, beneficiario_id, campos, versao=versao)
+
+def delete_beneficiario(db: Session, db_beneficiario: Beneficiario):
+    beneficiario_id = db_beneficiario.id
+    db.delete(db_beneficiario)
+    bump_data_version(db, "beneficiario")
+    db.commit()
+    entity_cache.invalidate(Beneficiario, beneficiario_id)
\ No newline at end of file
@@ -0,0 +1,354 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.core.versioning import data_versions, on_version_commit
+from app.models.pagamento import Pagamento
+from app.models.versao import VersaoDados
+
+# Agrupamentos suportados: nome público -> coluna de pagamento
+AGRUPAMENTOS_DISTRIBUICAO = {
+    "modalidade": "modalidade",
+    "programa": "fk_programa",
+}
+
+# Linhas de deltas aguardando aplicação; além disso o índice é remontado
+MAX_LINHAS_PENDENTES = 200000
+
+QUANTIS_PADRAO = (0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+ESCALAS_HISTOGRAMA = ("linear", "log")
+
+
+class DistribuicaoValores:
+    """
+    Valores de valor_pago já ordenados
+
+    Quantis são acessos por índice e histogramas/outliers usam busca binária,
+    então nenhuma consulta ordena os dados novamente.
+    """
+
+    def __init__(self, valores: List[float]):
+        self.valores = valores
+
+    @property
+    def total(self) -> int:
+        return len(self.valores)
+
+    def com_delta(self, removidos: List[float], adicionados: List[float]) -> Optional["DistribuicaoValores"]:
+        """
+        Nova distribuição sem `removidos` e com `adicionados` (a atual não muda)
+
+        As remoções são localizadas por busca binária e a lista é remontada
+        por fatias; as inclusões ordenadas são intercaladas por um sort (duas
+        sequências já ordenadas: O(n)). Retorna None se um valor removido
+        não estiver presente (índice divergente do banco).
+        """
+        valores = self.valores
+        if removidos:
+            partes, inicio = [], 0
+            for valor in sorted(removidos):
+                posicao = bisect_left(valores, valor, inicio)
+                if posicao == len(valores) or valores[posicao] != valor:
+                    return None
+                partes.append(valores[inicio:posicao])
+                inicio = posicao + 1
+            partes.append(valores[inicio:])
+            valores = list(chain.from_iterable(partes))
+        else:
+            valores = list(valores)
+        if adicionados:
+            valores.extend(sorted(adicionados))
+            valores.sort()
+        return DistribuicaoValores(valores)
+
+    def quantil(self, q: float) -> Optional[float]:
+        """Quantil com interpolação linear entre as posições vizinhas"""
+        if not self.valores:
+            return None
+        posicao = q * (len(self.valores) - 1)
+        inferior = int(posicao)
+        superior = min(inferior + 1, len(self.valores) - 1)
+        fracao = posicao - inferior
+        return self.valores[inferior] + (self.valores[superior] - self.valores[inferior]) * fracao
+
+    def contar_entre(self, inicio: float, fim: float, incluir_fim: bool = False) -> int:
+        """Quantidade de valores em [inicio, fim) (ou [inicio, fim])"""
+        corte = bisect_right if incluir_fim else bisect_left
+        return corte(self.valores, fim) - bisect_left(self.valores, inicio)
+
+    def histograma(self, bins: int, escala: str = "linear") -> Dict[str, Any]:
+        """
+        Divide [mínimo, máximo] em `bins` faixas de mesma largura
+
+        Na escala log as faixas têm razão constante; valores <= 0 são
+        contados à parte em `nao_positivos`.
+        """
+        resultado: Dict[str, Any] = {"escala": escala, "faixas": []}
+        valores = self.valores
+        if escala == "log":
+            primeiro_positivo = bisect_right(valores, 0.0)
+            resultado["nao_positivos"] = primeiro_positivo
+            valores = valores[primeiro_positivo:]
+        if not valores:
+            return resultado
+
+        minimo, maximo = valores[0], valores[-1]
+        if minimo == maximo:
+            limites = [minimo, maximo]
+        elif escala == "log":
+            razao = (maximo / minimo) ** (1.0 / bins)
+            limites = [minimo * razao ** i for i in range(bins)] + [maximo]
+        else:
+            largura = (maximo - minimo) / bins
+            limites = [minimo + largura * i for i in range(bins)] + [maximo]
+
+        distribuicao = DistribuicaoValores(valores)
+        ultima = len(limites) - 2
+        for i in range(len(limites) - 1):
+            resultado["faixas"].append({
+                "inicio": limites[i],
+                "fim": limites[i + 1],
+                "total": distribuicao.contar_entre(limites[i], limites[i + 1], incluir_fim=i == ultima),
+            })
+        return resultado
+
+    def outliers(self, fator_iqr: float = 1.5) -> Dict[str, Any]:
+        """Outliers pelo critério de Tukey: fora de [Q1 - k*IQR, Q3 + k*IQR]"""
+        if not self.valores:
+            return {"fator_iqr": fator_iqr, "limite_inferior": None, "limite_superior": None,
+                    "abaixo": 0, "acima": 0}
+        q1, q3 = self.quantil(0.25), self.quantil(0.75)
+        iqr = q3 - q1
+        limite_inferior = q1 - fator_iqr * iqr
+        limite_superior = q3 + fator_iqr * iqr
+        return {
+            "fator_iqr": fator_iqr,
+            "limite_inferior": limite_inferior,
+            "limite_superior": limite_superior,
+            "abaixo": bisect_left(self.valores, limite_inferior),
+            "acima": len(self.valores) - bisect_right(self.valores, limite_superior),
+        }
+
+    def resumo(
+        self,
+        quantis: Sequence[float] = QUANTIS_PADRAO,
+        bins: int = 20,
+        escala: str = "linear",
+        fator_iqr: float = 1.5
+    ) -> Dict[str, Any]:
+        return {
+            "total_valores": self.total,
+            "minimo": self.valores[0] if self.valores else None,
+            "maximo": self.valores[-1] if self.valores else None,
+            "quantis": {f"p{q * 100:g}": self.quantil(q) for q in quantis},
+            "histograma": self.histograma(bins, escala),
+            "outliers": self.outliers(fator_iqr),
+        }
+
+
+class IndiceDistribuicao:
+    """Distribuição geral e por agrupamento, montada em uma única leitura ordenada"""
+
+    def __init__(self, versao: str, geral: DistribuicaoValores,
+                 grupos: Dict[str, Dict[Any, DistribuicaoValores]]):
+        self.versao = versao
+        self.geral = geral
+        self.grupos = grupos
+
+    @classmethod
+    def build(cls, db: Session) -> "IndiceDistribuicao":
+        """
+        Lê a tabela inteira ordenada por valor_pago
+
+        A versão de `pagamento` é lida antes e depois: se mudou no meio da
+        leitura, o índice recebe a versão -1 e é remontado no próximo acesso.
+        """
+        colunas = [getattr(Pagamento, coluna) for coluna in AGRUPAMENTOS_DISTRIBUICAO.values()]
+        stmt = (
+            select(Pagamento.valor_pago, *colunas)
+            .where(Pagamento.valor_pago.isnot(None))
+            .order_by(Pagamento.valor_pago)
+        )
+        versao = _versao_pagamento(db)
+
+        # Como a leitura já vem ordenada, cada lista de grupo também nasce ordenada
+        geral: List[float] = []
+        por_grupo = {nome: defaultdict(list) for nome in AGRUPAMENTOS_DISTRIBUICAO}
+        for valor, *chaves in db.execute(stmt):
+            geral.append(valor)
+            for nome, chave in zip(AGRUPAMENTOS_DISTRIBUICAO, chaves):
+                por_grupo[nome][chave].append(valor)
+
+        grupos = {
+            nome: {chave: DistribuicaoValores(valores) for chave, valores in listas.items()}
+            for nome, listas in por_grupo.items()
+        }
+        if _versao_pagamento(db) != versao:
+            versao = -1
+        return cls(versao, DistribuicaoValores(geral), grupos)
+
+    def com_delta(
+        self, versao: int, removidos: List[Tuple], adicionados: List[Tuple]
+    ) -> Optional["IndiceDistribuicao"]:
+        """
+        Novo índice com as linhas (valor_pago, *chaves de agrupamento) alteradas
+
+        Só as listas afetadas são refeitas; as demais são compartilhadas com
+        o índice atual, que continua válido para quem já o está lendo.
+        """
+        geral = self.geral.com_delta([linha[0] for linha in removidos], [linha[0] for linha in adicionados])
+        if geral is None:
+            return None
+
+        grupos = {}
+        for posicao, nome in enumerate(AGRUPAMENTOS_DISTRIBUICAO, start=1):
+            alterados: Dict[Any, Tuple[List[float], List[float]]] = defaultdict(lambda: ([], []))
+            for lado, linhas in enumerate((removidos, adicionados)):
+                for linha in linhas:
+                    alterados[linha[posicao]][lado].append(linha[0])
+            grupos[nome] = dict(self.grupos[nome])
+            for chave, (saem, entram) in alterados.items():
+                atual = grupos[nome].get(chave, DistribuicaoValores([]))
+                novo = atual.com_delta(saem, entram)
+                if novo is None:
+                    return None
+                if novo.valores:
+                    grupos[nome][chave] = novo
+                else:
+                    grupos[nome].pop(chave, None)
+        return IndiceDistribuicao(versao, geral, grupos)
+
+
+def _versao_pagamento(db: Session) -> int:
+    return db.execute(select(VersaoDados.versao).where(VersaoDados.tabela == "pagamento")).scalar() or 0
+
+
+class DistribuicaoManager:
+    """
+    Mantém o índice de distribuição alinhado à versão da tabela `pagamento`
+
+    O índice é montado na inicialização. Escritas feitas por este processo
+    registram, após o commit, o delta das linhas alteradas junto com a
+    transição de versão (anterior -> nova); a consulta seguinte aplica os
+    deltas encadeados a partir da versão do índice, sem reler a tabela.
+    Só uma versão sem delta conhecido (importação, outro processo, deltas
+    acumulados demais) faz o índice ser remontado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lock_pendentes = threading.Lock()
+        self._indice: Optional[IndiceDistribuicao] = None
+        # versão anterior -> (versão nova, linhas removidas, linhas adicionadas)
+        self._pendentes: Dict[int, Tuple[int, List[Tuple], List[Tuple]]] = {}
+        self._linhas_pendentes = 0
+
+    def registrar_delta(self, anterior: int, nova: int, removidos: List[Tuple], adicionados: List[Tuple]) -> None:
+        with self._lock_pendentes:
+            self._linhas_pendentes += len(removidos) + len(adicionados)
+            if self._linhas_pendentes > MAX_LINHAS_PENDENTES:
+                self._pendentes.clear()
+                self._linhas_pendentes = 0
+                return
+            self._pendentes[anterior] = (nova, removidos, adicionados)
+
+    def _avancar(self, indice: IndiceDistribuicao) -> IndiceDistribuicao:
+        """Aplica de uma vez os deltas encadeados a partir da versão do índice"""
+        versao, removidos, adicionados = indice.versao, [], []
+        with self._lock_pendentes:
+            while versao in self._pendentes:
+                versao, saem, entram = self._pendentes.pop(versao)
+                removidos += saem
+                adicionados += entram
+            for anterior in [anterior for anterior in self._pendentes if anterior < versao]:
+                del self._pendentes[anterior]
+            self._linhas_pendentes = sum(len(r) + len(a) for _, r, a in self._pendentes.values())
+        if versao == indice.versao:
+            return indice
+        # Linhas incluídas e removidas dentro da cadeia se anulam (a remoção viria antes da inclusão)
+        saem, entram = Counter(removidos), Counter(adicionados)
+        comuns = saem & entram
+        removidos, adicionados = list((saem - comuns).elements()), list((entram - comuns).elements())
+        novo = indice.com_delta(versao, removidos, adicionados)
+        if novo is None:
+            return indice
+        return novo
+
+    def get(self, db: Session) -> IndiceDistribuicao:
+        versao = data_versions.get("pagamento")[0]
+        indice = self._indice
+        if indice is not None and indice.versao >= versao:
+            return indice
+        with self._lock:
+            indice = self._indice
+            if indice is not None and indice.versao < versao:
+                indice = self._indice = self._avancar(indice)
+            if indice is None or indice.versao < versao:
+                indice = self._avancar(IndiceDistribuicao.build(db))
+                self._indice = indice
+        return indice
+
+
+distribuicao_manager = DistribuicaoManager()
+
+
+def registrar_delta_distribuicao(
+    db: Session,
+    removidos: Iterable[Dict[str, Any]] = (),
+    adicionados: Iterable[Dict[str, Any]] = ()
+) -> None:
+    """
+    Guarda na sessão as linhas alteradas (com valor_pago) da transação
+
+    Publicadas para o índice só após o commit; descartadas no rollback.
+    """
+    colunas = ("valor_pago", *AGRUPAMENTOS_DISTRIBUICAO.values())
+    pendentes = db.info.setdefault("deltas_distribuicao", ([], []))
+    for lado, linhas in zip(pendentes, (removidos, adicionados)):
+        lado.extend(
+            tuple(linha.get(coluna) for coluna in colunas)
+            for linha in linhas if linha.get("valor_pago") is not None
+        )
+    if not event.contains(db, "after_rollback", _descartar_deltas):
+        event.listen(db, "after_rollback", _descartar_deltas)
+
+
+def _descartar_deltas(session: Session) -> None:
+    session.info.pop("deltas_distribuicao", None)
+
+
+def _publicar_deltas(session: Session, alteradas: Dict[str, Tuple[int, int]]) -> None:
+    removidos, adicionados = session.info.pop("deltas_distribuicao", ([], []))
+    if "pagamento" in alteradas:
+        anterior, nova = alteradas["pagamento"]
+        distribuicao_manager.registrar_delta(anterior, nova, removidos, adicionados)
+
+
+on_version_commit(_publicar_deltas)
+
+
+def get_distribuicao_pagamentos(
+    db: Session,
+    group_by: Optional[str] = None,
+    quantis: Sequence[float] = QUANTIS_PADRAO,
+    bins: int = 20,
+    escala: str = "linear",
+    fator_iqr: float = 1.5
+) -> Dict[str, Any]:
+    """
+    Quantis, histograma e outliers de valor_pago, opcionalmente por agrupamento
+    """
+    indice = distribuicao_manager.get(db)
+    parametros = {"quantis": quantis, "bins": bins, "escala": escala, "fator_iqr": fator_iqr}
+    resultado: Dict[str, Any] = {"geral": indice.geral.resumo(**parametros)}
+
+    if group_by is not None:
+        grupos = indice.grupos[group_by]
+        chaves = sorted(grupos, key=lambda chave: (chave is not None, chave))
+        resultado["grupos"] = [
+            {group_by: chave, **grupos[chave].resumo(**parametros)} for chave in chaves
+        ]
+    return resultado
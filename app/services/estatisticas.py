@@ -0,0 +1,49 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Sequence
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+
+class Estatisticas:
+    """
+    Resultado de uma passada agrupada na granularidade mais fina
+
+    Cada linha traz (chaves das dimensões, quantidade). Totais, agrupamentos
+    por uma dimensão e contagens de distintos são rollups em memória dessas
+    linhas, como um GROUPING SETS.
+    """
+
+    def __init__(self, dimensoes: Sequence[str], linhas: List[tuple]):
+        self.dimensoes = list(dimensoes)
+        self.linhas = linhas
+
+    @property
+    def total(self) -> int:
+        return sum(linha[-1] for linha in self.linhas)
+
+    def por(self, dimensao: str) -> List[Dict[str, Any]]:
+        """Rollup por uma dimensão: [{"chave", "total"}] ordenado pela chave"""
+        indice = self.dimensoes.index(dimensao)
+        grupos: Dict[Any, int] = defaultdict(int)
+        for linha in self.linhas:
+            grupos[linha[indice]] += linha[-1]
+
+        chaves = sorted(grupos, key=lambda chave: (chave is not None, chave))
+        return [{"chave": chave, "total": grupos[chave]} for chave in chaves]
+
+    def distintos(self, dimensao: str) -> int:
+        """Quantidade de valores distintos não nulos (como COUNT(DISTINCT))"""
+        indice = self.dimensoes.index(dimensao)
+        return len({linha[indice] for linha in self.linhas if linha[indice] is not None})
+
+
+def calcular_estatisticas(db: Session, modelo, dimensoes: Sequence[str]) -> Estatisticas:
+    """
+    Agrupa `modelo` por todas as `dimensoes` em uma única consulta
+
+    Todas as estatísticas da rota são derivadas do resultado sem novas
+    leituras da tabela.
+    """
+    colunas = [getattr(modelo, dimensao) for dimensao in dimensoes]
+    stmt = select(*colunas, func.count()).select_from(modelo).group_by(*colunas)
+    return Estatisticas(dimensoes, [tuple(row) for row in db.execute(stmt)])
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.pagamento import create_pagamentos_bulk
+
+logger = logging.getLogger(__name__)
+
+
+class FilaEscritaCheia(Exception):
+    """A fila de escrita atingiu o limite de itens pendentes"""
+
+
+class ItemRejeitado(ValueError):
+    """Item recusado na gravação do lote (ex.: chave estrangeira inexistente)"""
+
+    def __init__(self, erros: List[Dict[str, str]]):
+        super().__init__("; ".join(erro["mensagem"] for erro in erros))
+        self.erros = erros
+
+
+Pendente = Tuple[Dict[str, Any], Future, float]
+
+
+class FilaEscrita:
+    """
+    Fila write-behind: inclusões individuais gravadas em transações agrupadas
+
+    Cada item enfileirado recebe um Future. Uma thread própria junta até
+    `max_lote` itens, esperando no máximo `janela_ms` desde o primeiro, e os
+    grava com `gravar` (uma transação e um commit por lote). O Future só é
+    resolvido (com o id) depois do commit: quem aguarda tem a mesma garantia
+    de durabilidade de uma inclusão direta. Itens recusados na gravação
+    recebem ItemRejeitado; falhas do lote inteiro chegam a todos os Futures.
+    """
+
+    def __init__(
+        self,
+        gravar: Callable[[Session, List[Dict[str, Any]]], Dict[str, Any]],
+        max_lote: int = 500,
+        janela_ms: float = 20.0,
+        max_fila: int = 10000
+    ):
+        self._gravar = gravar
+        self.max_lote = max_lote
+        self.janela = janela_ms / 1000
+        self.max_fila = max_fila
+        self._cond = threading.Condition()
+        self._pendentes: Deque[Pendente] = deque()
+        self._thread: Optional[threading.Thread] = None
+        self._encerrando = False
+        self.reset()
+
+    def reset(self) -> None:
+        self.em_gravacao = 0
+        self.lotes = 0
+        self.gravados = 0
+        self.rejeitados = 0
+        self.recusados = 0
+        self.falhas = 0
+        self.maior_lote = 0
+        self.tempo_gravacao = 0.0
+        self.tempo_espera = 0.0
+
+    def enviar(self, item: Dict[str, Any]) -> Future:
+        """Enfileira um item validado; o Future recebe o id após o commit do lote"""
+        futuro: Future = Future()
+        with self._cond:
+            if self._encerrando:
+                raise FilaEscritaCheia("Fila de escrita encerrada")
+            if len(self._pendentes) >= self.max_fila:
+                self.recusados += 1
+                raise FilaEscritaCheia(f"Fila de escrita cheia ({self.max_fila} itens)")
+            self._pendentes.append((item, futuro, time.perf_counter()))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="fila-escrita", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return futuro
+
+    def _proximo_lote(self) -> Optional[List[Pendente]]:
+        with self._cond:
+            while not self._pendentes:
+                if self._encerrando:
+                    return None
+                self._cond.wait()
+            # Janela contada a partir do item mais antigo; lote cheio ou encerramento grava já
+            prazo = self._pendentes[0][2] + self.janela
+            while len(self._pendentes) < self.max_lote and not self._encerrando:
+                restante = prazo - time.perf_counter()
+                if restante <= 0:
+                    break
+                self._cond.wait(restante)
+            lote = [self._pendentes.popleft() for _ in range(min(self.max_lote, len(self._pendentes)))]
+            # Itens cujo solicitante desistiu (Future cancelado) antes da gravação são descartados
+            lote = [pendente for pendente in lote if pendente[1].set_running_or_notify_cancel()]
+            self.em_gravacao = len(lote)
+            return lote
+
+    def _executar(self) -> None:
+        while True:
+            lote = self._proximo_lote()
+            if lote is None:
+                return
+            if lote:
+                self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote: List[Pendente]) -> None:
+        inicio = time.perf_counter()
+        db = SessionLocal()
+        try:
+            resultado = self._gravar(db, [item for item, _, _ in lote])
+        except Exception as exc:
+            db.rollback()
+            logger.exception("Falha ao gravar lote da fila de escrita (%d itens)", len(lote))
+            with self._cond:
+                self.falhas += len(lote)
+                self.em_gravacao = 0
+            for _, futuro, _ in lote:
+                futuro.set_exception(exc)
+            return
+        finally:
+            db.close()
+
+        fim = time.perf_counter()
+        gravados = 0
+        for (_, futuro, enfileirado), item in zip(lote, resultado["itens"]):
+            if item["status"] == "criado":
+                gravados += 1
+                futuro.set_result(item["id"])
+            else:
+                futuro.set_exception(ItemRejeitado(item["erros"]))
+        with self._cond:
+            self.em_gravacao = 0
+            self.lotes += 1
+            self.gravados += gravados
+            self.rejeitados += len(lote) - gravados
+            self.maior_lote = max(self.maior_lote, len(lote))
+            self.tempo_gravacao += fim - inicio
+            self.tempo_espera += sum(fim - enfileirado for _, _, enfileirado in lote)
+
+    def encerrar(self, timeout: Optional[float] = None) -> None:
+        """Grava o que estiver pendente e para a thread; um novo envio a recria"""
+        with self._cond:
+            self._encerrando = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+            self._encerrando = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            processados = self.gravados + self.rejeitados
+            return {
+                "habilitada": settings.write_behind_enabled,
+                "max_lote": self.max_lote,
+                "janela_ms": self.janela * 1000,
+                "max_fila": self.max_fila,
+                "na_fila": len(self._pendentes),
+                "em_gravacao": self.em_gravacao,
+                "lotes": self.lotes,
+                "gravados": self.gravados,
+                "rejeitados": self.rejeitados,
+                "recusados": self.recusados,
+                "falhas": self.falhas,
+                "maior_lote": self.maior_lote,
+                "itens_por_lote": processados / self.lotes if self.lotes else 0.0,
+                "tempo_medio_gravacao_ms": self.tempo_gravacao / self.lotes * 1000 if self.lotes else 0.0,
+                "espera_media_ms": self.tempo_espera / processados * 1000 if processados else 0.0,
+            }
+
+
+fila_pagamentos = FilaEscrita(
+    create_pagamentos_bulk,
+    max_lote=min(settings.write_behind_max_batch, settings.bulk_max_items),
+    janela_ms=settings.write_behind_window_ms,
+    max_fila=settings.write_behind_max_queue,
+)
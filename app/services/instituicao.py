@@ -1,6 +1,10 @@
 from sqlalchemy.orm import Session
 from app.models.instituicao import Instituicao
-from app.schemas.instituicao import InstituicaoCreate
+from app.schemas.instituicao import InstituicaoCreate, InstituicaoUpdate
+from app.core.versioning import bump_data_version
+from app.core.cache import entity_cache
+from app.services.atualizacao import atualizar_parcial
+from app.services.lote import criar_em_lote
 
 def get_instituicao(db: Session, instituicao_id: int):
     return db.query(Instituicao).filter(Instituicao.id == instituicao_id).first()
@@ -11,6 +15,33 @@ def get_instituicoes(db: Session, skip: int = 0, limit: int = 100):
 def create_instituicao(db: Session, instituicao: InstituicaoCreate):
     db_instituicao = Instituicao(**instituicao.dict())
     db.add(db_instituicao)
+    bump_data_version(db, "instituicao")
     db.commit()
     db.refresh(db_instituicao)
-    return db_instituicao
\ No newline at end of file
+    return db_instituicao
+
+def create_instituicoes_bulk(db: Session, itens: list, atomico: bool = False):
+    """Valida e cria um lote de instituições em uma única transação"""
+    return criar_em_lote(db, Instituicao, InstituicaoCreate, itens, atomico=atomico)
+
+def update_instituicao(db: Session, db_instituicao: Instituicao, instituicao: InstituicaoCreate):
+    for key, value in instituicao.model_dump(exclude_unset=True).items():
+        setattr(db_instituicao, key, value)
+    bump_data_version(db, "instituicao")
+    db.commit()
+    db.refresh(db_instituicao)
+    entity_cache.invalidate(Instituicao, db_instituicao.id)
+    return db_instituicao
+
+def patch_instituicao(db: Session, instituicao_id: int, instituicao: InstituicaoUpdate):
+    """Atualização parcial em um único UPDATE ... RETURNING (None se não existir)"""
+    campos = instituicao.model_dump(exclude_unset=True)
+    versao = campos.pop("versao", None)
+    return atualizar_parcial(db, Instituicao, instituicao_id, campos, versao=versao)
+
+def delete_instituicao(db: Session, db_instituicao: Instituicao):
+    instituicao_id = db_instituicao.id
+    db.delete(db_instituicao)
+    bump_data_version(db, "instituicao")
+    db.commit()
+    entity_cache.invalidate(Instituicao, instituicao_id)
\ No newline at end of file
@@ -0,0 +1,110 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.versioning import bump_data_version
+
+
+class LoteError(ValueError):
+    """Lote inválido como um todo (tamanho, modo atômico com erros)"""
+
+    def __init__(self, mensagem: str, resultado: Optional[Dict[str, Any]] = None):
+        super().__init__(mensagem)
+        self.resultado = resultado
+
+
+def _erros_validacao(exc: ValidationError) -> List[Dict[str, str]]:
+    return [
+        {"campo": ".".join(str(parte) for parte in erro["loc"]) or "item", "mensagem": erro["msg"]}
+        for erro in exc.errors()
+    ]
+
+
+def validar_fks(db: Session, linhas: Sequence[Dict[str, Any]], fks: Dict[str, Any]) -> List[List[Dict[str, str]]]:
+    """
+    Erros de chave estrangeira por linha, com um SELECT ... IN por coluna
+
+    `fks` mapeia a coluna da linha ao modelo referenciado.
+    """
+    erros: List[List[Dict[str, str]]] = [[] for _ in linhas]
+    for coluna, modelo in fks.items():
+        valores = {linha[coluna] for linha in linhas if linha.get(coluna) is not None}
+        existentes = set(db.execute(select(modelo.id).where(modelo.id.in_(valores))).scalars()) if valores else set()
+        for indice, linha in enumerate(linhas):
+            valor = linha.get(coluna)
+            if valor is not None and valor not in existentes:
+                erros[indice].append({"campo": coluna, "mensagem": f"{modelo.__tablename__} {valor} não existe"})
+    return erros
+
+
+def criar_em_lote(
+    db: Session,
+    modelo,
+    schema: Type[BaseModel],
+    itens: Sequence[Any],
+    atomico: bool = False,
+    fks: Optional[Dict[str, Any]] = None,
+    apos_inserir: Optional[Callable[[Session, List[Dict[str, Any]]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Valida e insere um lote de registros em uma única transação
+
+    Cada item é validado pelo `schema` (e pelas `fks`, se informadas). Os
+    válidos são inseridos com INSERT em lote (executemany com RETURNING dos
+    IDs), a versão da tabela é incrementada uma vez e há um único commit.
+    Com `atomico=True` qualquer item inválido rejeita o lote inteiro.
+    `apos_inserir` recebe as linhas inseridas (com id) na mesma transação.
+    """
+    if len(itens) > settings.bulk_max_items:
+        raise LoteError(f"O lote tem {len(itens)} itens; o máximo é {settings.bulk_max_items}")
+
+    inicio = time.perf_counter()
+    resultados: List[Dict[str, Any]] = [{"indice": indice} for indice in range(len(itens))]
+    validos: List[int] = []
+    linhas: List[Dict[str, Any]] = []
+    for indice, item in enumerate(itens):
+        try:
+            linha = schema.model_validate(item).model_dump()
+        except ValidationError as exc:
+            resultados[indice].update(status="erro", erros=_erros_validacao(exc))
+            continue
+        validos.append(indice)
+        linhas.append(linha)
+
+    if fks and linhas:
+        erros_fk = validar_fks(db, linhas, fks)
+        aceitos = [(indice, linha) for indice, linha, erros in zip(validos, linhas, erros_fk) if not erros]
+        for indice, erros in zip(validos, erros_fk):
+            if erros:
+                resultados[indice].update(status="erro", erros=erros)
+        validos = [indice for indice, _ in aceitos]
+        linhas = [linha for _, linha in aceitos]
+
+    total_erros = len(itens) - len(linhas)
+    if atomico and total_erros:
+        resumo = {"total": len(itens), "criados": 0, "erros": total_erros, "itens": resultados}
+        raise LoteError("Lote rejeitado: há itens inválidos (modo atômico)", resumo)
+
+    if linhas:
+        stmt = insert(modelo).returning(modelo.id, sort_by_parameter_order=True)
+        ids = list(db.execute(stmt, linhas).scalars())
+        for linha, novo_id in zip(linhas, ids):
+            linha["id"] = novo_id
+        if apos_inserir is not None:
+            apos_inserir(db, linhas)
+        bump_data_version(db, modelo.__tablename__)
+        db.commit()
+        for indice, novo_id in zip(validos, ids):
+            resultados[indice].update(status="criado", id=novo_id)
+
+    duracao = time.perf_counter() - inicio
+    return {
+        "total": len(itens),
+        "criados": len(linhas),
+        "erros": total_erros,
+        "duracao_segundos": round(duracao, 4),
+        "itens_por_segundo": round(len(linhas) / duracao, 1) if duracao > 0 else 0.0,
+        "itens": resultados,
+    }
@@ -1,16 +1,274 @@
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import Session
+from app.models.beneficiario import Beneficiario
+from app.models.instituicao import Instituicao
 from app.models.pagamento import Pagamento
-from app.schemas.pagamento import PagamentoCreate
+from app.models.programa import Programa
+from app.schemas.pagamento import PagamentoCreate, PagamentoParcial, PagamentoUpdate
+from app.core.cache import entity_cache
+from app.core.database import begin_immediate
+from app.core.filters import FilterBuilder
+from app.core.pagination import normalize_page, pagination_metadata
+from app.core.versioning import bump_data_version
+from app.services.atualizacao import atualizar_parcial
+from app.services.lote import criar_em_lote, validar_fks
+from app.services.distribuicao import registrar_delta_distribuicao
+from app.services.resumo import CAMPOS_RESUMO, aplicar_delta_resumo, snapshot_pagamento
+from app.services.sketch import DIMENSOES_SKETCH, atualizar_sketches_beneficiarios
+from app.services.snapshot import snapshot_manager
+
+# Relacionamentos que podem ser embutidos via `expand=`: nome -> (modelo, fk em pagamento)
+RELACOES_EXPANSIVEIS = {
+    "beneficiario": (Beneficiario, "fk_beneficiario"),
+    "instituicao": (Instituicao, "fk_instituicao"),
+    "programa": (Programa, "fk_programa"),
+}
+# Colunas que alimentam os sketches de beneficiários distintos
+CAMPOS_SKETCH = ("fk_beneficiario", "ano_referencia", *DIMENSOES_SKETCH.values())
+AMOSTRA_DRY_RUN = 20
+
+class OperacaoEmMassaError(ValueError):
+    """Filtro ou valores inválidos para atualização/remoção em massa"""
+
+class ReferenciaInvalidaError(ValueError):
+    """Chave estrangeira de um pagamento aponta para registro inexistente"""
+
+def embutir_relacoes(db: Session, pagamentos: List[Dict[str, Any]], expand: Iterable[str]) -> None:
+    """
+    Embute as entidades relacionadas nos dicionários de pagamento
+
+    As entidades vêm do cache por ID; as que faltarem são lidas com um único
+    SELECT ... IN por relacionamento.
+    """
+    for relacao in expand:
+        modelo, fk = RELACOES_EXPANSIVEIS[relacao]
+        entidades = entity_cache.get_many(db, modelo, (pagamento[fk] for pagamento in pagamentos))
+        for pagamento in pagamentos:
+            pagamento[relacao] = entidades.get(pagamento[fk])
 
 def get_pagamento(db: Session, pagamento_id: int):
     return db.query(Pagamento).filter(Pagamento.id == pagamento_id).first()
 
+def get_pagamento_cached(db: Session, pagamento_id: int) -> Optional[Dict[str, Any]]:
+    """Pagamento por ID como dicionário, pelo cache de entidades"""
+    return entity_cache.get(db, Pagamento, pagamento_id)
+
+def listar_pagamentos_snapshot(
+    db: Session,
+    filtros: Dict[str, Any],
+    page: int,
+    size: int,
+    sort_by: Optional[str] = None,
+    sort_order: str = "asc"
+) -> Optional[dict]:
+    """
+    Pagina pagamentos pelo snapshot colunar (modo opcional)
+
+    Filtro, contagem, ordenação e paginação são feitos em memória; só as linhas
+    da página são lidas do banco, por chave primária. Retorna None quando o
+    snapshot está desativado/desatualizado ou a consulta exige o banco.
+    Os itens são dicionários vindos do cache de entidades.
+    """
+    snapshot = snapshot_manager.current()
+    if snapshot is None or not snapshot.suporta(filtros, sort_by):
+        return None
+    
+    page, size = normalize_page(page, size)
+    total, ids = snapshot.paginar(filtros, (page - 1) * size, size, sort_by, sort_order)
+    
+    por_id = entity_cache.get_many(db, Pagamento, ids)
+    
+    return {
+        "items": [por_id[i] for i in ids if i in por_id],
+        "pagination": pagination_metadata(total, page, size)
+    }
+
 def get_pagamentos(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Pagamento).offset(skip).limit(limit).all()
 
+def _aplicar_deltas(
+    db: Session,
+    removidos: Sequence[Dict[str, Any]] = (),
+    adicionados: Sequence[Dict[str, Any]] = ()
+) -> None:
+    """Resumo e índice de distribuição recebem o mesmo delta, na transação do chamador"""
+    aplicar_delta_resumo(db, removidos, adicionados)
+    registrar_delta_distribuicao(db, removidos, adicionados)
+
 def create_pagamento(db: Session, pagamento: PagamentoCreate):
     db_pagamento = Pagamento(**pagamento.dict())
     db.add(db_pagamento)
+    novo = snapshot_pagamento(db_pagamento)
+    _aplicar_deltas(db, adicionados=[novo])
+    atualizar_sketches_beneficiarios(db, adicionados=[novo])
+    bump_data_version(db, "pagamento")
     db.commit()
     db.refresh(db_pagamento)
-    return db_pagamento
\ No newline at end of file
+    return db_pagamento
+
+def _manter_agregados(db: Session, linhas: List[Dict[str, Any]]) -> None:
+    """Resumo e sketches dos pagamentos inseridos em lote (na mesma transação)"""
+    _aplicar_deltas(db, adicionados=linhas)
+    atualizar_sketches_beneficiarios(db, adicionados=linhas)
+
+def create_pagamentos_bulk(db: Session, itens: list, atomico: bool = False):
+    """
+    Valida e cria um lote de pagamentos em uma única transação
+
+    Além do schema, as chaves estrangeiras são verificadas (um SELECT ... IN
+    por coluna); resumo e sketches recebem um único delta do lote.
+    """
+    fks = {fk: modelo for modelo, fk in RELACOES_EXPANSIVEIS.values()}
+    return criar_em_lote(
+        db, Pagamento, PagamentoCreate, itens, atomico=atomico, fks=fks, apos_inserir=_manter_agregados
+    )
+
+def update_pagamento(db: Session, db_pagamento: Pagamento, pagamento: PagamentoCreate):
+    anterior = snapshot_pagamento(db_pagamento)
+    for key, value in pagamento.model_dump(exclude_unset=True).items():
+        setattr(db_pagamento, key, value)
+    novo = snapshot_pagamento(db_pagamento)
+    _aplicar_deltas(db, removidos=[anterior], adicionados=[novo])
+    db.flush()
+    if any(anterior[campo] != novo[campo] for campo in CAMPOS_SKETCH):
+        atualizar_sketches_beneficiarios(db, removidos=[anterior], adicionados=[novo])
+    bump_data_version(db, "pagamento")
+    db.commit()
+    db.refresh(db_pagamento)
+    entity_cache.invalidate(Pagamento, db_pagamento.id)
+    return db_pagamento
+
+def _manter_agregados_alteracao(db: Session, anterior: Dict[str, Any], novo: Dict[str, Any]) -> None:
+    """Resumo e sketches de um pagamento alterado por PATCH (na mesma transação)"""
+    novo = {campo: novo[campo] for campo in CAMPOS_RESUMO}
+    _aplicar_deltas(db, removidos=[anterior], adicionados=[novo])
+    if any(anterior[campo] != novo[campo] for campo in CAMPOS_SKETCH):
+        atualizar_sketches_beneficiarios(db, removidos=[anterior], adicionados=[novo])
+
+def patch_pagamento(db: Session, pagamento_id: int, pagamento: PagamentoUpdate) -> Optional[Dict[str, Any]]:
+    """
+    Atualização parcial em um único UPDATE ... RETURNING (None se não existir)
+
+    Chaves estrangeiras alteradas são verificadas; resumo e sketches só são
+    tocados quando algum campo agregado muda.
+    """
+    campos = pagamento.model_dump(exclude_unset=True)
+    versao = campos.pop("versao", None)
+    fks = {fk: modelo for modelo, fk in RELACOES_EXPANSIVEIS.values() if fk in campos}
+    erros = validar_fks(db, [campos], fks)[0] if fks else []
+    if erros:
+        raise ReferenciaInvalidaError("; ".join(erro["mensagem"] for erro in erros))
+    return atualizar_parcial(
+        db, Pagamento, pagamento_id, campos, versao=versao,
+        anteriores=CAMPOS_RESUMO, apos_atualizar=_manter_agregados_alteracao
+    )
+
+def delete_pagamento(db: Session, db_pagamento: Pagamento):
+    pagamento_id = db_pagamento.id
+    anterior = snapshot_pagamento(db_pagamento)
+    _aplicar_deltas(db, removidos=[anterior])
+    db.delete(db_pagamento)
+    db.flush()
+    atualizar_sketches_beneficiarios(db, removidos=[anterior])
+    bump_data_version(db, "pagamento")
+    db.commit()
+    entity_cache.invalidate(Pagamento, pagamento_id)
+
+def _condicoes_em_massa(filtros: Dict[str, Any]) -> List[Any]:
+    """Condições do filtro em modo estrito; um filtro vazio (tabela inteira) é recusado"""
+    try:
+        condicoes = FilterBuilder(Pagamento).build_conditions(filtros, strict=True)
+    except ValueError as e:
+        raise OperacaoEmMassaError(str(e))
+    if not condicoes:
+        raise OperacaoEmMassaError("Informe ao menos um filtro; operações na tabela inteira não são permitidas")
+    return condicoes
+
+def _simular(db: Session, condicoes: List[Any]) -> Dict[str, Any]:
+    """Dry-run: quantidade de linhas afetadas e uma amostra dos IDs"""
+    total = db.execute(select(func.count()).select_from(Pagamento).where(*condicoes)).scalar()
+    amostra = db.execute(
+        select(Pagamento.id).where(*condicoes).order_by(Pagamento.id).limit(AMOSTRA_DRY_RUN)
+    ).scalars().all()
+    return {"dry_run": True, "total": total, "amostra_ids": amostra}
+
+def _resultado_em_massa(ids: List[int], inicio: float) -> Dict[str, Any]:
+    for pagamento_id in ids:
+        entity_cache.invalidate(Pagamento, pagamento_id)
+    return {
+        "dry_run": False,
+        "total": len(ids),
+        "ids": sorted(ids),
+        "duracao_segundos": round(time.perf_counter() - inicio, 4),
+    }
+
+def update_pagamentos_por_filtro(
+    db: Session,
+    filtros: Dict[str, Any],
+    valores: PagamentoParcial,
+    dry_run: bool = False
+) -> Dict[str, Any]:
+    """
+    Aplica `valores` a todos os pagamentos do filtro com um único UPDATE
+
+    Os campos agregados das linhas afetadas são lidos antes (um SELECT) para
+    que resumo e sketches recebam um único delta; alterações só em campos
+    fora dos agregados dispensam essa leitura. Retorna os IDs alterados.
+    """
+    condicoes = _condicoes_em_massa(filtros)
+    alteracoes = valores.model_dump(exclude_unset=True)
+    if not alteracoes:
+        raise OperacaoEmMassaError("Informe ao menos um campo em 'valores'")
+    fks = {fk: modelo for modelo, fk in RELACOES_EXPANSIVEIS.values() if fk in alteracoes}
+    erros = validar_fks(db, [alteracoes], fks)[0] if fks else []
+    if erros:
+        raise OperacaoEmMassaError("; ".join(erro["mensagem"] for erro in erros))
+    if dry_run:
+        return _simular(db, condicoes)
+
+    inicio = time.perf_counter()
+    agregados = [campo for campo in CAMPOS_RESUMO if campo in alteracoes]
+    anteriores: List[Dict[str, Any]] = []
+    if agregados:
+        # Com a trava de escrita, nenhuma linha entra ou muda entre a leitura e o UPDATE
+        begin_immediate(db)
+        colunas = [getattr(Pagamento, campo) for campo in CAMPOS_RESUMO]
+        anteriores = [dict(row._mapping) for row in db.execute(select(*colunas).where(*condicoes))]
+
+    stmt = update(Pagamento).where(*condicoes).values(**alteracoes, versao=Pagamento.versao + 1).returning(Pagamento.id)
+    ids = list(db.execute(stmt, execution_options={"synchronize_session": False}).scalars())
+
+    if ids and anteriores:
+        novos = [{**linha, **{campo: alteracoes[campo] for campo in agregados}} for linha in anteriores]
+        _aplicar_deltas(db, removidos=anteriores, adicionados=novos)
+        if any(campo in alteracoes for campo in CAMPOS_SKETCH):
+            atualizar_sketches_beneficiarios(db, removidos=anteriores, adicionados=novos)
+    if ids:
+        bump_data_version(db, "pagamento")
+    db.commit()
+    return _resultado_em_massa(ids, inicio)
+
+def delete_pagamentos_por_filtro(db: Session, filtros: Dict[str, Any], dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Remove todos os pagamentos do filtro com um único DELETE ... RETURNING
+
+    O RETURNING traz os campos agregados das linhas removidas, de onde saem
+    os deltas de resumo e sketches. Retorna os IDs removidos.
+    """
+    condicoes = _condicoes_em_massa(filtros)
+    if dry_run:
+        return _simular(db, condicoes)
+
+    inicio = time.perf_counter()
+    colunas = [Pagamento.id, *(getattr(Pagamento, campo) for campo in CAMPOS_RESUMO)]
+    stmt = delete(Pagamento).where(*condicoes).returning(*colunas)
+    removidos = [dict(row._mapping) for row in db.execute(stmt, execution_options={"synchronize_session": False})]
+    ids = [linha.pop("id") for linha in removidos]
+    if ids:
+        _aplicar_deltas(db, removidos=removidos)
+        atualizar_sketches_beneficiarios(db, removidos=removidos)
+        bump_data_version(db, "pagamento")
+    db.commit()
+    return _resultado_em_massa(ids, inicio)
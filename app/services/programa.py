@@ -1,6 +1,10 @@
 from sqlalchemy.orm import Session
 from app.models.programa import Programa
-from app.schemas.programa import ProgramaCreate
+from app.schemas.programa import ProgramaCreate, ProgramaUpdate
+from app.core.versioning import bump_data_version
+from app.core.cache import entity_cache
+from app.services.atualizacao import atualizar_parcial
+from app.services.lote import criar_em_lote
 
 def get_programa(db: Session, programa_id: int):
     return db.query(Programa).filter(Programa.id == programa_id).first()
@@ -11,6 +15,33 @@ def get_programas(db: Session, skip: int = 0, limit: int = 100):
 def create_programa(db: Session, programa: ProgramaCreate):
     db_programa = Programa(**programa.dict())
     db.add(db_programa)
+    bump_data_version(db, "programa")
     db.commit()
     db.refresh(db_programa)
-    return db_programa
\ No newline at end of file
+    return db_programa
+
+def create_programas_bulk(db: Session, itens: list, atomico: bool = False):
+    """Valida e cria um lote de programas em uma única transação"""
+    return criar_em_lote(db, Programa, ProgramaCreate, itens, atomico=atomico)
+
+def update_programa(db: Session, db_programa: Programa, programa: ProgramaCreate):
+    for key, value in programa.model_dump(exclude_unset=True).items():
+        setattr(db_programa, key, value)
+    bump_data_version(db, "programa")
+    db.commit()
+    db.refresh(db_programa)
+    entity_cache.invalidate(Programa, db_programa.id)
+    return db_programa
+
+def patch_programa(db: Session, programa_id: int, programa: ProgramaUpdate):
+    """Atualização parcial em um único UPDATE ... RETURNING (None se não existir)"""
+    campos = programa.model_dump(exclude_unset=True)
+    versao = campos.pop("versao", None)
+    return atualizar_parcial(db, Programa, programa_id, campos, versao=versao)
+
+def delete_programa(db: Session, db_programa: Programa):
+    programa_id = db_programa.id
+    db.delete(db_programa)
+    bump_data_version(db, "programa")
+    db.commit()
+    entity_cache.invalidate(Programa, programa_id)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import heapq
+from typing import Any, Dict, Optional
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.orm import Session
+from app.models.beneficiario import Beneficiario
+from app.models.instituicao import Instituicao
+from app.models.programa import Programa
+from app.models.resumo import ResumoEntidade, ResumoPagamento
+
+# Entidades ranqueáveis: dimensão em `resumo_entidade` -> (modelo, campos descritivos)
+ENTIDADES_RANKING = {
+    "beneficiario": (Beneficiario, ("nome", "categoria_nivel")),
+    "instituicao": (Instituicao, ("nome", "sigla", "cidade", "uf")),
+    "programa": (Programa, ("nome_chamada", "programa_cnpq", "grande_area")),
+}
+
+# Medidas de ordenação: nome público -> campo do resultado
+MEDIDAS_RANKING = {"sum": "valor_total", "count": "total_pagamentos"}
+
+
+def _celulas_filtradas(
+    dimensao: str,
+    ano_referencia: Optional[int],
+    modalidade: Optional[str],
+    uf: Optional[str]
+):
+    """Soma por entidade das células de `resumo_entidade` que atendem aos filtros"""
+    stmt = (
+        select(
+            ResumoEntidade.entidade,
+            func.sum(ResumoEntidade.total_pagamentos),
+            func.sum(ResumoEntidade.total_valores),
+            func.sum(ResumoEntidade.valor_total),
+        )
+        .where(ResumoEntidade.dimensao == dimensao, ResumoEntidade.entidade != 0)
+        .group_by(ResumoEntidade.entidade)
+    )
+    if ano_referencia is not None:
+        stmt = stmt.where(ResumoEntidade.ano_referencia == ano_referencia)
+    if modalidade:
+        stmt = stmt.where(ResumoEntidade.modalidade == modalidade)
+    if uf:
+        # A UF vem da instituição do pagamento (lida agora, não gravada no resumo)
+        stmt = stmt.where(
+            ResumoEntidade.fk_instituicao.in_(select(Instituicao.id).where(Instituicao.uf == uf))
+        )
+    return stmt
+
+
+def ranking_entidades(
+    db: Session,
+    dimensao: str,
+    medida: str = "sum",
+    limite: int = 20,
+    ano_referencia: Optional[int] = None,
+    modalidade: Optional[str] = None,
+    uf: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Top-N entidades por soma ou quantidade de valor_pago
+
+    Sem filtros lê os totais por entidade de `resumo_pagamento`; com filtros
+    soma as células de `resumo_entidade` (entidade/ano/modalidade/instituição).
+    Ambos são mantidos a cada escrita. A seleção é parcial, com heap:
+    O(E log N) em vez de ordenar todas as E entidades.
+    """
+    modelo, campos = ENTIDADES_RANKING[dimensao]
+    if ano_referencia is None and not modalidade and not uf:
+        stmt = select(
+            cast(ResumoPagamento.chave, Integer),
+            ResumoPagamento.total_pagamentos,
+            ResumoPagamento.total_valores,
+            ResumoPagamento.valor_total,
+        ).where(ResumoPagamento.dimensao == f"fk_{dimensao}", ResumoPagamento.chave != "")
+    else:
+        stmt = _celulas_filtradas(dimensao, ano_referencia, modalidade, uf)
+
+    indice = 3 if medida == "sum" else 1
+    total_entidades = 0
+
+    def grupos():
+        nonlocal total_entidades
+        for row in db.execute(stmt):
+            total_entidades += 1
+            yield row
+
+    # Empates resolvidos pelo menor id
+    top = heapq.nlargest(limite, grupos(), key=lambda row: (row[indice], -row[0]))
+
+    ids = [row[0] for row in top]
+    entidades = {
+        entidade.id: entidade
+        for entidade in db.query(modelo).filter(modelo.id.in_(ids)).all()
+    } if ids else {}
+
+    ranking = []
+    for posicao, (entidade_id, total, total_valores, valor_total) in enumerate(top, start=1):
+        entidade = entidades.get(entidade_id)
+        item = {"posicao": posicao, "id": entidade_id}
+        item.update({campo: getattr(entidade, campo, None) for campo in campos})
+        item.update({
+            "total_pagamentos": total,
+            "valor_total": float(valor_total),
+            "valor_medio": float(valor_total) / total_valores if total_valores else 0.0,
+        })
+        ranking.append(item)
+
+    return {"ranking": ranking, "total_entidades": total_entidades}
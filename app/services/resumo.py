@@ -0,0 +1,261 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+from sqlalchemy import String, bindparam, cast, func, literal, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from app.models.pagamento import Pagamento
+from app.models.resumo import ResumoEntidade, ResumoPagamento
+
+# Dimensões materializadas em `resumo_pagamento` ("total" é o agregado geral)
+DIMENSOES_RESUMO = (
+    "modalidade", "ano_referencia", "linha_fomento", "fk_beneficiario", "fk_instituicao", "fk_programa"
+)
+DIMENSOES_INTEIRAS = ("ano_referencia", "fk_beneficiario", "fk_instituicao", "fk_programa")
+# Entidades com totais em `resumo_entidade`: dimensão -> fk em pagamento
+ENTIDADES_RESUMO = {
+    "beneficiario": "fk_beneficiario",
+    "instituicao": "fk_instituicao",
+    "programa": "fk_programa",
+}
+CAMPOS_RESUMO = DIMENSOES_RESUMO + ("valor_pago",)
+
+
+def _chave(valor: Any) -> str:
+    return "" if valor is None else str(valor)
+
+
+def _valor_chave(dimensao: str, chave: str):
+    """Converte a chave textual de volta para o tipo da coluna"""
+    if chave == "":
+        return None
+    if dimensao in DIMENSOES_INTEIRAS:
+        return int(chave)
+    return chave
+
+
+def _celula_entidade(dimensao: str, linha: Dict[str, Any]) -> Tuple:
+    """Chave de `resumo_entidade` para um pagamento (ausentes viram 0 / "")"""
+    return (
+        dimensao,
+        linha.get(ENTIDADES_RESUMO[dimensao]) or 0,
+        linha.get("ano_referencia") or 0,
+        linha.get("modalidade") or "",
+        linha.get("fk_instituicao") or 0,
+    )
+
+
+def rebuild_resumo_entidades(db: Session) -> None:
+    """Recalcula `resumo_entidade` com um GROUP BY por entidade"""
+    db.query(ResumoEntidade).delete()
+
+    colunas = [
+        ResumoEntidade.dimensao,
+        ResumoEntidade.entidade,
+        ResumoEntidade.ano_referencia,
+        ResumoEntidade.modalidade,
+        ResumoEntidade.fk_instituicao,
+        ResumoEntidade.total_pagamentos,
+        ResumoEntidade.total_valores,
+        ResumoEntidade.valor_total,
+    ]
+    celula = [
+        func.coalesce(Pagamento.ano_referencia, 0),
+        func.coalesce(Pagamento.modalidade, ""),
+        func.coalesce(Pagamento.fk_instituicao, 0),
+    ]
+    for dimensao, fk in ENTIDADES_RESUMO.items():
+        entidade = func.coalesce(getattr(Pagamento, fk), 0)
+        agrupado = select(
+            literal(dimensao),
+            entidade,
+            *celula,
+            func.count(Pagamento.id),
+            func.count(Pagamento.valor_pago),
+            func.coalesce(func.sum(Pagamento.valor_pago), 0.0),
+        ).group_by(entidade, *celula)
+        db.execute(insert(ResumoEntidade).from_select(colunas, agrupado))
+
+
+def rebuild_resumo_pagamentos(db: Session) -> None:
+    """
+    Recalcula todas as dimensões a partir da tabela `pagamento`
+
+    Usado na importação; não faz commit (roda na transação do chamador).
+    """
+    rebuild_resumo_entidades(db)
+    db.query(ResumoPagamento).delete()
+
+    colunas = [
+        ResumoPagamento.dimensao,
+        ResumoPagamento.chave,
+        ResumoPagamento.total_pagamentos,
+        ResumoPagamento.total_valores,
+        ResumoPagamento.valor_total,
+    ]
+    medidas = [
+        func.count(Pagamento.id),
+        func.count(Pagamento.valor_pago),
+        func.coalesce(func.sum(Pagamento.valor_pago), 0.0),
+    ]
+
+    total = select(literal("total"), literal(""), *medidas)
+    db.execute(insert(ResumoPagamento).from_select(colunas, total))
+
+    for dimensao in DIMENSOES_RESUMO:
+        chave = func.coalesce(cast(getattr(Pagamento, dimensao), String), "")
+        agrupado = select(literal(dimensao), chave, *medidas).group_by(chave)
+        db.execute(insert(ResumoPagamento).from_select(colunas, agrupado))
+
+
+def ensure_resumo_pagamentos(db: Session) -> None:
+    """Materializa o resumo se ele ainda não existir (bancos anteriores ao recurso)"""
+    total = db.query(ResumoPagamento).filter(ResumoPagamento.dimensao == "total").first()
+    if total is None:
+        rebuild_resumo_pagamentos(db)
+        db.commit()
+    elif total.total_pagamentos and (
+        db.query(ResumoEntidade).first() is None
+        or db.query(ResumoPagamento).filter(ResumoPagamento.dimensao == "fk_beneficiario").first() is None
+    ):
+        rebuild_resumo_pagamentos(db)
+        db.commit()
+
+
+def snapshot_pagamento(pagamento: Pagamento) -> Dict[str, Any]:
+    """Captura os campos relevantes para o resumo (antes de uma alteração)"""
+    return {campo: getattr(pagamento, campo) for campo in CAMPOS_RESUMO}
+
+
+def aplicar_delta_resumo(
+    db: Session,
+    removidos: Iterable[Dict[str, Any]] = (),
+    adicionados: Iterable[Dict[str, Any]] = ()
+) -> None:
+    """
+    Atualiza incrementalmente o resumo com pagamentos removidos/adicionados
+
+    Cada item é um dicionário com os campos de `CAMPOS_RESUMO`. Roda na
+    transação do chamador.
+    """
+    deltas: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0, 0.0])
+    deltas_entidade: Dict[Tuple, List[float]] = defaultdict(lambda: [0, 0, 0.0])
+
+    for sinal, linhas in ((-1, removidos), (1, adicionados)):
+        for linha in linhas:
+            valor = linha.get("valor_pago")
+            chaves = [("total", "")] + [
+                (dimensao, _chave(linha.get(dimensao))) for dimensao in DIMENSOES_RESUMO
+            ]
+            celulas = [_celula_entidade(dimensao, linha) for dimensao in ENTIDADES_RESUMO]
+            for acumulado, grupos in ((deltas, chaves), (deltas_entidade, celulas)):
+                for chave in grupos:
+                    delta = acumulado[chave]
+                    delta[0] += sinal
+                    if valor is not None:
+                        delta[1] += sinal
+                        delta[2] += sinal * valor
+
+    # Um único UPSERT por tabela executado em lote (executemany) com todas as células alteradas
+    parametros = [
+        {"dimensao": dimensao, "chave": chave, "total_pagamentos": total,
+         "total_valores": total_valores, "valor_total": valor_total}
+        for (dimensao, chave), (total, total_valores, valor_total) in deltas.items()
+        if total != 0 or total_valores != 0 or valor_total != 0
+    ]
+    if parametros:
+        stmt = insert(ResumoPagamento)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ResumoPagamento.dimensao, ResumoPagamento.chave],
+            set_={
+                "total_pagamentos": ResumoPagamento.total_pagamentos + stmt.excluded.total_pagamentos,
+                "total_valores": ResumoPagamento.total_valores + stmt.excluded.total_valores,
+                "valor_total": ResumoPagamento.valor_total + stmt.excluded.valor_total,
+            }
+        )
+        db.execute(stmt, parametros)
+
+    parametros = [
+        {"dimensao": dimensao, "entidade": entidade, "ano_referencia": ano, "modalidade": modalidade,
+         "fk_instituicao": fk_instituicao, "total_pagamentos": total,
+         "total_valores": total_valores, "valor_total": valor_total}
+        for (dimensao, entidade, ano, modalidade, fk_instituicao), (total, total_valores, valor_total)
+        in deltas_entidade.items()
+        if total != 0 or total_valores != 0 or valor_total != 0
+    ]
+    if parametros:
+        stmt = insert(ResumoEntidade)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                ResumoEntidade.dimensao, ResumoEntidade.entidade, ResumoEntidade.ano_referencia,
+                ResumoEntidade.modalidade, ResumoEntidade.fk_instituicao
+            ],
+            set_={
+                "total_pagamentos": ResumoEntidade.total_pagamentos + stmt.excluded.total_pagamentos,
+                "total_valores": ResumoEntidade.total_valores + stmt.excluded.total_valores,
+                "valor_total": ResumoEntidade.valor_total + stmt.excluded.valor_total,
+            }
+        )
+        db.execute(stmt, parametros)
+
+    # Grupos que ficaram vazios deixam de existir (como num GROUP BY). As duas
+    # tabelas são grandes (uma linha por beneficiário ao menos), então só as
+    # células que perderam pagamentos são verificadas, com um DELETE por chave
+    # primária executado em lote
+    grupos = [
+        {"d": dimensao, "c": chave}
+        for (dimensao, chave), (total, _, _) in deltas.items()
+        if total < 0 and dimensao != "total"
+    ]
+    if grupos:
+        tabela = ResumoPagamento.__table__
+        db.execute(
+            tabela.delete().where(
+                tabela.c.dimensao == bindparam("d"),
+                tabela.c.chave == bindparam("c"),
+                tabela.c.total_pagamentos <= 0
+            ),
+            grupos
+        )
+    celulas = [
+        {"d": dimensao, "e": entidade, "a": ano, "m": modalidade, "i": fk_instituicao}
+        for (dimensao, entidade, ano, modalidade, fk_instituicao), (total, _, _) in deltas_entidade.items()
+        if total < 0
+    ]
+    if celulas:
+        tabela = ResumoEntidade.__table__
+        db.execute(
+            tabela.delete().where(
+                tabela.c.dimensao == bindparam("d"),
+                tabela.c.entidade == bindparam("e"),
+                tabela.c.ano_referencia == bindparam("a"),
+                tabela.c.modalidade == bindparam("m"),
+                tabela.c.fk_instituicao == bindparam("i"),
+                tabela.c.total_pagamentos <= 0
+            ),
+            celulas
+        )
+
+
+def get_resumo_pagamentos(db: Session, dimensoes: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Lê as dimensões pedidas do resumo materializado em uma única consulta
+
+    Retorna {dimensao: [{"chave", "total_pagamentos", "valor_total", "valor_medio"}]}
+    ordenado pela chave. O(grupos), independente do número de pagamentos.
+    """
+    dimensoes = list(dimensoes)
+    resultado: Dict[str, List[Dict[str, Any]]] = {dimensao: [] for dimensao in dimensoes}
+    rows = db.query(ResumoPagamento).filter(ResumoPagamento.dimensao.in_(dimensoes)).all()
+
+    for row in rows:
+        resultado[row.dimensao].append({
+            "chave": _valor_chave(row.dimensao, row.chave),
+            "total_pagamentos": row.total_pagamentos,
+            "valor_total": row.valor_total,
+            "valor_medio": row.valor_total / row.total_valores if row.total_valores else 0.0,
+        })
+
+    for linhas in resultado.values():
+        linhas.sort(key=lambda linha: (linha["chave"] is not None, linha["chave"]))
+    return resultado
+
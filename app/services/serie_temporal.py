@@ -0,0 +1,83 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+from sqlalchemy import Integer, case, cast, func, select
+from sqlalchemy.orm import Session
+from app.models.pagamento import Pagamento
+from app.services.analytics import aplicar_joins, filtros_sql
+
+# Granularidades: nome -> meses por período
+GRANULARIDADES = {"month": 1, "quarter": 3}
+
+
+def _indice_periodo(ano: int, mes: int, meses_por_periodo: int) -> int:
+    """Posição absoluta do período (meses ou trimestres desde o ano 0)"""
+    return (ano * 12 + mes - 1) // meses_por_periodo
+
+
+def _rotulo_periodo(indice: int, meses_por_periodo: int) -> str:
+    if meses_por_periodo == 3:
+        return f"{indice // 4}-Q{indice % 4 + 1}"
+    return f"{indice // 12}-{indice % 12 + 1:02d}"
+
+
+def _contagem_por_mes(db: Session, data, medidas, condicoes, tabelas) -> List[Tuple]:
+    """GROUP BY (ano, mês) de uma expressão de data: [(ano, mes, *medidas)]"""
+    ano = cast(func.strftime("%Y", data), Integer)
+    mes = cast(func.strftime("%m", data), Integer)
+    stmt = aplicar_joins(select(ano, mes, *medidas).select_from(Pagamento), tabelas)
+    stmt = stmt.where(Pagamento.data_inicio.isnot(None), *condicoes).group_by(ano, mes)
+    return db.execute(stmt).all()
+
+
+def serie_temporal_pagamentos(
+    db: Session,
+    filtros: Dict[str, Any],
+    granularidade: str = "month"
+) -> List[Dict[str, Any]]:
+    """
+    Série temporal de pagamentos por período de `data_inicio`
+
+    Para cada período retorna os pagamentos iniciados (quantidade e valor) e as
+    concessões ativas, isto é, cujo intervalo data_inicio..data_fim cobre o
+    período. As ativas vêm de uma varredura: +1 no período de início, -1 no
+    período seguinte ao fim e soma acumulada. São apenas duas consultas
+    agregadas, qualquer que seja o número de períodos. Pagamentos sem
+    data_fim (ou com data_fim anterior ao início) contam só no período de início.
+    """
+    meses_por_periodo = GRANULARIDADES[granularidade]
+    condicoes, tabelas = filtros_sql(filtros)
+
+    iniciados: Dict[int, List] = defaultdict(lambda: [0, 0.0])
+    variacao: Dict[int, int] = defaultdict(int)
+
+    medidas = [func.count(Pagamento.id), func.coalesce(func.sum(Pagamento.valor_pago), 0.0)]
+    for ano, mes, total, valor in _contagem_por_mes(db, Pagamento.data_inicio, medidas, condicoes, tabelas):
+        periodo = _indice_periodo(ano, mes, meses_por_periodo)
+        iniciados[periodo][0] += total
+        iniciados[periodo][1] += valor
+        variacao[periodo] += total
+
+    fim = case(
+        (Pagamento.data_fim.is_(None), Pagamento.data_inicio),
+        (Pagamento.data_fim < Pagamento.data_inicio, Pagamento.data_inicio),
+        else_=Pagamento.data_fim
+    )
+    for ano, mes, total in _contagem_por_mes(db, fim, [func.count(Pagamento.id)], condicoes, tabelas):
+        variacao[_indice_periodo(ano, mes, meses_por_periodo) + 1] -= total
+
+    if not variacao:
+        return []
+
+    serie = []
+    ativas = 0
+    # O último índice de `variacao` é o período seguinte ao último fim (ativas = 0)
+    for periodo in range(min(variacao), max(variacao)):
+        ativas += variacao.get(periodo, 0)
+        total, valor = iniciados.get(periodo, (0, 0.0))
+        serie.append({
+            "periodo": _rotulo_periodo(periodo, meses_por_periodo),
+            "total_pagamentos": total,
+            "valor_total": float(valor),
+            "concessoes_ativas": ativas,
+        })
+    return serie
@@ -0,0 +1,311 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import String, bindparam, cast, func, literal, select, tuple_, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.hll import HyperLogLog, hash64
+from app.models.pagamento import Pagamento
+from app.models.sketch import SketchBeneficiarios, SketchContagem
+
+# Dimensões com sketch por ano: nome público -> coluna de pagamento ("total" é o ano inteiro)
+DIMENSOES_SKETCH = {
+    "programa": "fk_programa",
+    "instituicao": "fk_instituicao",
+    "modalidade": "modalidade",
+}
+
+DIMENSOES_INTEIRAS = ("programa", "instituicao")
+
+Celula = Tuple[str, str, int]
+
+
+def _celulas(linha: Dict[str, Any]) -> List[Celula]:
+    """Células (dimensao, chave, ano) às quais um pagamento pertence"""
+    ano = linha.get("ano_referencia") or 0
+    celulas = [("total", "", ano)]
+    for dimensao, coluna in DIMENSOES_SKETCH.items():
+        valor = linha.get(coluna)
+        celulas.append((dimensao, "" if valor is None else str(valor), ano))
+    return celulas
+
+
+def _valor_chave(dimensao: str, chave: str):
+    if chave == "":
+        return None
+    return int(chave) if dimensao in DIMENSOES_INTEIRAS else chave
+
+
+def _ler_pagamentos(db: Session) -> Iterable[Dict[str, Any]]:
+    colunas = ["fk_beneficiario", "ano_referencia", *DIMENSOES_SKETCH.values()]
+    stmt = select(*(getattr(Pagamento, coluna) for coluna in colunas)).where(
+        Pagamento.fk_beneficiario.isnot(None)
+    )
+    for row in db.execute(stmt).yield_per(10000):
+        yield dict(zip(colunas, row))
+
+
+def _construir(linhas: Iterable[Dict[str, Any]]) -> Dict[Celula, HyperLogLog]:
+    """Monta os sketches das células (o hash de cada beneficiário é calculado uma vez)"""
+    sketches: Dict[Celula, HyperLogLog] = {}
+    for linha in linhas:
+        h = hash64(linha["fk_beneficiario"])
+        for celula in _celulas(linha):
+            sketch = sketches.get(celula)
+            if sketch is None:
+                sketch = sketches[celula] = HyperLogLog(settings.hll_precision)
+            sketch.add_hash(h)
+    return sketches
+
+
+def _gravar(db: Session, sketches: Dict[Celula, HyperLogLog]) -> None:
+    if not sketches:
+        return
+    stmt = insert(SketchBeneficiarios)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SketchBeneficiarios.dimensao, SketchBeneficiarios.chave, SketchBeneficiarios.ano_referencia],
+        set_={"registradores": stmt.excluded.registradores}
+    )
+    db.execute(stmt, [
+        {"dimensao": dimensao, "chave": chave, "ano_referencia": ano, "registradores": sketch.to_bytes()}
+        for (dimensao, chave, ano), sketch in sketches.items()
+    ])
+
+
+def _carregar(db: Session, celulas: Set[Celula]) -> Dict[Celula, HyperLogLog]:
+    """Sketches gravados das células (em blocos de consultas com IN)"""
+    celulas = list(celulas)
+    sketches: Dict[Celula, HyperLogLog] = {}
+    for inicio in range(0, len(celulas), 1000):
+        rows = db.query(SketchBeneficiarios).filter(
+            tuple_(
+                SketchBeneficiarios.dimensao, SketchBeneficiarios.chave, SketchBeneficiarios.ano_referencia
+            ).in_(celulas[inicio:inicio + 1000])
+        )
+        for row in rows:
+            sketches[(row.dimensao, row.chave, row.ano_referencia)] = HyperLogLog.from_bytes(row.registradores)
+    return sketches
+
+
+def _rebuild_contagem(db: Session) -> None:
+    """Contagem de pagamentos por beneficiário e célula, com um GROUP BY por dimensão"""
+    db.query(SketchContagem).delete()
+    colunas = [
+        SketchContagem.dimensao, SketchContagem.chave, SketchContagem.ano_referencia,
+        SketchContagem.fk_beneficiario, SketchContagem.pagamentos,
+    ]
+    ano = func.coalesce(Pagamento.ano_referencia, 0)
+    grupos = [("total", literal(""))] + [
+        (dimensao, func.coalesce(cast(getattr(Pagamento, coluna), String), ""))
+        for dimensao, coluna in DIMENSOES_SKETCH.items()
+    ]
+    for dimensao, chave in grupos:
+        agrupado = (
+            select(literal(dimensao), chave, ano, Pagamento.fk_beneficiario, func.count())
+            .where(Pagamento.fk_beneficiario.isnot(None))
+            .group_by(chave, ano, Pagamento.fk_beneficiario)
+        )
+        db.execute(insert(SketchContagem).from_select(colunas, agrupado))
+
+
+def rebuild_sketches_beneficiarios(db: Session) -> None:
+    """
+    Recalcula todos os sketches (e a contagem por beneficiário) a partir da tabela `pagamento`
+
+    Usado na importação; não faz commit (roda na transação do chamador).
+    """
+    db.query(SketchBeneficiarios).delete()
+    sketches = _construir(_ler_pagamentos(db))
+    if sketches:
+        db.execute(insert(SketchBeneficiarios), [
+            {"dimensao": dimensao, "chave": chave, "ano_referencia": ano, "registradores": sketch.to_bytes()}
+            for (dimensao, chave, ano), sketch in sketches.items()
+        ])
+    _rebuild_contagem(db)
+
+
+def ensure_sketches_beneficiarios(db: Session) -> None:
+    """
+    Monta os sketches se ainda não existirem, se a precisão configurada
+    mudou ou se faltar a contagem por beneficiário (bancos anteriores a ela)
+    """
+    existente = db.query(SketchBeneficiarios).first()
+    if existente is None:
+        if db.query(Pagamento.id).filter(Pagamento.fk_beneficiario.isnot(None)).first() is None:
+            return
+    elif (
+        HyperLogLog.from_bytes(existente.registradores).precisao == settings.hll_precision
+        and db.query(SketchContagem).first() is not None
+    ):
+        return
+    rebuild_sketches_beneficiarios(db)
+    db.commit()
+
+
+def atualizar_sketches_beneficiarios(
+    db: Session,
+    removidos: Iterable[Dict[str, Any]] = (),
+    adicionados: Iterable[Dict[str, Any]] = ()
+) -> None:
+    """
+    Mantém os sketches após escritas em pagamento (na transação do chamador)
+
+    A contagem exata por (célula, beneficiário) recebe o delta em um UPSERT
+    em lote. Inclusões são somadas ao sketch existente. Um HyperLogLog não
+    suporta remoção: só quando a contagem de um beneficiário zera a célula
+    é marcada como pendente e recalculada a partir da contagem na próxima
+    leitura, sem reler pagamentos na escrita.
+    """
+    deltas: Dict[Tuple[str, str, int, int], int] = defaultdict(int)
+    for sinal, linhas in ((-1, removidos), (1, adicionados)):
+        for linha in linhas:
+            beneficiario = linha.get("fk_beneficiario")
+            if beneficiario is None:
+                continue
+            for celula in _celulas(linha):
+                deltas[(*celula, beneficiario)] += sinal
+    deltas = {chave: delta for chave, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    stmt = insert(SketchContagem)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[
+            SketchContagem.dimensao, SketchContagem.chave,
+            SketchContagem.ano_referencia, SketchContagem.fk_beneficiario
+        ],
+        set_={"pagamentos": SketchContagem.pagamentos + stmt.excluded.pagamentos}
+    )
+    db.execute(stmt, [
+        {"dimensao": dimensao, "chave": chave, "ano_referencia": ano,
+         "fk_beneficiario": beneficiario, "pagamentos": delta}
+        for (dimensao, chave, ano, beneficiario), delta in deltas.items()
+    ])
+
+    # Beneficiários que perderam pagamentos: os que zeraram saem da contagem
+    # (um SELECT por célula, pela chave primária) e a célula fica pendente
+    perdas: Dict[Celula, List[int]] = defaultdict(list)
+    for (dimensao, chave, ano, beneficiario), delta in deltas.items():
+        if delta < 0:
+            perdas[(dimensao, chave, ano)].append(beneficiario)
+    pendentes = []
+    for (dimensao, chave, ano), beneficiarios in perdas.items():
+        zerados = db.execute(
+            select(SketchContagem.fk_beneficiario).where(
+                SketchContagem.dimensao == dimensao,
+                SketchContagem.chave == chave,
+                SketchContagem.ano_referencia == ano,
+                SketchContagem.fk_beneficiario.in_(beneficiarios),
+                SketchContagem.pagamentos <= 0
+            )
+        ).scalars().all()
+        if zerados:
+            db.query(SketchContagem).filter(
+                SketchContagem.dimensao == dimensao,
+                SketchContagem.chave == chave,
+                SketchContagem.ano_referencia == ano,
+                SketchContagem.fk_beneficiario.in_(zerados)
+            ).delete(synchronize_session=False)
+            pendentes.append({"d": dimensao, "c": chave, "a": ano})
+    if pendentes:
+        tabela = SketchBeneficiarios.__table__
+        db.execute(
+            update(tabela).where(
+                tabela.c.dimensao == bindparam("d"),
+                tabela.c.chave == bindparam("c"),
+                tabela.c.ano_referencia == bindparam("a")
+            ).values(pendente=True),
+            pendentes
+        )
+
+    adicionados = [linha for linha in adicionados if linha.get("fk_beneficiario") is not None]
+    novos = _carregar(db, {celula for linha in adicionados for celula in _celulas(linha)})
+    for linha in adicionados:
+        h = hash64(linha["fk_beneficiario"])
+        for celula in _celulas(linha):
+            sketch = novos.get(celula)
+            if sketch is None:
+                sketch = novos[celula] = HyperLogLog(settings.hll_precision)
+            sketch.add_hash(h)
+    _gravar(db, novos)
+
+
+def _recalcular_pendentes(db: Session, dimensoes: Sequence[str], anos: Sequence[int]) -> None:
+    """Recalcula, a partir da contagem, os sketches pendentes das dimensões/anos lidos"""
+    query = db.query(SketchBeneficiarios).filter(
+        SketchBeneficiarios.dimensao.in_(dimensoes), SketchBeneficiarios.pendente.is_(True)
+    )
+    if anos:
+        query = query.filter(SketchBeneficiarios.ano_referencia.in_(anos))
+    celulas = [(row.dimensao, row.chave, row.ano_referencia) for row in query]
+    if not celulas:
+        return
+
+    sketches: Dict[Celula, HyperLogLog] = {}
+    for dimensao, chave, ano in celulas:
+        beneficiarios = db.execute(
+            select(SketchContagem.fk_beneficiario).where(
+                SketchContagem.dimensao == dimensao,
+                SketchContagem.chave == chave,
+                SketchContagem.ano_referencia == ano
+            )
+        ).scalars()
+        sketch = HyperLogLog(settings.hll_precision)
+        for beneficiario in beneficiarios:
+            sketch.add_hash(hash64(beneficiario))
+        sketches[(dimensao, chave, ano)] = sketch
+    # _gravar regrava os registradores; o UPSERT não toca `pendente`, então ela é zerada à parte
+    _gravar(db, sketches)
+    tabela = SketchBeneficiarios.__table__
+    db.execute(
+        update(tabela).where(
+            tabela.c.dimensao == bindparam("d"),
+            tabela.c.chave == bindparam("c"),
+            tabela.c.ano_referencia == bindparam("a")
+        ).values(pendente=False),
+        [{"d": dimensao, "c": chave, "a": ano} for dimensao, chave, ano in celulas]
+    )
+    db.commit()
+
+
+def beneficiarios_distintos(
+    db: Session,
+    group_by: Optional[str] = None,
+    anos: Sequence[int] = (),
+    limite: int = 100
+) -> Dict[str, Any]:
+    """
+    Estimativa de beneficiários distintos, geral e por grupo
+
+    Os sketches dos anos selecionados são unidos (máximo por registrador),
+    então um beneficiário pago em vários anos conta uma única vez. Células
+    pendentes (algum beneficiário saiu delas) são recalculadas antes.
+    """
+    dimensoes = ["total"] if group_by is None else ["total", group_by]
+    _recalcular_pendentes(db, dimensoes, anos)
+    query = db.query(SketchBeneficiarios).filter(SketchBeneficiarios.dimensao.in_(dimensoes))
+    if anos:
+        query = query.filter(SketchBeneficiarios.ano_referencia.in_(anos))
+
+    por_grupo: Dict[str, Dict[str, List[HyperLogLog]]] = defaultdict(lambda: defaultdict(list))
+    for row in query:
+        por_grupo[row.dimensao][row.chave].append(HyperLogLog.from_bytes(row.registradores))
+    unidos = {
+        dimensao: {chave: HyperLogLog.union(sketches) for chave, sketches in grupos.items()}
+        for dimensao, grupos in por_grupo.items()
+    }
+
+    total = unidos.get("total", {}).get("")
+    resultado: Dict[str, Any] = {
+        "total_estimado": round(total.count()) if total is not None else 0,
+        "erro_padrao_relativo": HyperLogLog.erro_padrao(settings.hll_precision),
+    }
+    if group_by is not None:
+        grupos = [
+            {group_by: _valor_chave(group_by, chave), "beneficiarios_distintos": round(sketch.count())}
+            for chave, sketch in unidos.get(group_by, {}).items()
+        ]
+        grupos.sort(key=lambda grupo: grupo["beneficiarios_distintos"], reverse=True)
+        resultado["total_grupos"] = len(grupos)
+        resultado["grupos"] = grupos[:limite]
+    return resultado
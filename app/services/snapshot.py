@@ -0,0 +1,425 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.versioning import data_versions, TABELAS_DADOS
+from app.models.beneficiario import Beneficiario
+from app.models.instituicao import Instituicao
+from app.models.pagamento import Pagamento
+from app.models.programa import Programa
+from app.services.analytics import DIMENSOES, FILTROS_IGUALDADE, AggregationError, validar_agregacao
+
+# NumPy é opcional: sem ele o modo snapshot fica desativado e tudo vai ao banco
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Colunas de dimensão vindas das tabelas relacionadas: nome -> (fk em pagamento, modelo, atributo)
+COLUNAS_RELACIONADAS = {
+    "beneficiario_categoria_nivel": ("fk_beneficiario", Beneficiario, "categoria_nivel"),
+    "instituicao_sigla": ("fk_instituicao", Instituicao, "sigla"),
+    "instituicao_cidade": ("fk_instituicao", Instituicao, "cidade"),
+    "instituicao_uf": ("fk_instituicao", Instituicao, "uf"),
+    "instituicao_pais": ("fk_instituicao", Instituicao, "pais"),
+    "programa_cnpq": ("fk_programa", Programa, "programa_cnpq"),
+    "programa_grande_area": ("fk_programa", Programa, "grande_area"),
+    "programa_area": ("fk_programa", Programa, "area"),
+    "programa_subarea": ("fk_programa", Programa, "subarea"),
+}
+
+# Colunas próprias de pagamento codificadas em dicionário (nome da dimensão -> coluna)
+COLUNAS_CODIFICADAS = {
+    "ano_referencia": "ano_referencia",
+    "modalidade": "modalidade",
+    "linha_fomento": "linha_fomento",
+    "beneficiario": "fk_beneficiario",
+    "instituicao": "fk_instituicao",
+    "programa": "fk_programa",
+}
+
+# Campos de ordenação atendidos pelo snapshot na listagem
+ORDENAVEIS = (
+    "id", "ano_referencia", "valor_pago", "data_inicio", "data_fim", "modalidade",
+    "linha_fomento", "fk_beneficiario", "fk_instituicao", "fk_programa",
+)
+
+# Filtros da listagem que exigem busca textual (continuam no banco)
+FILTROS_NAO_SUPORTADOS = ("search", "titulo_projeto_like")
+
+
+class ColunaCodificada:
+    """
+    Coluna codificada em dicionário: `codes[i]` indexa `valores` (-1 = nulo)
+
+    O dicionário é ordenado, então a ordem dos códigos é a ordem dos valores.
+    """
+
+    def __init__(self, codes, valores: list):
+        self.codes = codes
+        self.valores = valores
+        self.indice = {valor: code for code, valor in enumerate(valores)}
+
+    @classmethod
+    def from_values(cls, valores_linha: Sequence[Any]) -> "ColunaCodificada":
+        valores = sorted({v for v in valores_linha if v is not None})
+        indice = {valor: code for code, valor in enumerate(valores)}
+        codes = np.fromiter(
+            (indice[v] if v is not None else -1 for v in valores_linha),
+            dtype=np.int32,
+            count=len(valores_linha)
+        )
+        return cls(codes, valores)
+
+    def code(self, valor: Any) -> Optional[int]:
+        return self.indice.get(valor)
+
+    def decode(self, code: int):
+        return self.valores[code] if code >= 0 else None
+
+
+class PagamentoSnapshot:
+    """
+    Cópia colunar somente leitura de `pagamento` e das dimensões relacionadas
+
+    Filtros viram máscaras booleanas, ordenação usa seleção parcial e
+    agregações usam bincount/reduceat sobre os códigos das dimensões.
+    """
+
+    def __init__(self, versao: str):
+        self.versao = versao
+        self.criado_em = time.time()
+        self.ids = None
+        self.valor_pago = None
+        self.data_inicio = None
+        self.data_fim = None
+        self.processo = None
+        self.colunas: Dict[str, ColunaCodificada] = {}
+
+    @property
+    def total(self) -> int:
+        return int(self.ids.size)
+
+    # ------------------------------------------------------------------ carga
+
+    @classmethod
+    def load(cls, versao: str) -> "PagamentoSnapshot":
+        """Lê o banco (numa única transação) e monta as colunas"""
+        snapshot = cls(versao)
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                select(
+                    Pagamento.id,
+                    Pagamento.ano_referencia,
+                    Pagamento.modalidade,
+                    Pagamento.linha_fomento,
+                    Pagamento.valor_pago,
+                    Pagamento.data_inicio,
+                    Pagamento.data_fim,
+                    Pagamento.processo,
+                    Pagamento.fk_beneficiario,
+                    Pagamento.fk_instituicao,
+                    Pagamento.fk_programa,
+                ).order_by(Pagamento.id)
+            ).all()
+            (ids, anos, modalidades, linhas, valores, inicios, fins, processos,
+             fk_beneficiario, fk_instituicao, fk_programa) = zip(*rows) if rows else ([],) * 11
+
+            snapshot.ids = np.array(ids, dtype=np.int64)
+            snapshot.valor_pago = np.array(valores, dtype=np.float64)
+            snapshot.data_inicio = np.array(inicios, dtype="datetime64[D]")
+            snapshot.data_fim = np.array(fins, dtype="datetime64[D]")
+            snapshot.processo = np.array(processos, dtype=object)
+
+            brutos = {
+                "ano_referencia": anos,
+                "modalidade": modalidades,
+                "linha_fomento": linhas,
+                "fk_beneficiario": fk_beneficiario,
+                "fk_instituicao": fk_instituicao,
+                "fk_programa": fk_programa,
+            }
+            for dimensao, coluna in COLUNAS_CODIFICADAS.items():
+                snapshot.colunas[dimensao] = ColunaCodificada.from_values(brutos[coluna])
+
+            fks = {
+                coluna: np.array([fk if fk is not None else -1 for fk in brutos[coluna]], dtype=np.int64)
+                for coluna in ("fk_beneficiario", "fk_instituicao", "fk_programa")
+            }
+            for modelo in (Beneficiario, Instituicao, Programa):
+                atributos = {
+                    dimensao: atributo
+                    for dimensao, (_, m, atributo) in COLUNAS_RELACIONADAS.items() if m is modelo
+                }
+                fk = next(fk for fk, m, _ in COLUNAS_RELACIONADAS.values() if m is modelo)
+                snapshot._carregar_dimensao(db, modelo, atributos, fks[fk])
+        finally:
+            db.close()
+        return snapshot
+
+    def _carregar_dimensao(self, db, modelo, atributos: Dict[str, str], fk) -> None:
+        """Codifica atributos da tabela de dimensão e os projeta em cada pagamento"""
+        nomes = list(atributos.values())
+        rows = db.execute(select(modelo.id, *[getattr(modelo, nome) for nome in nomes])).all()
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+
+        # posição da linha de dimensão para cada pagamento (-1 = fk órfã ou nula)
+        maior = int(max(ids.max(initial=0), fk.max(initial=0))) + 1
+        posicao = np.full(maior, -1, dtype=np.int64)
+        posicao[ids] = np.arange(ids.size)
+        linha = np.where(fk >= 0, posicao[np.clip(fk, 0, None)], -1)
+
+        for i, (dimensao, nome) in enumerate(atributos.items(), start=1):
+            coluna = ColunaCodificada.from_values([row[i] for row in rows])
+            codes = np.where(linha >= 0, coluna.codes[np.clip(linha, 0, None)] if rows else -1, -1)
+            self.colunas[dimensao] = ColunaCodificada(codes.astype(np.int32), coluna.valores)
+
+    # ---------------------------------------------------------------- filtros
+
+    def suporta(self, filtros: Dict[str, Any], sort_by: Optional[str] = None) -> bool:
+        if any(filtros.get(chave) for chave in FILTROS_NAO_SUPORTADOS):
+            return False
+        return sort_by is None or sort_by in ORDENAVEIS
+
+    def mascara(self, filtros: Dict[str, Any]):
+        """Máscara booleana dos pagamentos que atendem aos filtros analíticos"""
+        mask = np.ones(self.total, dtype=bool)
+        for chave, dimensao in FILTROS_IGUALDADE.items():
+            valor = filtros.get(chave)
+            if valor is None or valor == "":
+                continue
+            coluna = self.colunas[dimensao]
+            code = coluna.code(valor)
+            if code is None:
+                return np.zeros(self.total, dtype=bool)
+            mask &= coluna.codes == code
+
+        if filtros.get("processo"):
+            mask &= self.processo == filtros["processo"]
+        if filtros.get("valor_min") is not None:
+            mask &= self.valor_pago >= filtros["valor_min"]
+        if filtros.get("valor_max") is not None:
+            mask &= self.valor_pago <= filtros["valor_max"]
+        if filtros.get("data_inicio_desde") is not None:
+            mask &= self.data_inicio >= np.datetime64(filtros["data_inicio_desde"], "D")
+        if filtros.get("data_inicio_ate") is not None:
+            mask &= self.data_inicio <= np.datetime64(filtros["data_inicio_ate"], "D")
+        return mask
+
+    # -------------------------------------------------------------- listagem
+
+    def _chave_ordenacao(self, sort_by: str):
+        """Chave float64 com nulos como -inf (primeiro no ASC, como no SQLite)"""
+        if sort_by == "id":
+            return self.ids.astype(np.float64)
+        if sort_by == "valor_pago":
+            return np.where(np.isnan(self.valor_pago), -np.inf, self.valor_pago)
+        if sort_by in ("data_inicio", "data_fim"):
+            datas = getattr(self, sort_by)
+            dias = datas.astype(np.int64).astype(np.float64)
+            return np.where(np.isnat(datas), -np.inf, dias)
+        dimensao = next(d for d, coluna in COLUNAS_CODIFICADAS.items() if coluna == sort_by or d == sort_by)
+        codes = self.colunas[dimensao].codes
+        return np.where(codes < 0, -np.inf, codes.astype(np.float64))
+
+    def paginar(
+        self,
+        filtros: Dict[str, Any],
+        offset: int,
+        size: int,
+        sort_by: Optional[str] = None,
+        sort_order: str = "asc"
+    ) -> Tuple[int, List[int]]:
+        """
+        Retorna (total filtrado, ids da página) usando seleção parcial (argpartition)
+        """
+        indices = np.flatnonzero(self.mascara(filtros))
+        total = int(indices.size)
+        fim = min(offset + size, total)
+        if offset >= total:
+            return total, []
+
+        if sort_by is None:
+            pagina = indices[offset:fim]
+        else:
+            chave = self._chave_ordenacao(sort_by)[indices]
+            if sort_order.lower() == "desc":
+                chave = -chave
+            if fim < total:
+                candidatos = np.argpartition(chave, fim - 1)[:fim]
+            else:
+                candidatos = np.arange(total)
+            ordem = candidatos[np.lexsort((indices[candidatos], chave[candidatos]))]
+            pagina = indices[ordem[offset:fim]]
+
+        return total, self.ids[pagina].tolist()
+
+    # ------------------------------------------------------------- agregação
+
+    def aggregate(
+        self,
+        group_by: Sequence[str],
+        medidas: Sequence[str],
+        filtros: Dict[str, Any],
+        order_by: Optional[str] = None,
+        sort_order: str = "desc",
+        limit: int = 1000
+    ) -> Dict[str, Any]:
+        """Mesma semântica de `aggregate_pagamentos`, calculada sobre as colunas"""
+        validar_agregacao(group_by, medidas)
+        if order_by is not None and order_by not in medidas and order_by not in group_by:
+            raise AggregationError("order_by deve ser uma das medidas ou dimensões pedidas")
+
+        indices = np.flatnonzero(self.mascara(filtros))
+        if not group_by and indices.size == 0:
+            # sem GROUP BY o SQL devolve uma linha mesmo sem pagamentos
+            grupos = np.zeros(0, dtype=np.int64)
+            inverso = np.zeros(0, dtype=np.int64)
+            n_grupos = 1
+        else:
+            # chave composta: dígitos mistos (código + 1, para o nulo virar 0)
+            chave = np.zeros(indices.size, dtype=np.int64)
+            for dimensao in group_by:
+                coluna = self.colunas[dimensao]
+                chave = chave * (len(coluna.valores) + 1) + (coluna.codes[indices].astype(np.int64) + 1)
+            grupos, inverso = np.unique(chave, return_inverse=True)
+            n_grupos = int(grupos.size)
+
+        valores = self.valor_pago[indices]
+        nao_nulos = ~np.isnan(valores)
+        resultado: Dict[str, Any] = {}
+        contagem = np.bincount(inverso, minlength=n_grupos)
+        contagem_valores = np.bincount(inverso, weights=nao_nulos, minlength=n_grupos)
+        soma = np.bincount(inverso, weights=np.where(nao_nulos, valores, 0.0), minlength=n_grupos)
+
+        for medida in medidas:
+            if medida == "count":
+                resultado[medida] = contagem.astype(np.float64)
+            elif medida == "sum":
+                resultado[medida] = soma
+            elif medida == "avg":
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    resultado[medida] = np.where(contagem_valores > 0, soma / contagem_valores, np.nan)
+            else:
+                resultado[medida] = self._extremo(medida, inverso, valores, nao_nulos, n_grupos)
+
+        # ordem padrão = ordem das chaves (como ORDER BY das dimensões)
+        ordem = np.arange(n_grupos)
+        if order_by is not None:
+            if order_by in medidas:
+                chave_ordem = np.where(np.isnan(resultado[order_by]), -np.inf, resultado[order_by])
+            else:
+                posicao = list(group_by).index(order_by)
+                chave_ordem = self._codigos_grupo(grupos, group_by)[posicao].astype(np.float64)
+            chave_ordem = -chave_ordem if sort_order == "desc" else chave_ordem
+            ordem = np.argsort(chave_ordem, kind="stable")
+        ordem = ordem[:limit]
+
+        codigos = self._codigos_grupo(grupos, group_by) if group_by else []
+        linhas = []
+        for g in ordem.tolist():
+            linha = {
+                dimensao: self.colunas[dimensao].decode(int(codigos[i][g]))
+                for i, dimensao in enumerate(group_by)
+            }
+            for medida in medidas:
+                valor = resultado[medida][g]
+                if medida == "count":
+                    linha[medida] = int(valor)
+                else:
+                    linha[medida] = None if np.isnan(valor) else float(valor)
+            linhas.append(linha)
+
+        return {"grupos": linhas, "total_grupos": n_grupos}
+
+    def _codigos_grupo(self, grupos, group_by: Sequence[str]) -> List[Any]:
+        """Decompõe a chave composta nos códigos de cada dimensão"""
+        codigos = []
+        resto = grupos.copy()
+        for dimensao in reversed(group_by):
+            base = len(self.colunas[dimensao].valores) + 1
+            codigos.append(resto % base - 1)
+            resto //= base
+        return codigos[::-1]
+
+    @staticmethod
+    def _extremo(medida: str, inverso, valores, nao_nulos, n_grupos: int):
+        """min/max por grupo via reduceat sobre os valores ordenados por grupo"""
+        neutro = np.inf if medida == "min" else -np.inf
+        func = np.minimum if medida == "min" else np.maximum
+        resultado = np.full(n_grupos, neutro)
+        if valores.size:
+            ordem = np.argsort(inverso, kind="stable")
+            grupos_ordenados = inverso[ordem]
+            inicios = np.flatnonzero(np.r_[True, grupos_ordenados[1:] != grupos_ordenados[:-1]])
+            dados = np.where(nao_nulos, valores, neutro)[ordem]
+            resultado[grupos_ordenados[inicios]] = func.reduceat(dados, inicios)
+        return np.where(np.isinf(resultado), np.nan, resultado)
+
+
+class SnapshotManager:
+    """
+    Mantém o snapshot atual e o recarrega em segundo plano quando os dados mudam
+
+    Enquanto o snapshot estiver desatualizado as consultas vão ao banco (fonte
+    da verdade); a troca pelo novo snapshot é uma atribuição atômica.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[PagamentoSnapshot] = None
+        self._lock = threading.Lock()
+        self._recarregando = False
+
+    @property
+    def enabled(self) -> bool:
+        return settings.snapshot_enabled and np is not None
+
+    def current(self) -> Optional[PagamentoSnapshot]:
+        """Snapshot consistente com a versão atual dos dados, ou None"""
+        if not self.enabled:
+            return None
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.versao == data_versions.token(*TABELAS_DADOS):
+            return snapshot
+        self.reload_async()
+        return None
+
+    def load(self) -> PagamentoSnapshot:
+        """Carrega um novo snapshot e o publica"""
+        # A versão é lida antes dos dados: no pior caso o snapshot nasce "velho" e é recarregado
+        versao = data_versions.token(*TABELAS_DADOS)
+        inicio = time.perf_counter()
+        snapshot = PagamentoSnapshot.load(versao)
+        self._snapshot = snapshot
+        logger.info(
+            "Snapshot de pagamentos carregado: %d linhas em %.2fs",
+            snapshot.total, time.perf_counter() - inicio
+        )
+        return snapshot
+
+    def reload_async(self) -> None:
+        """Dispara a recarga em uma thread (no máximo uma por vez)"""
+        with self._lock:
+            if self._recarregando:
+                return
+            self._recarregando = True
+
+        def recarregar():
+            try:
+                self.load()
+            except Exception:
+                logger.exception("Falha ao recarregar o snapshot de pagamentos")
+            finally:
+                with self._lock:
+                    self._recarregando = False
+
+        threading.Thread(target=recarregar, name="snapshot-reload", daemon=True).start()
+
+
+snapshot_manager = SnapshotManager()
@@ -1,7 +1,9 @@
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.models.user import User
-from app.schemas.user import UserCreate
-from app.core.security import get_password_hash, verify_password
+from app.schemas.user import UserCreate, UserUpdate
+from app.core.cache import principal_cache
+from app.core.security import get_password_hash_async, verify_password_async
 
 def get_user_by_username(db: Session, username: str):
     """
@@ -9,17 +11,19 @@ def get_user_by_username(db: Session, username: str):
     """
     return db.query(User).filter(User.username == username).first()
 
+def get_user(db: Session, user_id: int):
+    """
+    Busca usuário por ID
+    """
+    return db.query(User).filter(User.id == user_id).first()
+
 def get_user_by_email(db: Session, email: str):
     """
     Busca usuário por email
     """
     return db.query(User).filter(User.email == email).first()
 
-def create_user(db: Session, user: UserCreate):
-    """
-    Cria um novo usuário
-    """
-    hashed_password = get_password_hash(user.password)
+def _gravar_usuario(db: Session, user: UserCreate, hashed_password: str):
     db_user = User(
         username=user.username,
         email=user.email,
@@ -31,14 +35,21 @@ def create_user(db: Session, user: UserCreate):
     db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, username: str, password: str):
+async def create_user(db: Session, user: UserCreate):
+    """
+    Cria um novo usuário (o hash da senha roda no pool de hashing)
+    """
+    hashed_password = await get_password_hash_async(user.password)
+    return await run_in_threadpool(_gravar_usuario, db, user, hashed_password)
+
+async def authenticate_user(db: Session, username: str, password: str):
     """
-    Autentica usuário
+    Autentica usuário (a verificação bcrypt roda no pool de hashing)
     """
-    user = get_user_by_username(db, username)
+    user = await run_in_threadpool(get_user_by_username, db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
@@ -46,4 +57,19 @@ def get_users(db: Session, skip: int = 0, limit: int = 100):
     """
     Lista usuários (apenas admin)
     """
-    return db.query(User).offset(skip).limit(limit).all()
\ No newline at end of file
+    return db.query(User).offset(skip).limit(limit).all()
+
+def update_user(db: Session, user_id: int, user_update: UserUpdate):
+    """
+    Ativa/desativa um usuário ou altera seu papel (apenas admin)
+    """
+    db_user = get_user(db, user_id)
+    if db_user:
+        for key, value in user_update.model_dump(exclude_unset=True).items():
+            if value is not None:
+                setattr(db_user, key, value)
+        db.commit()
+        db.refresh(db_user)
+        # Tokens já emitidos passam a enxergar o novo estado na próxima requisição
+        principal_cache.invalidate(db_user.username)
+    return db_user
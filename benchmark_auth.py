@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo de autenticação por requisição (verify_token)
+
+Compara a verificação completa do JWT (HMAC + parsing das claims) com o
+cache de tokens verificados, em uma thread e com várias threads
+simultâneas reutilizando o mesmo token, como fazem os clientes da API.
+
+Uso: python benchmark_auth.py [requisicoes] [threads]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Adicionar o diretório raiz ao Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.security import create_access_token, token_cache, verify_token
+
+
+def medir(token: str, requisicoes: int, threads: int) -> float:
+    """Tempo total (s) de `requisicoes` chamadas de verify_token divididas entre `threads`"""
+    por_thread = max(1, requisicoes // threads)
+
+    def rodada(_):
+        for _ in range(por_thread):
+            verify_token(token)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(rodada, range(threads)))
+    return time.perf_counter() - inicio
+
+
+def main():
+    requisicoes = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    token = create_access_token(data={"sub": "benchmark", "role": "leitor"})
+    max_entries = token_cache.max_entries
+
+    print(f"verify_token: {requisicoes} chamadas com o mesmo token")
+    print(f"{'cenário':<28}{'total (s)':>12}{'µs/req':>10}{'req/s':>12}")
+    resultados = {}
+    for n_threads in (1, threads):
+        for nome, tamanho in (("sem cache", 0), ("com cache", max_entries or 4096)):
+            token_cache.max_entries = tamanho
+            token_cache.clear()
+            medir(token, min(1000, requisicoes), n_threads)  # aquecimento
+            total = medir(token, requisicoes, n_threads)
+            resultados[(n_threads, nome)] = total
+            cenario = f"{nome}, {n_threads} thread(s)"
+            print(f"{cenario:<28}{total:>12.3f}{total / requisicoes * 1e6:>10.1f}{requisicoes / total:>12.0f}")
+
+    for n_threads in (1, threads):
+        sem, com = resultados[(n_threads, "sem cache")], resultados[(n_threads, "com cache")]
+        economia = (sem - com) / requisicoes * 1e6
+        print(f"{n_threads} thread(s): {sem / com:.1f}x mais rápido, {economia:.1f} µs economizados por requisição")
+
+    token_cache.max_entries = max_entries
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,10 @@ from app.models.beneficiario import Beneficiario
 from app.models.instituicao import Instituicao
 from app.models.programa import Programa
 from app.models.pagamento import Pagamento
-from app.core.database import Base
+from app.core.database import Base, ensure_columns
+from app.core.versioning import bump_data_version, TABELAS_DADOS
+from app.services.resumo import rebuild_resumo_pagamentos
+from app.services.sketch import rebuild_sketches_beneficiarios
 
 # Configuração do banco
 DATABASE_URL = "sqlite:///./sql_app.db"
@@ -77,6 +80,7 @@ def import_from_csv(csv_file_path: str):
             
         # Criar tabelas se não existirem
         Base.metadata.create_all(bind=engine)
+        ensure_columns(engine)
         
         db = SessionLocal()
         
@@ -218,7 +222,11 @@ def import_from_csv(csv_file_path: str):
                     stats['erros'] += 1
                     continue
             
-            # Commit final
+            # Commit final (com o resumo materializado e a nova versão dos dados)
+            db.flush()
+            rebuild_resumo_pagamentos(db)
+            rebuild_sketches_beneficiarios(db)
+            bump_data_version(db, *TABELAS_DADOS)
             db.commit()
             
             print("\n" + "="*50)
@@ -252,6 +260,7 @@ def create_sample_data():
     
     # Criar tabelas
     Base.metadata.create_all(bind=engine)
+    ensure_columns(engine)
     
     db = SessionLocal()
     
@@ -311,6 +320,10 @@ def create_sample_data():
         
         for pag in pagamentos:
             db.add(pag)
+        db.flush()
+        rebuild_resumo_pagamentos(db)
+        rebuild_sketches_beneficiarios(db)
+        bump_data_version(db, *TABELAS_DADOS)
         db.commit()
         
         print("Dados de exemplo criados com sucesso!")
@@ -0,0 +1,140 @@
+import atexit
+import itertools
+import os
+import shutil
+import tempfile
+import zlib
+import pytest
+from fastapi.testclient import TestClient
+
+# Antes de qualquer import da aplicação: o banco é relativo ao diretório corrente
+# e as configurações são lidas uma única vez
+_diretorio = tempfile.mkdtemp(prefix="testes-cnpq-")
+atexit.register(shutil.rmtree, _diretorio, True)
+os.chdir(_diretorio)
+os.environ["WARMUP_MODE"] = "off"
+
+_sequencia = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.main import app
+    return app
+
+
+@pytest.fixture(scope="session")
+def cliente(app):
+    with TestClient(app) as cliente:
+        cliente.post("/auth/register", json={
+            "username": "admin", "email": "admin@teste.com", "password": "senha123", "role": "admin"
+        })
+        token = cliente.post("/auth/login", json={"username": "admin", "password": "senha123"}).json()["access_token"]
+        cliente.headers["Authorization"] = f"Bearer {token}"
+        yield cliente
+
+
+@pytest.fixture
+def novo_usuario(cliente):
+    """Registra um usuário; devolve o id e os headers com o seu token"""
+    def criar(role="leitor"):
+        username = f"usuario{next(_sequencia)}"
+        usuario = cliente.post("/auth/register", json={
+            "username": username, "email": f"{username}@teste.com", "password": "senha123", "role": role
+        }).json()
+        token = cliente.post("/auth/login", json={"username": username, "password": "senha123"}).json()["access_token"]
+        return usuario["id"], {"Authorization": f"Bearer {token}"}
+    return criar
+
+
+@pytest.fixture
+def entidades(cliente):
+    """Beneficiário, instituição e programa novos (as FKs de um pagamento)"""
+    n = next(_sequencia)
+    beneficiario = cliente.post("/beneficiarios/", json={
+        "nome": f"Beneficiário {n}", "cpf_anonimizado": f"***.{n:03d}.456-**", "categoria_nivel": "1A"
+    }).json()
+    instituicao = cliente.post("/instituicoes/", json={"nome": f"Universidade {n}", "uf": "SP"}).json()
+    programa = cliente.post("/programas/", json={"nome_chamada": f"Chamada {n}"}).json()
+    return {
+        "fk_beneficiario": beneficiario["id"],
+        "fk_instituicao": instituicao["id"],
+        "fk_programa": programa["id"],
+    }
+
+
+@pytest.fixture
+def criar_pagamento(cliente, entidades):
+    """Cria pagamentos pela API; campos omitidos usam as entidades do teste"""
+    def criar(**campos):
+        dados = {"ano_referencia": 2024, "modalidade": "GD", "valor_pago": 100.0, **entidades, **campos}
+        resposta = cliente.post("/pagamentos/", json=dados)
+        assert resposta.status_code == 200, resposta.text
+        return resposta.json()
+    return criar
+
+
+@pytest.fixture
+def conferir_agregados():
+    """
+    Compara os agregados mantidos por delta nas escritas com uma reconstrução completa
+
+    Resumo (por dimensão e por entidade), sketches de beneficiários com a
+    contagem exata e índice de distribuição de valor_pago.
+    """
+    from sqlalchemy import select
+    from app.core.database import SessionLocal
+    from app.models.resumo import ResumoEntidade, ResumoPagamento
+    from app.models.sketch import SketchBeneficiarios, SketchContagem
+    from app.services.distribuicao import IndiceDistribuicao, distribuicao_manager
+    from app.services.resumo import rebuild_resumo_pagamentos
+    from app.services.sketch import DIMENSOES_SKETCH, beneficiarios_distintos, rebuild_sketches_beneficiarios
+
+    def linhas(db, modelo):
+        return sorted(
+            tuple(round(valor, 6) if isinstance(valor, float) else valor for valor in row)
+            for row in db.execute(select(*modelo.__table__.columns))
+        )
+
+    def sketches(db):
+        # Células esvaziadas por remoções ficam com o sketch zerado; a reconstrução não as cria
+        resultado = {}
+        for row in db.query(SketchBeneficiarios):
+            registradores = zlib.decompress(row.registradores)
+            if any(registradores):
+                resultado[(row.dimensao, row.chave, row.ano_referencia)] = registradores
+        return resultado
+
+    def agregados(db):
+        return (
+            linhas(db, ResumoPagamento),
+            linhas(db, ResumoEntidade),
+            linhas(db, SketchContagem),
+            sketches(db),
+        )
+
+    def distribuicao(indice):
+        grupos = {
+            nome: {chave: valores.valores for chave, valores in por_chave.items()}
+            for nome, por_chave in indice.grupos.items()
+        }
+        return indice.geral.valores, grupos
+
+    def conferir():
+        db = SessionLocal()
+        try:
+            # A leitura recalcula as células pendentes (algum beneficiário saiu delas)
+            for dimensao in DIMENSOES_SKETCH:
+                beneficiarios_distintos(db, group_by=dimensao)
+            incremental = agregados(db)
+            assert distribuicao(distribuicao_manager.get(db)) == distribuicao(IndiceDistribuicao.build(db))
+
+            rebuild_resumo_pagamentos(db)
+            rebuild_sketches_beneficiarios(db)
+            reconstruido = agregados(db)
+            db.rollback()
+        finally:
+            db.close()
+        assert incremental == reconstruido
+
+    return conferir
@@ -0,0 +1,29 @@
+def test_agregacao_por_modalidade(cliente, criar_pagamento, entidades):
+    criar_pagamento(modalidade="BP", valor_pago=10.0)
+    criar_pagamento(modalidade="BP", valor_pago=30.0)
+    criar_pagamento(modalidade="PQ", valor_pago=5.0)
+
+    resposta = cliente.get("/pagamentos/aggregate", params={
+        "group_by": "modalidade", "measures": "count,sum,max",
+        "programa_id": entidades["fk_programa"], "order_by": "sum"
+    })
+    assert resposta.status_code == 200
+    dados = resposta.json()
+    assert dados["total_grupos"] == 2
+    assert dados["grupos"] == [
+        {"modalidade": "BP", "count": 2, "sum": 40.0, "max": 30.0},
+        {"modalidade": "PQ", "count": 1, "sum": 5.0, "max": 5.0},
+    ]
+
+
+def test_agregacao_com_dimensao_de_join(cliente, criar_pagamento, entidades):
+    criar_pagamento(valor_pago=12.0)
+    resposta = cliente.get("/pagamentos/aggregate", params={
+        "group_by": "instituicao_uf", "measures": "count", "programa_id": entidades["fk_programa"]
+    })
+    assert resposta.json()["grupos"] == [{"instituicao_uf": "SP", "count": 1}]
+
+
+def test_agregacao_invalida(cliente):
+    assert cliente.get("/pagamentos/aggregate", params={"group_by": "senha"}).status_code == 400
+    assert cliente.get("/pagamentos/aggregate", params={"measures": "median"}).status_code == 400
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+
+
+@pytest.fixture
+def api_key(cliente, novo_usuario):
+    """Emite uma chave para um leitor novo; devolve o registro (com a chave) e o id do usuário"""
+    usuario_id, headers = novo_usuario()
+    username = cliente.get("/auth/me", headers=headers).json()["username"]
+    resposta = cliente.post("/auth/api-keys", json={"nome": "Integração", "username": username, "expira_em_dias": 30})
+    assert resposta.status_code == 201
+    return resposta.json(), usuario_id
+
+
+def com_chave(cliente, chave, url="/auth/me"):
+    return cliente.get(url, headers={"X-API-Key": chave})
+
+
+def test_chave_autentica_o_dono(cliente, api_key):
+    registro, usuario_id = api_key
+    resposta = com_chave(cliente, registro["api_key"])
+    assert resposta.status_code == 200
+    assert resposta.json()["id"] == usuario_id
+    # Um leitor autenticado por chave continua sem acesso de admin
+    assert com_chave(cliente, registro["api_key"], "/auth/users").status_code == 403
+
+
+def test_listagem_nao_expoe_o_segredo(cliente, api_key):
+    registro, _ = api_key
+    listadas = {item["id"]: item for item in cliente.get("/auth/api-keys").json()}
+    assert "api_key" not in listadas[registro["id"]]
+    assert registro["api_key"].startswith(listadas[registro["id"]]["prefixo"])
+
+
+def test_chave_invalida(cliente):
+    assert com_chave(cliente, "cnpq_inexistente").status_code == 401
+
+
+def test_revogacao_tem_efeito_imediato(cliente, api_key):
+    registro, _ = api_key
+    assert com_chave(cliente, registro["api_key"]).status_code == 200
+    assert cliente.delete(f"/auth/api-keys/{registro['id']}").status_code == 200
+    assert com_chave(cliente, registro["api_key"]).status_code == 401
+    assert cliente.delete("/auth/api-keys/999999").status_code == 404
+
+
+def test_chave_expirada(cliente, api_key):
+    from app.core.database import SessionLocal
+    from app.models.api_key import ApiKey
+
+    registro, _ = api_key
+    db = SessionLocal()
+    try:
+        db.get(ApiKey, registro["id"]).expira_em = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)
+        db.commit()
+    finally:
+        db.close()
+    assert com_chave(cliente, registro["api_key"]).status_code == 401
+
+
+def test_desativar_o_dono_bloqueia_a_chave(cliente, api_key):
+    registro, usuario_id = api_key
+    assert com_chave(cliente, registro["api_key"]).status_code == 200
+    cliente.patch(f"/auth/users/{usuario_id}", json={"is_active": False})
+    assert com_chave(cliente, registro["api_key"]).status_code == 400
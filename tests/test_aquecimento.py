@@ -0,0 +1,62 @@
+import anyio
+import pytest
+
+
+@pytest.fixture
+def estado(app, monkeypatch):
+    """Estado de aquecimento isolado do da aplicação (que sobe com WARMUP_MODE=off)"""
+    from app import main
+    from app.services import aquecimento
+
+    novo = aquecimento.EstadoAquecimento()
+    monkeypatch.setattr(aquecimento, "estado_aquecimento", novo)
+    monkeypatch.setattr(main, "estado_aquecimento", novo)
+    return novo
+
+
+def test_health_e_ready_sem_aquecimento(cliente):
+    assert cliente.get("/health").status_code == 200
+    resposta = cliente.get("/ready")
+    assert resposta.status_code == 200
+    assert resposta.json()["aquecimento"]["estado"] == "desativado"
+
+
+def test_aquecimento_executa_todas_as_etapas(cliente, criar_pagamento, estado, monkeypatch):
+    from app.core.cache import entity_cache
+    from app.core.config import settings
+    from app.services.aquecimento import CONSULTAS_AQUECIMENTO, executar_aquecimento
+
+    criar_pagamento()
+    monkeypatch.setattr(settings, "warmup_queries", list(CONSULTAS_AQUECIMENTO))
+    entity_cache.clear()
+    assert not estado.pronto
+
+    anyio.run(executar_aquecimento, "foreground")
+
+    dados = estado.as_dict()
+    assert dados["estado"] == "concluido", dados["erro"]
+    assert estado.pronto
+    assert [etapa["etapa"] for etapa in dados["etapas"]] == ["paginas", "distribuicao", "consultas"]
+    assert dados["etapas"][0]["linhas"]["pagamento"] >= 1
+    assert entity_cache.stats()["entries"]["pagamento"] >= 1
+
+
+def test_consulta_desconhecida_falha_sem_derrubar(estado, monkeypatch):
+    from app.core.config import settings
+    from app.services.aquecimento import executar_aquecimento
+
+    monkeypatch.setattr(settings, "warmup_queries", ["estatisticas", "inexistente"])
+    anyio.run(executar_aquecimento, "background")
+
+    assert estado.estado == "falhou"
+    assert "inexistente" in estado.erro
+    # Falha no aquecimento não impede o tráfego
+    assert estado.pronto
+
+
+def test_ready_indisponivel_durante_o_aquecimento(cliente, estado):
+    estado.iniciar("background")
+    resposta = cliente.get("/ready")
+    assert resposta.status_code == 503
+    assert resposta.json()["aquecimento"]["estado"] == "executando"
+    assert cliente.get("/health").status_code == 200
@@ -0,0 +1,57 @@
+def test_lote_parcial_cria_os_itens_validos(cliente, entidades, conferir_agregados):
+    valido = {"ano_referencia": 2023, "modalidade": "BL", "valor_pago": 250.0, **entidades}
+    itens = [
+        valido,
+        {**valido, "ano_referencia": None},
+        {**valido, "fk_programa": 10 ** 9},
+        {**valido, "valor_pago": 50.0, "modalidade": "BM"},
+    ]
+    resposta = cliente.post("/pagamentos/bulk", json=itens)
+    assert resposta.status_code == 200
+    lote = resposta.json()
+    assert (lote["total"], lote["criados"], lote["erros"]) == (4, 2, 2)
+    assert [item["status"] for item in lote["itens"]] == ["criado", "erro", "erro", "criado"]
+    assert lote["itens"][1]["erros"][0]["campo"] == "ano_referencia"
+    assert lote["itens"][2]["erros"] == [{"campo": "fk_programa", "mensagem": f"programa {10 ** 9} não existe"}]
+
+    criado = cliente.get(f"/pagamentos/{lote['itens'][3]['id']}").json()
+    assert (criado["modalidade"], criado["valor_pago"]) == ("BM", 50.0)
+    conferir_agregados()
+
+
+def test_lote_atomico_rejeita_tudo(cliente, entidades):
+    valido = {"ano_referencia": 2023, "processo": "lote-atomico", **entidades}
+    resposta = cliente.post("/pagamentos/bulk", params={"atomico": True}, json=[valido, {**valido, "fk_beneficiario": None}])
+    assert resposta.status_code == 422
+    detalhe = resposta.json()["detail"]
+    assert (detalhe["criados"], detalhe["erros"]) == (0, 1)
+    assert cliente.get("/pagamentos/", params={"processo": "lote-atomico"}).json()["pagination"]["total"] == 0
+
+
+def test_lote_acima_do_limite(cliente, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "bulk_max_items", 2)
+    resposta = cliente.post("/beneficiarios/bulk", json=[{"nome": "x"}] * 3)
+    assert resposta.status_code == 413
+
+
+def test_lote_de_entidades(cliente):
+    itens = [
+        {"nome": "Lote A", "cpf_anonimizado": "***.001.002-**", "categoria_nivel": "2"},
+        {"nome": "Lote B"},
+    ]
+    lote = cliente.post("/beneficiarios/bulk", json=itens).json()
+    assert (lote["criados"], lote["erros"]) == (1, 1)
+    assert cliente.get(f"/beneficiarios/{lote['itens'][0]['id']}").json()["nome"] == "Lote A"
+
+    lote = cliente.post("/programas/bulk", json=[{"nome_chamada": "Chamada em lote"}]).json()
+    assert lote["criados"] == 1
+    lote = cliente.post("/instituicoes/bulk", json=[{"nome": "Instituição em lote", "uf": "MG"}]).json()
+    assert lote["criados"] == 1
+
+
+def test_lote_exige_admin(cliente, novo_usuario, entidades):
+    _, headers = novo_usuario()
+    resposta = cliente.post("/pagamentos/bulk", json=[{"ano_referencia": 2023, **entidades}], headers=headers)
+    assert resposta.status_code == 403
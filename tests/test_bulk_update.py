@@ -0,0 +1,78 @@
+import itertools
+import pytest
+
+_processos = itertools.count(1)
+
+
+@pytest.fixture
+def processo(criar_pagamento):
+    """Três pagamentos com um número de processo exclusivo do teste"""
+    processo = f"massa-{next(_processos)}-teste"
+    for ano, valor in ((2021, 10.0), (2022, 20.0), (2022, 30.0)):
+        criar_pagamento(processo=processo, ano_referencia=ano, valor_pago=valor, modalidade="MA")
+    return processo
+
+
+def listar(cliente, processo):
+    return cliente.get("/pagamentos/", params={"processo": processo, "size": 50}).json()["data"]
+
+
+def test_dry_run_nao_altera(cliente, processo):
+    resposta = cliente.post("/pagamentos/bulk-update", json={
+        "filtros": {"processo": processo, "ano_referencia": 2022}, "valores": {"modalidade": "MB"}, "dry_run": True
+    })
+    assert resposta.status_code == 200
+    simulacao = resposta.json()
+    assert (simulacao["dry_run"], simulacao["total"], len(simulacao["amostra_ids"])) == (True, 2, 2)
+    assert {item["modalidade"] for item in listar(cliente, processo)} == {"MA"}
+
+    resposta = cliente.post("/pagamentos/bulk-delete", json={"filtros": {"processo": processo}, "dry_run": True})
+    assert resposta.json()["total"] == 3
+    assert len(listar(cliente, processo)) == 3
+
+
+def test_atualizacao_em_massa_mantem_agregados(cliente, processo, entidades, conferir_agregados):
+    resposta = cliente.post("/pagamentos/bulk-update", json={
+        "filtros": {"processo": processo, "valor_pago_gte": 20},
+        "valores": {"modalidade": "MB", "ano_referencia": 2020},
+    })
+    assert resposta.status_code == 200
+    resultado = resposta.json()
+    assert resultado["total"] == 2
+
+    itens = {item["id"]: item for item in listar(cliente, processo)}
+    assert all((itens[i]["modalidade"], itens[i]["ano_referencia"]) == ("MB", 2020) for i in resultado["ids"])
+    conferir_agregados()
+
+    # Só campos fora dos agregados: sem leitura prévia, os agregados não mudam
+    resposta = cliente.post("/pagamentos/bulk-update", json={
+        "filtros": {"processo": processo}, "valores": {"titulo_projeto": "Projeto em massa"}
+    })
+    assert resposta.json()["total"] == 3
+    conferir_agregados()
+
+
+def test_remocao_em_massa_mantem_agregados(cliente, processo, conferir_agregados):
+    resposta = cliente.post("/pagamentos/bulk-delete", json={"filtros": {"processo": processo, "ano_referencia": 2022}})
+    assert resposta.status_code == 200
+    ids = resposta.json()["ids"]
+    assert len(ids) == 2
+    assert all(cliente.get(f"/pagamentos/{i}").status_code == 404 for i in ids)
+    assert len(listar(cliente, processo)) == 1
+    conferir_agregados()
+
+
+@pytest.mark.parametrize("rota,corpo", [
+    ("/pagamentos/bulk-update", {"filtros": {}, "valores": {"modalidade": "X"}}),
+    ("/pagamentos/bulk-update", {"filtros": {"inexistente": 1}, "valores": {"modalidade": "X"}}),
+    ("/pagamentos/bulk-update", {"filtros": {"search": "x"}, "valores": {"modalidade": "X"}}),
+    ("/pagamentos/bulk-update", {"filtros": {"modalidade": ""}, "valores": {"modalidade": "X"}}),
+    ("/pagamentos/bulk-update", {"filtros": {"modalidade": "MA"}, "valores": {}}),
+    ("/pagamentos/bulk-update", {"filtros": {"modalidade": "MA"}, "valores": {"fk_programa": 10 ** 9}}),
+    ("/pagamentos/bulk-delete", {"filtros": {}}),
+    ("/pagamentos/bulk-delete", {"filtros": {"ano_referencia_xx": 2020}}),
+])
+def test_filtros_invalidos_sao_recusados(cliente, processo, rota, corpo):
+    resposta = cliente.post(rota, json=corpo)
+    assert resposta.status_code == 400
+    assert {item["modalidade"] for item in listar(cliente, processo)} == {"MA"}
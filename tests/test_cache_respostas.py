@@ -0,0 +1,54 @@
+def test_memoria_despeja_lru_por_bytes():
+    from app.core.cache import MemoryCache
+
+    cache = MemoryCache(ttl_seconds=60, max_bytes=25)
+    cache.set("a", b"x" * 9)
+    cache.set("b", b"x" * 9)
+    cache.get("a")  # "a" passa a ser a mais recente
+    cache.set("c", b"x" * 9)
+    assert cache.get("b") is None
+    assert cache.get("a") == b"x" * 9
+    assert cache.get("c") == b"x" * 9
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memoria_e_chave_valor_expiram(monkeypatch):
+    from app.core import cache as modulo
+    from app.core.cache import KeyValueCache, LocalKeyValueStore, MemoryCache
+
+    agora = [1000.0]
+    monkeypatch.setattr(modulo.time, "monotonic", lambda: agora[0])
+    for cache in (MemoryCache(ttl_seconds=5), KeyValueCache(LocalKeyValueStore(), ttl_seconds=5)):
+        cache.set("chave", b"valor")
+        assert cache.get("chave") == b"valor"
+        agora[0] += 6
+        assert cache.get("chave") is None
+
+
+def test_rota_em_cache_e_invalidada_por_escrita(cliente):
+    parametros = {"size": 13, "sort_by": "nome"}
+
+    assert cliente.get("/beneficiarios/", params=parametros).headers["x-cache"] == "MISS"
+    assert cliente.get("/beneficiarios/", params=parametros).headers["x-cache"] == "HIT"
+    # Ordem e parâmetros vazios não mudam a chave
+    assert cliente.get("/beneficiarios/?sort_by=nome&nome=&size=13").headers["x-cache"] == "HIT"
+
+    # Escrita em outra tabela não invalida a listagem de beneficiários
+    cliente.post("/programas/", json={"nome_chamada": "Outra chamada"})
+    assert cliente.get("/beneficiarios/", params=parametros).headers["x-cache"] == "HIT"
+
+    total = cliente.get("/beneficiarios/", params=parametros).json()["pagination"]["total"]
+    cliente.post("/beneficiarios/", json={"nome": "Novo", "cpf_anonimizado": "***.777.777-**", "categoria_nivel": "2"})
+    resposta = cliente.get("/beneficiarios/", params=parametros)
+    assert resposta.headers["x-cache"] == "MISS"
+    assert resposta.json()["pagination"]["total"] == total + 1
+
+
+def test_metricas_do_cache(cliente):
+    assert cliente.delete("/metricas/cache").status_code == 200
+    cliente.get("/instituicoes/", params={"size": 17})
+    cliente.get("/instituicoes/", params={"size": 17})
+    metricas = cliente.get("/metricas/cache").json()
+    assert metricas["backend"] == "memory"
+    assert metricas["hits"] == 1
+    assert metricas["misses"] == 1
@@ -0,0 +1,73 @@
+import gzip
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from app.core.compression import CompressionMiddleware, encodings_disponiveis, negociar_encoding
+
+CORPO = b'{"dados": "' + b"abc" * 2000 + b'"}'
+
+
+@pytest.fixture(scope="module")
+def cliente_compressao():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/grande")
+    def grande():
+        return Response(CORPO, media_type="application/json", headers={"ETag": '"v1"'})
+
+    @app.get("/pequeno")
+    def pequeno():
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    @app.get("/nao-modificado")
+    def nao_modificado():
+        return Response(status_code=304, headers={"ETag": '"v1"'})
+
+    return TestClient(app)
+
+
+def test_negociacao_respeita_pesos():
+    disponiveis = ("zstd", "br", "gzip")
+    assert negociar_encoding("gzip, br;q=0.5", disponiveis) == "gzip"
+    assert negociar_encoding("gzip;q=0.5, br", disponiveis) == "br"
+    assert negociar_encoding("*", disponiveis) == "zstd"
+    assert negociar_encoding("gzip;q=0, identity", disponiveis) is None
+    assert negociar_encoding("", disponiveis) is None
+
+
+@pytest.mark.parametrize("encoding", encodings_disponiveis())
+def test_corpo_comprimido_com_etag_do_encoding(cliente_compressao, encoding):
+    resposta = cliente_compressao.get("/grande", headers={"Accept-Encoding": encoding})
+    assert resposta.headers["content-encoding"] == encoding
+    assert resposta.headers["etag"] == f'"v1-{encoding}"'
+    assert "Accept-Encoding" in resposta.headers["vary"]
+    # O cliente HTTP descomprime: o conteúdo é o original
+    assert resposta.content == CORPO
+
+
+def test_gzip_decodificavel(cliente_compressao):
+    with cliente_compressao.stream("GET", "/grande", headers={"Accept-Encoding": "gzip"}) as resposta:
+        bruto = b"".join(resposta.iter_raw())
+    assert len(bruto) < len(CORPO)
+    assert gzip.decompress(bruto) == CORPO
+
+
+def test_identidade_mantem_etag_e_vary(cliente_compressao):
+    resposta = cliente_compressao.get("/grande", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in resposta.headers
+    assert resposta.headers["etag"] == '"v1"'
+    assert "Accept-Encoding" in resposta.headers["vary"]
+
+
+def test_resposta_pequena_nao_comprimida(cliente_compressao):
+    resposta = cliente_compressao.get("/pequeno", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resposta.headers
+    assert resposta.json() == {"ok": True}
+
+
+def test_304_com_vary_e_etag_do_encoding(cliente_compressao):
+    resposta = cliente_compressao.get("/nao-modificado", headers={"Accept-Encoding": "gzip"})
+    assert resposta.status_code == 304
+    assert resposta.headers["etag"] == '"v1-gzip"'
+    assert "Accept-Encoding" in resposta.headers["vary"]
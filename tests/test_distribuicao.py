@@ -0,0 +1,56 @@
+import pytest
+
+
+def test_quantis_histograma_e_outliers():
+    from app.services.distribuicao import DistribuicaoValores
+
+    distribuicao = DistribuicaoValores([1.0, 2.0, 3.0, 4.0, 5.0, 1000.0])
+    assert distribuicao.quantil(0.5) == 3.5
+    assert distribuicao.quantil(1.0) == 1000.0
+    faixas = distribuicao.histograma(bins=2)["faixas"]
+    assert [faixa["total"] for faixa in faixas] == [5, 1]
+    assert distribuicao.outliers()["acima"] == 1
+
+    nova = distribuicao.com_delta(removidos=[1000.0, 2.0], adicionados=[2.5, 0.5])
+    assert nova.valores == [0.5, 1.0, 2.5, 3.0, 4.0, 5.0]
+    # A distribuição original não muda; remover um valor ausente invalida o delta
+    assert distribuicao.total == 6
+    assert distribuicao.com_delta(removidos=[7.0], adicionados=[]) is None
+
+
+def test_distribuicao_por_programa(cliente, criar_pagamento, entidades):
+    for valor in (1.0, 2.0, 3.0, 4.0, 5.0, 1000.0):
+        criar_pagamento(valor_pago=valor)
+    criar_pagamento(valor_pago=None)
+
+    resposta = cliente.get("/pagamentos/distribution", params={"group_by": "programa", "quantiles": "0.5"})
+    assert resposta.status_code == 200
+    grupo = next(g for g in resposta.json()["grupos"] if g["programa"] == entidades["fk_programa"])
+    assert grupo["total_valores"] == 6
+    assert grupo["quantis"] == {"p50": 3.5}
+    assert grupo["outliers"]["acima"] == 1
+
+
+def test_escritas_aplicadas_sem_reconstruir(cliente, criar_pagamento, conferir_agregados, monkeypatch):
+    from app.services.distribuicao import IndiceDistribuicao
+
+    cliente.get("/pagamentos/distribution")
+    reconstrucoes = []
+    build = IndiceDistribuicao.build
+    monkeypatch.setattr(IndiceDistribuicao, "build", classmethod(lambda cls, db: reconstrucoes.append(1) or build(db)))
+
+    primeiro = criar_pagamento(valor_pago=11.0, modalidade="AA")
+    segundo = criar_pagamento(valor_pago=22.0)
+    cliente.put(f"/pagamentos/{primeiro['id']}", json={**primeiro, "valor_pago": 33.0, "modalidade": "BB"})
+    cliente.delete(f"/pagamentos/{segundo['id']}")
+    assert cliente.get("/pagamentos/distribution", params={"group_by": "modalidade"}).status_code == 200
+    assert reconstrucoes == []
+
+    monkeypatch.undo()
+    conferir_agregados()
+
+
+def test_parametros_invalidos(cliente):
+    assert cliente.get("/pagamentos/distribution", params={"quantiles": "1.5"}).status_code == 400
+    assert cliente.get("/pagamentos/distribution", params={"group_by": "uf"}).status_code == 400
+    assert cliente.get("/pagamentos/distribution", params={"scale": "quadratica"}).status_code == 400
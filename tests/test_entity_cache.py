@@ -0,0 +1,73 @@
+from sqlalchemy import event
+
+
+def contar_consultas(engine):
+    """Lista preenchida com os SELECTs executados no engine enquanto o listener estiver ativo"""
+    comandos = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            comandos.append(statement)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    return comandos, lambda: event.remove(engine, "before_cursor_execute", registrar)
+
+
+def test_get_many_carrega_faltantes_em_uma_consulta(cliente, criar_pagamento):
+    from app.core.cache import entity_cache
+    from app.core.database import SessionLocal, engine
+    from app.models.beneficiario import Beneficiario
+
+    ids = [
+        cliente.post("/beneficiarios/", json={
+            "nome": f"Lote {n}", "cpf_anonimizado": f"***.{n:03d}.999-**", "categoria_nivel": "2"
+        }).json()["id"]
+        for n in range(3)
+    ]
+    db = SessionLocal()
+    try:
+        entity_cache.get(db, Beneficiario, ids[0])
+        comandos, remover = contar_consultas(engine)
+        try:
+            registros = entity_cache.get_many(db, Beneficiario, [*ids, None, 10 ** 9])
+        finally:
+            remover()
+    finally:
+        db.close()
+
+    # O primeiro já estava em cache; os outros dois (e o inexistente) vêm em um único SELECT ... IN
+    assert len(comandos) == 1
+    assert sorted(registros) == sorted(ids)
+    assert registros[ids[1]]["nome"] == "Lote 1"
+
+
+def test_escritas_invalidam_o_registro(cliente, entidades):
+    url = f"/beneficiarios/{entidades['fk_beneficiario']}"
+    original = cliente.get(url).json()
+    assert cliente.get(url).json() == original
+
+    cliente.put(url, json={"nome": "Nome novo", "cpf_anonimizado": original["cpf_anonimizado"], "categoria_nivel": "2"})
+    assert cliente.get(url).json()["nome"] == "Nome novo"
+
+    assert cliente.delete(url).status_code == 200
+    assert cliente.get(url).status_code == 404
+
+
+def test_expand_usa_o_cache(cliente, criar_pagamento, entidades):
+    pagamento = criar_pagamento()
+    url = f"/pagamentos/{pagamento['id']}?expand=beneficiario,instituicao"
+    assert cliente.get(url).json()["beneficiario"]["id"] == entidades["fk_beneficiario"]
+
+    cliente.put(f"/instituicoes/{entidades['fk_instituicao']}", json={"nome": "Instituição renomeada", "uf": "RJ"})
+    assert cliente.get(url).json()["instituicao"]["nome"] == "Instituição renomeada"
+
+
+def test_metricas_de_entidades(cliente, entidades):
+    url = f"/programas/{entidades['fk_programa']}"
+    cliente.get(url)
+    antes = cliente.get("/metricas/entidades").json()
+    # Outra chave no cache de respostas: a rota executa e encontra o registro no cache de entidades
+    cliente.get(url, params={"_": 1})
+    depois = cliente.get("/metricas/entidades").json()
+    assert depois["hits"] > antes["hits"]
+    assert depois["entries"]["programa"] >= 1
@@ -0,0 +1,30 @@
+def test_rollups_da_passada_agrupada():
+    from app.services.estatisticas import Estatisticas
+
+    estatisticas = Estatisticas(["grande_area", "area"], [
+        ("Exatas", "Física", 3), ("Exatas", "Química", 2), ("Humanas", "História", 1), (None, None, 4),
+    ])
+    assert estatisticas.total == 10
+    assert estatisticas.por("grande_area") == [
+        {"chave": None, "total": 4}, {"chave": "Exatas", "total": 5}, {"chave": "Humanas", "total": 1}
+    ]
+    assert estatisticas.distintos("area") == 3
+
+
+def test_rotas_de_estatisticas(cliente):
+    antes = cliente.get("/instituicoes/stats").json()
+    cliente.post("/instituicoes/", json={"nome": "Instituto A", "uf": "AC", "pais": "Brasil"})
+    cliente.post("/instituicoes/", json={"nome": "Instituto B", "uf": "AC", "pais": "Brasil"})
+    depois = cliente.get("/instituicoes/stats").json()
+    assert depois["total_instituicoes"] == antes["total_instituicoes"] + 2
+    por_uf = {grupo["uf"]: grupo["total"] for grupo in depois["por_uf"]}
+    assert por_uf["AC"] == 2
+    assert sum(por_uf.values()) == depois["total_instituicoes"]
+
+    cliente.post("/programas/", json={"nome_chamada": "Chamada X", "grande_area": "Exatas", "area": "Física"})
+    areas = cliente.get("/programas/areas").json()
+    assert areas["total_areas"] >= 1
+    assert sum(grupo["total_programas"] for grupo in areas["por_grande_area"]) == areas["total_programas"]
+
+    beneficiarios = cliente.get("/beneficiarios/stats").json()
+    assert sum(grupo["total"] for grupo in beneficiarios["por_categoria"]) == beneficiarios["total_beneficiarios"]
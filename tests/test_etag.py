@@ -0,0 +1,36 @@
+def test_get_condicional_responde_304(cliente):
+    resposta = cliente.get("/pagamentos/stats")
+    etag = resposta.headers["etag"]
+    assert resposta.status_code == 200
+
+    assert cliente.get("/pagamentos/stats", headers={"If-None-Match": etag}).status_code == 304
+    assert cliente.get("/pagamentos/stats", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert cliente.get("/pagamentos/stats", headers={"If-None-Match": '"outra"'}).status_code == 200
+    desde = resposta.headers["last-modified"]
+    assert cliente.get("/pagamentos/stats", headers={"If-Modified-Since": desde}).status_code == 304
+
+
+def test_escrita_muda_etag_apenas_da_tabela(cliente, criar_pagamento):
+    etag = cliente.get("/pagamentos/stats").headers["etag"]
+
+    # Outra tabela alterada: a versão de pagamento continua a mesma
+    cliente.post("/programas/", json={"nome_chamada": "Chamada sem pagamentos"})
+    assert cliente.get("/pagamentos/stats", headers={"If-None-Match": etag}).status_code == 304
+
+    criar_pagamento(valor_pago=321.0)
+    resposta = cliente.get("/pagamentos/stats", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["etag"] != etag
+
+
+def test_etag_por_encoding(cliente):
+    gzip = cliente.get("/pagamentos/stats", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    identidade = cliente.get("/pagamentos/stats", headers={"Accept-Encoding": "identity"}).headers["etag"]
+    assert gzip == identidade[:-1] + '-gzip"'
+
+    resposta = cliente.get("/pagamentos/stats", headers={"Accept-Encoding": "gzip", "If-None-Match": gzip})
+    assert resposta.status_code == 304
+    assert resposta.headers["etag"] == gzip
+    assert "Accept-Encoding" in resposta.headers["vary"]
+    # A tag da representação comprimida não vale para outro encoding
+    assert cliente.get("/pagamentos/stats", headers={"Accept-Encoding": "identity", "If-None-Match": gzip}).status_code == 200
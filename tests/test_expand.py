@@ -0,0 +1,27 @@
+def test_expand_embute_relacionamentos(cliente, criar_pagamento, entidades):
+    pagamento = criar_pagamento()
+
+    resposta = cliente.get(f"/pagamentos/{pagamento['id']}", params={"expand": "beneficiario,programa"})
+    assert resposta.status_code == 200
+    dados = resposta.json()
+    assert dados["beneficiario"]["id"] == entidades["fk_beneficiario"]
+    assert dados["programa"]["id"] == entidades["fk_programa"]
+    assert "instituicao" not in dados
+
+    assert "beneficiario" not in cliente.get(f"/pagamentos/{pagamento['id']}").json()
+
+
+def test_expand_na_listagem(cliente, criar_pagamento, entidades):
+    criar_pagamento()
+    criar_pagamento(valor_pago=200.0)
+
+    resposta = cliente.get(f"/pagamentos/programa/{entidades['fk_programa']}", params={"expand": "instituicao"})
+    assert resposta.status_code == 200
+    itens = resposta.json()["data"]
+    assert len(itens) == 2
+    assert all(item["instituicao"]["id"] == entidades["fk_instituicao"] for item in itens)
+
+
+def test_expand_invalido(cliente, criar_pagamento):
+    pagamento = criar_pagamento()
+    assert cliente.get(f"/pagamentos/{pagamento['id']}", params={"expand": "usuario"}).status_code == 400
@@ -0,0 +1,125 @@
+import threading
+import pytest
+
+
+def gravador(lotes):
+    """`gravar` de teste: registra os lotes e devolve ids sequenciais"""
+    def gravar(db, itens):
+        lotes.append(list(itens))
+        inicio = sum(len(lote) for lote in lotes) - len(itens)
+        return {"itens": [
+            {"status": "criado", "id": inicio + indice + 1} if item.get("valido", True)
+            else {"status": "erro", "erros": [{"campo": "item", "mensagem": "inválido"}]}
+            for indice, item in enumerate(itens)
+        ]}
+    return gravar
+
+
+def test_itens_da_janela_sao_gravados_em_um_lote():
+    from app.services.fila_escrita import FilaEscrita, ItemRejeitado
+
+    lotes = []
+    fila = FilaEscrita(gravador(lotes), max_lote=10, janela_ms=200)
+    futuros = [fila.enviar({"n": n}) for n in range(4)] + [fila.enviar({"valido": False})]
+    assert [futuro.result(5) for futuro in futuros[:4]] == [1, 2, 3, 4]
+    with pytest.raises(ItemRejeitado):
+        futuros[4].result(5)
+    fila.encerrar()
+
+    assert [len(lote) for lote in lotes] == [5]
+    stats = fila.stats()
+    assert (stats["lotes"], stats["gravados"], stats["rejeitados"], stats["maior_lote"]) == (1, 4, 1, 5)
+
+
+def test_lote_cheio_nao_espera_a_janela():
+    from app.services.fila_escrita import FilaEscrita
+
+    lotes = []
+    fila = FilaEscrita(gravador(lotes), max_lote=2, janela_ms=60_000)
+    futuros = [fila.enviar({"n": n}) for n in range(2)]
+    assert [futuro.result(5) for futuro in futuros] == [1, 2]
+    fila.encerrar()
+
+
+def test_encerrar_grava_os_pendentes():
+    from app.services.fila_escrita import FilaEscrita
+
+    lotes = []
+    fila = FilaEscrita(gravador(lotes), max_lote=100, janela_ms=60_000)
+    futuro = fila.enviar({"n": 1})
+    fila.encerrar(timeout=5)
+    assert futuro.done() and futuro.result() == 1
+
+
+def test_fila_cheia_recusa():
+    from app.services.fila_escrita import FilaEscrita, FilaEscritaCheia
+
+    iniciou, liberar = threading.Event(), threading.Event()
+
+    def lento(db, itens):
+        iniciou.set()
+        liberar.wait(5)
+        return gravador([])(db, itens)
+
+    fila = FilaEscrita(lento, max_lote=1, janela_ms=0, max_fila=1)
+    fila.enviar({"n": 1})
+    # Com o primeiro em gravação, a fila aceita mais um e recusa o seguinte
+    iniciou.wait(5)
+    fila.enviar({"n": 2})
+    with pytest.raises(FilaEscritaCheia):
+        fila.enviar({"n": 3})
+    assert fila.stats()["recusados"] == 1
+    liberar.set()
+    fila.encerrar(timeout=5)
+
+
+def test_falha_do_lote_chega_a_todos():
+    from app.services.fila_escrita import FilaEscrita
+
+    def falha(db, itens):
+        raise RuntimeError("banco indisponível")
+
+    fila = FilaEscrita(falha, max_lote=10, janela_ms=50)
+    futuros = [fila.enviar({"n": n}) for n in range(3)]
+    for futuro in futuros:
+        with pytest.raises(RuntimeError):
+            futuro.result(5)
+    fila.encerrar()
+    assert fila.stats()["falhas"] == 3
+
+
+def test_rota_com_fila_grava_antes_de_responder(cliente, entidades, monkeypatch, conferir_agregados):
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.models.pagamento import Pagamento
+
+    monkeypatch.setattr(settings, "write_behind_enabled", True)
+    respostas = []
+
+    def criar(valor):
+        dados = {"ano_referencia": 2024, "modalidade": "FE", "valor_pago": valor, **entidades}
+        respostas.append(cliente.post("/pagamentos/", json=dados))
+
+    threads = [threading.Thread(target=criar, args=(float(valor),)) for valor in range(1, 7)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [resposta.status_code for resposta in respostas] == [200] * 6
+    ids = [resposta.json()["id"] for resposta in respostas]
+    # A resposta só sai depois do commit: outra sessão já enxerga as linhas
+    db = SessionLocal()
+    try:
+        assert db.query(Pagamento).filter(Pagamento.id.in_(ids)).count() == 6
+    finally:
+        db.close()
+    conferir_agregados()
+
+    invalido = cliente.post("/pagamentos/", json={"ano_referencia": 2024, **entidades, "fk_programa": 10 ** 9})
+    assert invalido.status_code == 422
+
+    metricas = cliente.get("/metricas/escrita").json()
+    assert metricas["habilitada"] is True
+    assert metricas["gravados"] >= 6
+    assert metricas["rejeitados"] >= 1
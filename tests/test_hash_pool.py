@@ -0,0 +1,46 @@
+import anyio
+import pytest
+
+
+def test_pool_executa_hash_e_verificacao():
+    from app.core.security import PasswordHashPool, get_password_hash, verify_password
+
+    pool = PasswordHashPool(workers=0)
+    hash_senha = anyio.run(pool.run, get_password_hash, "senha123")
+    assert anyio.run(pool.run, verify_password, "senha123", hash_senha)
+    assert not anyio.run(pool.run, verify_password, "outra", hash_senha)
+    stats = pool.stats()
+    assert stats["concluidas"] == 3
+    assert stats["pendentes"] == 0
+
+
+def test_pool_saturado_recusa():
+    from app.core.security import HashPoolSaturado, PasswordHashPool, get_password_hash
+
+    pool = PasswordHashPool(workers=0, max_fila=0)
+    with pytest.raises(HashPoolSaturado):
+        anyio.run(pool.run, get_password_hash, "senha123")
+    assert pool.stats()["recusadas"] == 1
+
+
+def test_login_e_registro_pelo_pool(cliente, novo_usuario):
+    from app.core.security import password_pool
+
+    concluidas = password_pool.stats()["concluidas"]
+    _, headers = novo_usuario()
+    assert cliente.get("/auth/me", headers=headers).status_code == 200
+    # Um hash no registro e uma verificação no login
+    assert password_pool.stats()["concluidas"] == concluidas + 2
+
+    resposta = cliente.post("/auth/login", json={"username": "admin", "password": "errada"})
+    assert resposta.status_code == 401
+
+
+def test_pool_saturado_responde_503(cliente, monkeypatch):
+    from app.core import security
+    from app.core.security import PasswordHashPool
+
+    monkeypatch.setattr(security, "password_pool", PasswordHashPool(workers=0, max_fila=0))
+    resposta = cliente.post("/auth/login", json={"username": "admin", "password": "senha123"})
+    assert resposta.status_code == 503
+    assert resposta.headers["retry-after"] == "1"
@@ -0,0 +1,69 @@
+import logging
+import pytest
+
+
+@pytest.fixture
+def log_lentas(monkeypatch, caplog):
+    """Todo comando conta como lento; devolve os registros do log de consultas lentas"""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "slow_query_ms", 1e-6)
+    caplog.set_level(logging.WARNING, logger="app.core.instrumentation")
+    return lambda: [r for r in caplog.records if r.name == "app.core.instrumentation"]
+
+
+def test_formato_resume_listas_de_parametros():
+    from app.core.instrumentation import formato_sql
+
+    assert formato_sql("SELECT *\n  FROM t WHERE id IN (?, ?,?)") == "SELECT * FROM t WHERE id IN (?, ...)"
+    assert formato_sql("SELECT * FROM t WHERE id IN (?)") == "SELECT * FROM t WHERE id IN (?)"
+
+
+def test_parametros_sem_valores_por_padrao():
+    from app.core.instrumentation import MAX_PARAMETROS_LOG, _resumir_parametros
+
+    assert _resumir_parametros(("12345678900", 10), False) == {"quantidade": 2, "tipos": ["str", "int"]}
+    assert _resumir_parametros([(1,), (2,)], True) == {"linhas": 2, "primeira": {"quantidade": 1, "tipos": ["int"]}}
+    longa = tuple(range(MAX_PARAMETROS_LOG + 5))
+    resumida = _resumir_parametros(longa, False, valores=True)
+    assert resumida[-1] == "... +5" and len(resumida) == MAX_PARAMETROS_LOG + 1
+
+
+def test_comandos_em_tabelas_sensiveis_nunca_tem_valores(cliente, log_lentas, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "slow_query_log_params", True)
+    cliente.post("/auth/login", json={"username": "admin", "password": "senha123"})
+    registros = [r for r in log_lentas() if "users" in r.sql]
+    assert registros
+    for registro in registros:
+        assert set(registro.parametros) == {"quantidade", "tipos"}
+        assert registro.plano is None
+        assert "admin" not in registro.getMessage()
+
+
+def test_log_de_consulta_lenta(cliente, entidades, log_lentas, monkeypatch):
+    from app.core.config import settings
+
+    cliente.get(f"/programas/{entidades['fk_programa']}", params={"_": "sem-valores"})
+    registro = next(r for r in log_lentas() if "FROM programa" in r.sql)
+    assert registro.rota == f"GET /programas/{entidades['fk_programa']}"
+    assert set(registro.parametros) == {"quantidade", "tipos"}
+    assert registro.plano
+
+    monkeypatch.setattr(settings, "slow_query_log_params", True)
+    cliente.get(f"/instituicoes/{entidades['fk_instituicao']}", params={"_": "com-valores"})
+    registro = next(r for r in log_lentas() if "FROM instituicao" in r.sql)
+    assert entidades["fk_instituicao"] in registro.parametros
+
+
+def test_metricas_por_formato(cliente):
+    assert cliente.delete("/metricas/sql").status_code == 200
+    for tamanho in (3, 4):
+        cliente.get("/beneficiarios/", params={"size": tamanho, "nome": "sql"})
+    metricas = cliente.get("/metricas/sql", params={"limite": 200}).json()
+    assert metricas["comandos"] > 0
+    formatos = [item for item in metricas["top"] if "FROM beneficiario" in item["sql"] and "LIMIT" in item["sql"]]
+    # As duas páginas têm o mesmo formato de SQL
+    assert len(formatos) == 1 and formatos[0]["execucoes"] == 2
+    assert formatos[0]["tempo_medio_ms"] <= formatos[0]["tempo_max_ms"]
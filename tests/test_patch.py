@@ -0,0 +1,54 @@
+import pytest
+
+
+@pytest.fixture
+def pagamento(criar_pagamento):
+    return criar_pagamento()
+
+
+@pytest.mark.parametrize("rota,chave,campo", [
+    ("/beneficiarios", "fk_beneficiario", "nome"),
+    ("/beneficiarios", "fk_beneficiario", "cpf_anonimizado"),
+    ("/instituicoes", "fk_instituicao", "nome"),
+    ("/pagamentos", "id", "ano_referencia"),
+    ("/pagamentos", "id", "fk_programa"),
+])
+def test_patch_nulo_em_campo_obrigatorio(cliente, pagamento, rota, chave, campo):
+    entidade_id = pagamento[chave]
+    antes = cliente.get(f"{rota}/{entidade_id}").json()
+
+    resposta = cliente.patch(f"{rota}/{entidade_id}", json={campo: None})
+    assert resposta.status_code == 422
+
+    depois = cliente.get(f"{rota}/{entidade_id}")
+    assert depois.status_code == 200
+    assert depois.json()[campo] == antes[campo]
+    assert depois.json()["versao"] == antes["versao"]
+
+
+def test_patch_nulo_em_campo_opcional(cliente, pagamento):
+    resposta = cliente.patch(f"/pagamentos/{pagamento['id']}", json={"valor_pago": None})
+    assert resposta.status_code == 200
+    assert cliente.get(f"/pagamentos/{pagamento['id']}").json()["valor_pago"] is None
+
+
+def test_atualizacao_em_massa_nula_em_campo_obrigatorio(cliente, pagamento):
+    resposta = cliente.post("/pagamentos/bulk-update", json={
+        "filtros": {"id": pagamento["id"]}, "valores": {"ano_referencia": None}
+    })
+    assert resposta.status_code == 422
+    assert cliente.get(f"/pagamentos/{pagamento['id']}").json()["ano_referencia"] == 2024
+
+
+def test_patch_com_versao_desatualizada(cliente, pagamento):
+    url = f"/pagamentos/{pagamento['id']}"
+    resposta = cliente.patch(url, json={"valor_pago": 150.0, "versao": pagamento["versao"]})
+    assert resposta.status_code == 200
+    assert resposta.json()["versao"] == pagamento["versao"] + 1
+
+    # A versão informada pelo cliente não é mais a atual
+    assert cliente.patch(url, json={"valor_pago": 175.0, "versao": pagamento["versao"]}).status_code == 409
+    # Sem versão, a alteração é aplicada sobre a atual
+    resposta = cliente.patch(url, json={"valor_pago": 175.0})
+    assert resposta.status_code == 200
+    assert resposta.json()["valor_pago"] == 175.0
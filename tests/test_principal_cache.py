@@ -0,0 +1,52 @@
+def test_usuario_vem_do_cache(cliente, novo_usuario):
+    from app.core.cache import principal_cache
+
+    _, headers = novo_usuario()
+    assert cliente.get("/auth/me", headers=headers).status_code == 200
+    hits = principal_cache.stats()["hits"]
+    resposta = cliente.get("/auth/me", headers=headers)
+    assert resposta.status_code == 200
+    assert resposta.json()["role"] == "leitor"
+    assert principal_cache.stats()["hits"] == hits + 1
+
+
+def test_desativacao_tem_efeito_imediato(cliente, novo_usuario):
+    usuario_id, headers = novo_usuario()
+    assert cliente.get("/auth/me", headers=headers).status_code == 200
+
+    cliente.patch(f"/auth/users/{usuario_id}", json={"is_active": False})
+    assert cliente.get("/auth/me", headers=headers).status_code == 400
+
+    cliente.patch(f"/auth/users/{usuario_id}", json={"is_active": True})
+    assert cliente.get("/auth/me", headers=headers).status_code == 200
+
+
+def test_troca_de_papel_tem_efeito_imediato(cliente, novo_usuario):
+    usuario_id, headers = novo_usuario(role="admin")
+    assert cliente.get("/auth/users", headers=headers).status_code == 200
+
+    resposta = cliente.patch(f"/auth/users/{usuario_id}", json={"role": "leitor"})
+    assert resposta.json()["role"] == "leitor"
+    assert cliente.get("/auth/users", headers=headers).status_code == 403
+
+
+def test_entradas_expiram_e_sao_invalidadas_por_usuario(monkeypatch):
+    from app.core import cache as modulo
+    from app.core.cache import PrincipalCache
+
+    agora = [1000.0]
+    monkeypatch.setattr(modulo.time, "monotonic", lambda: agora[0])
+    cache = PrincipalCache(ttl_seconds=5)
+    cache.set("token-a", {"username": "ana"})
+    cache.set("token-b", {"username": "ana"})
+    cache.set("token-c", {"username": "bia"}, ttl_seconds=1)
+    cache.set("token-d", {"username": "bia"}, ttl_seconds=0)
+
+    assert cache.get("token-a") == {"username": "ana"}
+    assert cache.get("token-d") is None
+    cache.invalidate("ana")
+    assert cache.get("token-a") is None and cache.get("token-b") is None
+
+    agora[0] += 2
+    assert cache.get("token-c") is None
+    assert cache.stats()["expirations"] == 1
@@ -0,0 +1,32 @@
+def test_ranking_por_ano(cliente, criar_pagamento, entidades):
+    outro = cliente.post("/beneficiarios/", json={"nome": "Segundo", "cpf_anonimizado": "***.999.888-**", "categoria_nivel": "2"}).json()
+    criar_pagamento(ano_referencia=1990, valor_pago=10.0)
+    criar_pagamento(ano_referencia=1990, valor_pago=20.0)
+    criar_pagamento(ano_referencia=1990, valor_pago=100.0, fk_beneficiario=outro["id"])
+    criar_pagamento(ano_referencia=1991, valor_pago=500.0, fk_beneficiario=outro["id"])
+
+    por_soma = cliente.get("/beneficiarios/ranking", params={"ano_referencia": 1990}).json()
+    assert por_soma["total_entidades"] == 2
+    assert [(item["id"], item["valor_total"]) for item in por_soma["ranking"]] == [
+        (outro["id"], 100.0), (entidades["fk_beneficiario"], 30.0)
+    ]
+    assert por_soma["ranking"][0]["nome"] == "Segundo"
+
+    por_quantidade = cliente.get("/beneficiarios/ranking", params={"ano_referencia": 1990, "by": "count"}).json()
+    assert [item["id"] for item in por_quantidade["ranking"]] == [entidades["fk_beneficiario"], outro["id"]]
+    assert por_quantidade["ranking"][0]["valor_medio"] == 15.0
+
+
+def test_ranking_sem_filtros_acompanha_escritas(cliente, criar_pagamento, entidades, conferir_agregados):
+    pagamento = criar_pagamento(valor_pago=10.0 ** 9)
+    ranking = cliente.get("/programas/ranking", params={"limit": 1}).json()["ranking"]
+    assert ranking[0]["id"] == entidades["fk_programa"]
+
+    cliente.delete(f"/pagamentos/{pagamento['id']}")
+    ranking = cliente.get("/programas/ranking", params={"limit": 1}).json()["ranking"]
+    assert ranking[0]["id"] != entidades["fk_programa"]
+    conferir_agregados()
+
+
+def test_medida_invalida(cliente):
+    assert cliente.get("/instituicoes/ranking", params={"by": "avg"}).status_code == 400
@@ -0,0 +1,21 @@
+def test_deltas_iguais_a_reconstrucao(cliente, criar_pagamento, conferir_agregados):
+    primeiro = criar_pagamento(modalidade="ZZ", valor_pago=10.5)
+    segundo = criar_pagamento(modalidade="ZZ", valor_pago=None, linha_fomento="Bolsas")
+    terceiro = criar_pagamento(ano_referencia=2019, valor_pago=99.0)
+    cliente.put(f"/pagamentos/{segundo['id']}", json={**segundo, "modalidade": "YY", "valor_pago": 7.0})
+    cliente.delete(f"/pagamentos/{primeiro['id']}")
+    cliente.delete(f"/pagamentos/{terceiro['id']}")
+
+    conferir_agregados()
+    # Grupos esvaziados saem do resumo
+    modalidades = [grupo["modalidade"] for grupo in cliente.get("/pagamentos/stats").json()["por_modalidade"]]
+    assert "ZZ" not in modalidades
+    assert "YY" in modalidades
+
+
+def test_stats_refletem_escritas(cliente, criar_pagamento):
+    antes = cliente.get("/pagamentos/stats").json()["resumo"]
+    criar_pagamento(valor_pago=50.0)
+    depois = cliente.get("/pagamentos/stats").json()["resumo"]
+    assert depois["total_pagamentos"] == antes["total_pagamentos"] + 1
+    assert round(depois["valor_total"] - antes["valor_total"], 6) == 50.0
@@ -0,0 +1,29 @@
+def test_serie_mensal_com_concessoes_ativas(cliente, criar_pagamento, entidades):
+    criar_pagamento(valor_pago=100.0, data_inicio="2024-01-15", data_fim="2024-03-10")
+    criar_pagamento(valor_pago=50.0, data_inicio="2024-02-01", data_fim="2024-02-28")
+    # Sem data_fim (ou com fim antes do início) a concessão conta só no mês de início
+    criar_pagamento(valor_pago=10.0, data_inicio="2024-04-05")
+    criar_pagamento(valor_pago=1.0, data_inicio="2024-04-20", data_fim="2023-12-31")
+
+    resposta = cliente.get("/pagamentos/timeseries", params={"programa_id": entidades["fk_programa"]})
+    assert resposta.status_code == 200
+    serie = {item["periodo"]: item for item in resposta.json()["series"]}
+    assert list(serie) == ["2024-01", "2024-02", "2024-03", "2024-04"]
+    assert [item["concessoes_ativas"] for item in serie.values()] == [1, 2, 1, 2]
+    assert [item["total_pagamentos"] for item in serie.values()] == [1, 1, 0, 2]
+    assert serie["2024-04"]["valor_total"] == 11.0
+
+
+def test_serie_trimestral(cliente, criar_pagamento, entidades):
+    criar_pagamento(valor_pago=100.0, data_inicio="2023-11-15", data_fim="2024-05-10")
+
+    resposta = cliente.get("/pagamentos/timeseries", params={
+        "programa_id": entidades["fk_programa"], "granularity": "quarter"
+    })
+    serie = resposta.json()["series"]
+    assert [item["periodo"] for item in serie] == ["2023-Q4", "2024-Q1", "2024-Q2"]
+    assert all(item["concessoes_ativas"] == 1 for item in serie)
+
+
+def test_granularidade_invalida(cliente):
+    assert cliente.get("/pagamentos/timeseries", params={"granularity": "week"}).status_code == 400
@@ -0,0 +1,48 @@
+import logging
+
+
+def etapas(header):
+    """Nome -> parâmetros de cada métrica do header Server-Timing"""
+    resultado = {}
+    for metrica in header.split(","):
+        nome, *parametros = metrica.strip().split(";")
+        resultado[nome] = dict(parametro.split("=", 1) for parametro in parametros)
+    return resultado
+
+
+def test_formato_do_header():
+    from app.core.timing import formatar_server_timing
+
+    header = formatar_server_timing({"db": 1.234, "total": 5.0}, {"db": 3})
+    assert header == 'db;dur=1.2;desc="3x", total;dur=5.0'
+
+
+def test_medicao_fora_de_requisicao_e_ignorada():
+    from app.core.timing import medicoes_atuais, medir, registrar
+
+    with medir("db"):
+        registrar("count", 1.0, quantidade=1)
+    assert medicoes_atuais() is None
+
+
+def test_listagem_informa_as_etapas(cliente, criar_pagamento):
+    criar_pagamento()
+    resposta = cliente.get("/pagamentos/", params={"size": 5, "sort_by": "id"})
+    assert resposta.status_code == 200
+    medidas = etapas(resposta.headers["server-timing"])
+    assert {"auth", "count", "consulta", "db", "total"} <= set(medidas)
+    assert float(medidas["total"]["dur"]) >= float(medidas["consulta"]["dur"])
+
+
+def test_respostas_de_erro_tambem_sao_medidas(cliente):
+    resposta = cliente.get("/pagamentos/", headers={"Authorization": "Bearer invalido"})
+    assert resposta.status_code == 401
+    assert "total" in etapas(resposta.headers["server-timing"])
+
+
+def test_log_estruturado_por_requisicao(cliente, caplog):
+    with caplog.at_level(logging.INFO, logger="app.core.timing"):
+        cliente.get("/programas/", params={"size": 3})
+    registro = next(r for r in caplog.records if r.name == "app.core.timing")
+    assert (registro.metodo, registro.rota, registro.status) == ("GET", "/programas/", 200)
+    assert registro.tempo_total_ms >= registro.tempo_auth_ms
@@ -0,0 +1,126 @@
+import threading
+import pytest
+
+
+def seguidores(single_flight, chave, func, quantidade):
+    """Dispara chamadas concorrentes da chave; devolve (resultados, erros) de cada uma"""
+    resultados, erros = [], []
+
+    def chamar():
+        try:
+            resultados.append(single_flight.do(chave, func))
+        except Exception as exc:
+            erros.append(exc)
+
+    threads = [threading.Thread(target=chamar) for _ in range(quantidade)]
+    for thread in threads:
+        thread.start()
+    return threads, resultados, erros
+
+
+def esperar_coalescidas(single_flight, quantidade):
+    for _ in range(500):
+        if single_flight.stats()["coalescidas"] >= quantidade:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("as chamadas não foram coalescidas")
+
+
+def test_chamadas_concorrentes_executam_uma_vez():
+    from app.core.cache import SingleFlight
+
+    single_flight = SingleFlight()
+    liberar = threading.Event()
+    execucoes = []
+
+    def lento():
+        execucoes.append(1)
+        liberar.wait(5)
+        return "resultado"
+
+    lider = threading.Thread(target=single_flight.do, args=("chave", lento))
+    lider.start()
+    threads, resultados, erros = seguidores(single_flight, "chave", lento, 3)
+    esperar_coalescidas(single_flight, 3)
+    liberar.set()
+    for thread in [lider, *threads]:
+        thread.join()
+
+    assert len(execucoes) == 1
+    assert not erros
+    assert resultados == [("resultado", True)] * 3
+    assert single_flight.stats() == {"em_andamento": 0, "execucoes": 1, "coalescidas": 3, "esperas_esgotadas": 0}
+
+
+def test_seguidores_recebem_copias_da_excecao():
+    from app.core.cache import SingleFlight
+
+    single_flight = SingleFlight()
+    liberar = threading.Event()
+
+    def falha():
+        liberar.wait(5)
+        raise ValueError("falhou")
+
+    erros_lider = []
+
+    def lider():
+        try:
+            single_flight.do("chave", falha)
+        except ValueError as exc:
+            erros_lider.append(exc)
+
+    thread_lider = threading.Thread(target=lider)
+    thread_lider.start()
+    threads, resultados, erros = seguidores(single_flight, "chave", falha, 2)
+    esperar_coalescidas(single_flight, 2)
+    liberar.set()
+    for thread in [thread_lider, *threads]:
+        thread.join()
+
+    assert not resultados
+    todas = [*erros_lider, *erros]
+    assert len(todas) == 3
+    assert all(isinstance(erro, ValueError) and str(erro) == "falhou" for erro in todas)
+    # Cada chamada levanta a sua própria instância (tracebacks não se misturam entre threads)
+    assert len({id(erro) for erro in todas}) == 3
+
+
+def test_espera_limitada_executa_por_conta_propria():
+    from app.core.cache import SingleFlight
+
+    single_flight = SingleFlight(espera_maxima=0.05)
+    iniciou, liberar = threading.Event(), threading.Event()
+
+    def lento():
+        iniciou.set()
+        liberar.wait(5)
+
+    lider = threading.Thread(target=single_flight.do, args=("chave", lento))
+    lider.start()
+    iniciou.wait(5)
+
+    assert single_flight.do("chave", lambda: "próprio") == ("próprio", False)
+    liberar.set()
+    lider.join()
+    assert single_flight.stats()["esperas_esgotadas"] == 1
+
+
+def test_rotas_em_cache_passam_pelo_single_flight(cliente, monkeypatch):
+    from app.core import cache as modulo
+
+    single_flight = modulo.SingleFlight()
+    monkeypatch.setattr(modulo, "single_flight", single_flight)
+    resposta = cliente.get("/programas/", params={"size": 19})
+    assert resposta.status_code == 200
+    assert single_flight.stats()["execucoes"] == 1
+
+
+@pytest.mark.parametrize("espera", [None, 0.5])
+def test_sem_concorrencia_nao_coalesce(espera):
+    from app.core.cache import SingleFlight
+
+    single_flight = SingleFlight(espera)
+    assert single_flight.do("a", lambda: 1) == (1, False)
+    assert single_flight.do("a", lambda: 2) == (2, False)
+    assert single_flight.stats()["coalescidas"] == 0
@@ -0,0 +1,42 @@
+def _distintos_no_programa(cliente, programa_id, ano):
+    resposta = cliente.get("/pagamentos/stats/beneficiarios-distintos", params={"group_by": "programa", "anos": ano})
+    assert resposta.status_code == 200
+    grupos = {grupo["programa"]: grupo["beneficiarios_distintos"] for grupo in resposta.json()["grupos"]}
+    return grupos.get(programa_id, 0)
+
+
+def test_remocoes_so_tiram_quem_saiu_da_celula(cliente, criar_pagamento, entidades, conferir_agregados):
+    outros = [
+        cliente.post("/beneficiarios/", json={
+            "nome": f"Distinto {i}", "cpf_anonimizado": f"***.{i:03d}.000-**", "categoria_nivel": "2"
+        }).json()["id"]
+        for i in range(2)
+    ]
+    repetido = criar_pagamento(ano_referencia=1995)
+    criar_pagamento(ano_referencia=1995)
+    unico = criar_pagamento(ano_referencia=1995, fk_beneficiario=outros[0])
+    criar_pagamento(ano_referencia=1995, fk_beneficiario=outros[1])
+    programa = entidades["fk_programa"]
+    assert _distintos_no_programa(cliente, programa, 1995) == 3
+
+    # O beneficiário ainda tem outro pagamento na célula: continua contado
+    cliente.delete(f"/pagamentos/{repetido['id']}")
+    assert _distintos_no_programa(cliente, programa, 1995) == 3
+
+    # Último pagamento do beneficiário na célula: sai da contagem
+    cliente.delete(f"/pagamentos/{unico['id']}")
+    assert _distintos_no_programa(cliente, programa, 1995) == 2
+    conferir_agregados()
+
+
+def test_alteracao_move_beneficiario_de_ano(cliente, criar_pagamento, entidades, conferir_agregados):
+    pagamento = criar_pagamento(ano_referencia=1996)
+    cliente.put(f"/pagamentos/{pagamento['id']}", json={**pagamento, "ano_referencia": 1997})
+    programa = entidades["fk_programa"]
+    assert _distintos_no_programa(cliente, programa, 1996) == 0
+    assert _distintos_no_programa(cliente, programa, 1997) == 1
+    conferir_agregados()
+
+
+def test_group_by_invalido(cliente):
+    assert cliente.get("/pagamentos/stats/beneficiarios-distintos", params={"group_by": "uf"}).status_code == 400
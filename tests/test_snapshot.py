@@ -0,0 +1,46 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def snapshot_ativo(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "snapshot_enabled", True)
+
+
+def test_snapshot_igual_ao_banco(cliente, criar_pagamento, entidades, snapshot_ativo):
+    from app.core.database import SessionLocal
+    from app.services.analytics import aggregate_pagamentos
+    from app.services.snapshot import snapshot_manager
+
+    criar_pagamento(modalidade="BP", valor_pago=10.0, ano_referencia=2022)
+    criar_pagamento(modalidade="BP", valor_pago=None, ano_referencia=2023)
+    criar_pagamento(modalidade="PQ", valor_pago=7.5, ano_referencia=2023)
+    snapshot = snapshot_manager.load()
+    assert snapshot_manager.current() is snapshot
+
+    filtros = {"fk_programa": entidades["fk_programa"]}
+    db = SessionLocal()
+    try:
+        for group_by in (["modalidade"], ["ano_referencia", "modalidade"], ["instituicao_uf"]):
+            esperado = aggregate_pagamentos(db, group_by, ["count", "sum", "avg", "max"], filtros)
+            obtido = snapshot.aggregate(group_by, ["count", "sum", "avg", "max"], filtros)
+            assert obtido["total_grupos"] == esperado["total_grupos"]
+            assert obtido["grupos"] == [pytest.approx(grupo) for grupo in esperado["grupos"]]
+    finally:
+        db.close()
+
+    total, ids = snapshot.paginar(filtros, 0, 10, "valor_pago", "desc")
+    assert total == 3
+    assert len(ids) == 3
+
+
+def test_snapshot_desatualizado_nao_e_usado(cliente, criar_pagamento, snapshot_ativo):
+    from app.services.snapshot import snapshot_manager
+
+    snapshot_manager.load()
+    criar_pagamento()
+    # Depois de uma escrita a versão muda: as consultas voltam ao banco até a recarga
+    assert snapshot_manager.current() is None
@@ -0,0 +1,62 @@
+import time
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+
+
+def test_token_verificado_vem_do_cache():
+    from app.core.security import create_access_token, token_cache, verify_token
+
+    token = create_access_token({"sub": "ana", "role": "leitor"})
+    assert verify_token(token) == {"username": "ana", "role": "leitor"}
+    hits = token_cache.stats()["hits"]
+    assert verify_token(token) == {"username": "ana", "role": "leitor"}
+    assert token_cache.stats()["hits"] == hits + 1
+
+
+def test_token_expirado_ou_alterado_e_rejeitado():
+    from jose import jwt
+    from app.core.security import ALGORITHM, create_access_token, token_cache, verify_token
+
+    expirado = create_access_token({"sub": "ana", "role": "leitor"}, expires_delta=timedelta(seconds=-1))
+    outra_chave = jwt.encode(
+        {"sub": "ana", "role": "admin", "type": "access", "exp": time.time() + 60}, "x" * 32, algorithm=ALGORITHM
+    )
+    for invalido in (expirado, outra_chave):
+        with pytest.raises(HTTPException) as erro:
+            verify_token(invalido)
+        assert erro.value.status_code == 401
+        assert token_cache.get(invalido) is None
+
+
+def test_tipo_do_token_e_conferido_com_cache():
+    from app.core.security import create_refresh_token, verify_token
+
+    refresh = create_refresh_token({"sub": "ana", "role": "leitor"})
+    assert verify_token(refresh, "refresh")["username"] == "ana"
+    with pytest.raises(HTTPException):
+        verify_token(refresh)
+
+
+def test_entrada_vale_ate_o_exp_do_token():
+    from app.core.security import VerifiedTokenCache
+
+    cache = VerifiedTokenCache(max_entries=2)
+    cache.set("vencido", {"sub": "ana", "exp": time.time() - 1})
+    cache.set("sem-exp", {"sub": "ana"})
+    assert cache.get("vencido") is None
+    assert cache.get("sem-exp") is None
+
+    for token in ("a", "b", "c"):
+        cache.set(token, {"sub": token, "exp": time.time() + 60})
+    assert cache.get("a") is None
+    assert cache.get("c")["sub"] == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_desativado():
+    from app.core.security import VerifiedTokenCache
+
+    cache = VerifiedTokenCache(max_entries=0)
+    cache.set("a", {"sub": "ana", "exp": time.time() + 60})
+    assert cache.get("a") is None